@@ -0,0 +1,95 @@
+"""
+Archivo histórico comprimido del registro de publicaciones
+Las entradas que salen del registro vivo (por retención) se guardan en
+archivos mensuales gzip: <coleccion>-AAAA-MM.jsonl.gz
+"""
+
+import os
+import json
+import gzip
+
+
+def _mes_de_entrada(entrada):
+    """Mes (AAAA-MM) al que pertenece una entrada según su fecha"""
+    fecha = entrada.get('fecha')
+    return fecha[:7] if fecha else 'sin-fecha'
+
+
+def _ruta_archivo(carpeta_archivo, coleccion, mes):
+    """Ruta del archivo mensual de una colección"""
+    return os.path.join(carpeta_archivo, f"{coleccion}-{mes}.jsonl.gz")
+
+
+def archivar_entradas(carpeta_archivo, coleccion, entradas):
+    """
+    Agrega entradas a los archivos mensuales comprimidos
+    
+    Args:
+        carpeta_archivo: Carpeta de archivos históricos
+        coleccion: 'publicaciones', 'errores' o 'extracciones'
+        entradas: Lista de entradas a archivar
+    
+    Returns:
+        int: Número de entradas archivadas
+    """
+    if not entradas:
+        return 0
+    
+    os.makedirs(carpeta_archivo, exist_ok=True)
+    
+    por_mes = {}
+    for entrada in entradas:
+        por_mes.setdefault(_mes_de_entrada(entrada), []).append(entrada)
+    
+    # gzip admite agregar miembros nuevos al final del archivo
+    for mes, entradas_mes in por_mes.items():
+        with gzip.open(_ruta_archivo(carpeta_archivo, coleccion, mes), 'at', encoding='utf-8') as f:
+            for entrada in entradas_mes:
+                f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+    
+    return len(entradas)
+
+
+def listar_meses_archivados(carpeta_archivo, coleccion):
+    """
+    Lista los meses que tienen archivo para una colección
+    
+    Returns:
+        list: Meses AAAA-MM ordenados
+    """
+    if not os.path.exists(carpeta_archivo):
+        return []
+    
+    prefijo = f"{coleccion}-"
+    sufijo = ".jsonl.gz"
+    
+    return sorted(
+        archivo[len(prefijo):-len(sufijo)]
+        for archivo in os.listdir(carpeta_archivo)
+        if archivo.startswith(prefijo) and archivo.endswith(sufijo)
+    )
+
+
+def consultar_archivo(carpeta_archivo, coleccion, mes=None):
+    """
+    Recorre las entradas archivadas de una colección
+    
+    Args:
+        carpeta_archivo: Carpeta de archivos históricos
+        coleccion: 'publicaciones', 'errores' o 'extracciones'
+        mes: AAAA-MM para leer un solo mes, o None para todos
+    
+    Yields:
+        dict: Entradas en orden cronológico
+    """
+    meses = [mes] if mes else listar_meses_archivados(carpeta_archivo, coleccion)
+    
+    for mes_archivo in meses:
+        ruta = _ruta_archivo(carpeta_archivo, coleccion, mes_archivo)
+        if not os.path.exists(ruta):
+            continue
+        
+        with gzip.open(ruta, 'rt', encoding='utf-8') as f:
+            for linea in f:
+                if linea.strip():
+                    yield json.loads(linea)
@@ -0,0 +1,197 @@
+"""
+Bolsa de mensajes para la selección aleatoria sin repetición
+Los mensajes se barajan una vez por ronda y se sacan de a uno desde el final
+de la lista; ninguno se repite hasta haber usado todo el catálogo. El estado
+se guarda en <carpeta_mensajes>.bolsa.json (junto a la carpeta, como el
+catálogo). Los mensajes nuevos se intercalan al azar en la ronda en curso y
+los eliminados se quitan sin volver a barajar.
+"""
+
+import os
+import json
+import random
+
+
+SUFIJO_BOLSA = ".bolsa.json"
+VERSION_BOLSA = 1
+MAXIMO_DESCARTES = 20
+
+
+class BolsaMensajes:
+    """
+    Mazo persistente de nombres de mensajes
+    - pendientes: orden de salida de la ronda actual (se saca del final)
+    - usados: mensajes ya sacados en esta ronda
+    """
+    
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        self.archivo_bolsa = os.path.normpath(carpeta) + SUFIJO_BOLSA
+        
+        self.pendientes = []
+        self.posiciones = {}    # nombre → posición en pendientes
+        self.usados = set()
+        self.mtime_catalogo = None
+        self.ronda = 1
+        
+        self._cargar()
+    
+    def _cargar(self):
+        """Carga la bolsa guardada (si existe y es de esta versión)"""
+        if not os.path.exists(self.archivo_bolsa):
+            return
+        
+        try:
+            with open(self.archivo_bolsa, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return
+        
+        if datos.get('version') != VERSION_BOLSA:
+            return
+        
+        self.pendientes = datos.get('pendientes', [])
+        self.posiciones = {nombre: posicion for posicion, nombre in enumerate(self.pendientes)}
+        self.usados = set(datos.get('usados', []))
+        self.mtime_catalogo = datos.get('mtime_catalogo')
+        self.ronda = datos.get('ronda', 1)
+    
+    def guardar(self):
+        """Guarda la bolsa de forma atómica"""
+        datos = {
+            'version': VERSION_BOLSA,
+            'mtime_catalogo': self.mtime_catalogo,
+            'ronda': self.ronda,
+            'pendientes': self.pendientes,
+            'usados': sorted(self.usados)
+        }
+        
+        archivo_temporal = self.archivo_bolsa + ".tmp"
+        with open(archivo_temporal, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False)
+        os.replace(archivo_temporal, self.archivo_bolsa)
+    
+    def __len__(self):
+        return len(self.pendientes)
+    
+    def _insertar_al_azar(self, nombre):
+        """Intercala un mensaje en una posición aleatoria de la ronda (O(1))"""
+        self.pendientes.append(nombre)
+        ultima = len(self.pendientes) - 1
+        destino = random.randint(0, ultima)
+        
+        if destino != ultima:
+            desplazado = self.pendientes[destino]
+            self.pendientes[destino], self.pendientes[ultima] = nombre, desplazado
+            self.posiciones[desplazado] = ultima
+        
+        self.posiciones[nombre] = destino
+    
+    def _quitar(self, nombre):
+        """Quita un mensaje pendiente intercambiándolo con el último (O(1))"""
+        posicion = self.posiciones.pop(nombre)
+        ultimo = self.pendientes.pop()
+        
+        if ultimo != nombre:
+            self.pendientes[posicion] = ultimo
+            self.posiciones[ultimo] = posicion
+    
+    def sincronizar(self, catalogo):
+        """
+        Ajusta la bolsa a los mensajes del catálogo
+        Solo compara nombres si la carpeta cambió desde la última vez
+        
+        Args:
+            catalogo: CatalogoMensajes ya actualizado
+        
+        Returns:
+            dict: {'agregados': n, 'eliminados': n}
+        """
+        cambios = {'agregados': 0, 'eliminados': 0}
+        
+        if catalogo.mtime_carpeta == self.mtime_catalogo:
+            return cambios
+        
+        for nombre in [nombre for nombre in self.pendientes if nombre not in catalogo]:
+            self._quitar(nombre)
+            cambios['eliminados'] += 1
+        
+        eliminados_usados = {nombre for nombre in self.usados if nombre not in catalogo}
+        self.usados -= eliminados_usados
+        cambios['eliminados'] += len(eliminados_usados)
+        
+        for nombre in catalogo.nombres:
+            if nombre not in self.posiciones and nombre not in self.usados:
+                self._insertar_al_azar(nombre)
+                cambios['agregados'] += 1
+        
+        self.mtime_catalogo = catalogo.mtime_carpeta
+        return cambios
+    
+    def _nueva_ronda(self, recientes):
+        """
+        Vuelve a barajar todos los mensajes usados
+        Los publicados recientemente quedan al principio de la lista, el más
+        nuevo primero (salen al final de la ronda), así no se repiten justo
+        en el cambio de ronda
+        """
+        recientes = [nombre for nombre in dict.fromkeys(reversed(recientes)) if nombre in self.usados]
+        resto = list(self.usados.difference(recientes))
+        random.shuffle(resto)
+        
+        self.pendientes = recientes + resto
+        self.posiciones = {nombre: posicion for posicion, nombre in enumerate(self.pendientes)}
+        self.usados = set()
+        self.ronda += 1
+    
+    def _sacar_uno(self, recientes):
+        """Saca el último pendiente, empezando ronda si hace falta"""
+        if not self.pendientes:
+            if not self.usados:
+                return None
+            self._nueva_ronda(recientes)
+        
+        nombre = self.pendientes.pop()
+        del self.posiciones[nombre]
+        self.usados.add(nombre)
+        return nombre
+    
+    def sacar(self, recientes=(), evitar=frozenset()):
+        """
+        Saca el siguiente mensaje de la bolsa (O(1) salvo al empezar ronda)
+        
+        Args:
+            recientes: Últimos mensajes publicados, para no repetirlos
+                       al empezar una ronda nueva
+            evitar: Mensajes a saltear por ahora (ej: casi iguales a los
+                    recientes); vuelven a la ronda en posiciones al azar.
+                    Si en la ronda solo quedan de estos, se usa el primero
+        
+        Returns:
+            str o None si no hay mensajes
+        """
+        apartados = []
+        nombre = self._sacar_uno(recientes)
+        
+        while nombre in evitar and self.pendientes and len(apartados) < MAXIMO_DESCARTES:
+            apartados.append(nombre)
+            nombre = self._sacar_uno(recientes)
+        
+        if nombre in evitar and apartados:
+            apartados.append(nombre)
+            nombre = apartados.pop(0)
+        
+        # Devolver los salteados a la ronda
+        self.devolver(apartados)
+        
+        return nombre
+    
+    def devolver(self, nombres):
+        """
+        Vuelve a poner en la ronda actual mensajes ya sacados (en posiciones
+        al azar). Los que no se sacaron en esta ronda se ignoran
+        """
+        for nombre in nombres:
+            if nombre in self.usados:
+                self.usados.discard(nombre)
+                self._insertar_al_azar(nombre)
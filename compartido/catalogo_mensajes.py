@@ -0,0 +1,312 @@
+"""
+Catálogo persistente de la carpeta de mensajes
+Guarda nombre, tamaño, fecha de modificación y hash de contenido de cada
+.txt en <carpeta_mensajes>.catalogo.json (junto a la carpeta, no dentro,
+para no alterar la fecha de la carpeta al guardarlo). Cada carpeta (o
+subcarpeta, en la disposición fragmentada) solo se vuelve a recorrer si
+cambió su fecha de modificación (altas, bajas o renombres), y solo se vuelve
+a leer el contenido de los archivos que cambiaron.
+
+Editar un .txt sin renombrarlo no cambia la fecha de su carpeta, así que
+por defecto esa edición no se detecta y el hash queda desactualizado. Con
+verificar_ediciones_mensajes = si ([MENSAJES] en config_global.txt) cada
+sincronización compara tamaño y fecha de todos los archivos (sin leerlos).
+"""
+
+import os
+import json
+import bisect
+import hashlib
+
+from compartido.disposicion_carpetas import es_subcarpeta_fragmento, ruta_archivo
+
+
+SUFIJO_CATALOGO = ".catalogo.json"
+VERSION_CATALOGO = 3
+
+
+def calcular_hash_texto(texto):
+    """
+    Hash corto (blake2b, 16 hex) del texto de un mensaje
+    Se ignoran los espacios y saltos de línea del principio y del final,
+    así el mismo pasaje da el mismo hash aunque el archivo termine en salto
+    """
+    return hashlib.blake2b(texto.strip().encode('utf-8'), digest_size=8).hexdigest()
+
+
+def calcular_hash_contenido(ruta):
+    """Hash corto del texto de un archivo de mensaje"""
+    with open(ruta, 'r', encoding='utf-8', errors='replace') as f:
+        return calcular_hash_texto(f.read())
+
+
+class CatalogoMensajes:
+    """
+    Índice de los mensajes .txt de una carpeta
+    Los nombres se mantienen ordenados alfabéticamente
+    """
+    
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        self.archivo_catalogo = os.path.normpath(carpeta) + SUFIJO_CATALOGO
+        
+        self.nombres = []       # Ordenados alfabéticamente
+        self.entradas = {}      # nombre → {'tamano', 'mtime', 'hash', 'sub'}
+        self.mtimes = {}        # subcarpeta ('' = raíz) → fecha de modificación
+        self.mtime_carpeta = None
+        self.modificado = False
+        
+        self._cargar()
+    
+    def _cargar(self):
+        """Carga el catálogo guardado (si existe y es de esta versión)"""
+        if not os.path.exists(self.archivo_catalogo):
+            return
+        
+        try:
+            with open(self.archivo_catalogo, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return
+        
+        if datos.get('version') != VERSION_CATALOGO:
+            return
+        
+        self.mtimes = datos.get('mtimes_carpetas', {})
+        self.mtime_carpeta = datos.get('mtime_carpeta')
+        for nombre, tamano, mtime, hash_contenido, sub in datos.get('mensajes', []):
+            self.nombres.append(nombre)
+            self.entradas[nombre] = {'tamano': tamano, 'mtime': mtime, 'hash': hash_contenido, 'sub': sub}
+    
+    def guardar(self):
+        """Guarda el catálogo de forma atómica"""
+        datos = {
+            'version': VERSION_CATALOGO,
+            'mtime_carpeta': self.mtime_carpeta,
+            'mtimes_carpetas': self.mtimes,
+            'mensajes': [
+                [nombre, entrada['tamano'], entrada['mtime'], entrada['hash'], entrada['sub']]
+                for nombre, entrada in ((nombre, self.entradas[nombre]) for nombre in self.nombres)
+            ]
+        }
+        
+        archivo_temporal = self.archivo_catalogo + ".tmp"
+        with open(archivo_temporal, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False)
+        os.replace(archivo_temporal, self.archivo_catalogo)
+        
+        self.modificado = False
+    
+    def actualizar(self, completo=False):
+        """
+        Sincroniza el catálogo con la carpeta
+        
+        Args:
+            completo: Recorrer la carpeta aunque su fecha no haya cambiado
+                      (detecta ediciones de archivos existentes)
+        
+        Returns:
+            dict: {'agregados': n, 'eliminados': n, 'modificados': n}
+        """
+        cambios = {'agregados': 0, 'eliminados': 0, 'modificados': 0}
+        
+        if not os.path.exists(self.carpeta):
+            return cambios
+        
+        # Fechas actuales de la raíz y de las subcarpetas conocidas. La raíz
+        # cambia al crear o borrar subcarpetas, y entonces se vuelve a listar
+        mtimes = {'': os.stat(self.carpeta).st_mtime_ns}
+        for sub in self.mtimes:
+            if sub and os.path.isdir(os.path.join(self.carpeta, sub)):
+                mtimes[sub] = os.stat(os.path.join(self.carpeta, sub)).st_mtime_ns
+        
+        if not completo and mtimes == self.mtimes:
+            return cambios
+        
+        if completo or mtimes[''] != self.mtimes.get(''):
+            with os.scandir(self.carpeta) as entradas_dir:
+                for entrada in entradas_dir:
+                    if entrada.is_dir() and es_subcarpeta_fragmento(entrada.name):
+                        mtimes[entrada.name] = entrada.stat().st_mtime_ns
+        
+        # Solo se recorren las carpetas nuevas o modificadas
+        por_recorrer = {sub for sub in mtimes if completo or mtimes[sub] != self.mtimes.get(sub)}
+        por_recorrer.update(sub for sub in self.mtimes if sub not in mtimes)
+        
+        vistos = set()
+        nuevos = []
+        entradas_cambiadas = 0
+        
+        for sub in por_recorrer:
+            ruta_sub = os.path.join(self.carpeta, sub) if sub else self.carpeta
+            if sub not in mtimes:
+                continue
+            
+            with os.scandir(ruta_sub) as entradas_dir:
+                for entrada in entradas_dir:
+                    if not entrada.name.endswith('.txt') or not entrada.is_file():
+                        continue
+                    
+                    vistos.add(entrada.name)
+                    estado = entrada.stat()
+                    actual = self.entradas.get(entrada.name)
+                    
+                    if (actual and actual['tamano'] == estado.st_size
+                            and actual['mtime'] == estado.st_mtime_ns and actual['sub'] == sub):
+                        continue
+                    
+                    if not actual:
+                        nuevos.append(entrada.name)
+                        cambios['agregados'] += 1
+                    elif actual['tamano'] != estado.st_size or actual['mtime'] != estado.st_mtime_ns:
+                        cambios['modificados'] += 1
+                    
+                    entradas_cambiadas += 1
+                    self.entradas[entrada.name] = {
+                        'tamano': estado.st_size,
+                        'mtime': estado.st_mtime_ns,
+                        'hash': (actual['hash'] if actual and actual['mtime'] == estado.st_mtime_ns
+                                 and actual['tamano'] == estado.st_size
+                                 else calcular_hash_contenido(entrada.path)),
+                        'sub': sub
+                    }
+        
+        if nuevos:
+            # Timsort aprovecha que la lista ya estaba ordenada
+            self.nombres = sorted(self.nombres + nuevos)
+        
+        # Eliminados: estaban en una carpeta recorrida y ya no aparecieron
+        eliminados = {
+            nombre for nombre in self.nombres
+            if self.entradas[nombre]['sub'] in por_recorrer and nombre not in vistos
+        }
+        if eliminados:
+            for nombre in eliminados:
+                del self.entradas[nombre]
+            self.nombres = [nombre for nombre in self.nombres if nombre not in eliminados]
+            cambios['eliminados'] = len(eliminados)
+        
+        # En una revisión completa sin cambios no hace falta reescribir el catálogo
+        if entradas_cambiadas or eliminados or mtimes != self.mtimes:
+            self.modificado = True
+        
+        self.mtimes = mtimes
+        self.mtime_carpeta = max(mtimes.values())
+        return cambios
+    
+    def __len__(self):
+        return len(self.nombres)
+    
+    def __contains__(self, nombre):
+        return nombre in self.entradas
+    
+    def posicion(self, nombre):
+        """
+        Posición de un mensaje en el orden alfabético (búsqueda binaria)
+        
+        Returns:
+            int o None si no está en el catálogo
+        """
+        posicion = bisect.bisect_left(self.nombres, nombre)
+        if posicion < len(self.nombres) and self.nombres[posicion] == nombre:
+            return posicion
+        return None
+    
+    def siguiente(self, nombre):
+        """
+        Mensaje que sigue a 'nombre' en orden alfabético (con rotación)
+        Funciona aunque 'nombre' ya no exista en la carpeta
+        
+        Returns:
+            str o None si el catálogo está vacío
+        """
+        if not self.nombres:
+            return None
+        
+        posicion = bisect.bisect_right(self.nombres, nombre)
+        return self.nombres[posicion % len(self.nombres)]
+    
+    def siguiente_desde_cursor(self, nombre, posicion):
+        """
+        Mensaje que sigue a un cursor guardado (nombre + posición)
+        Si la posición sigue apuntando al mismo nombre la consulta es directa;
+        si se agregaron o quitaron archivos antes de él, se usa siguiente()
+        
+        Returns:
+            str o None si el catálogo está vacío
+        """
+        if not self.nombres:
+            return None
+        
+        if posicion is not None and 0 <= posicion < len(self.nombres) and self.nombres[posicion] == nombre:
+            return self.nombres[(posicion + 1) % len(self.nombres)]
+        
+        return self.siguiente(nombre)
+    
+    def leer(self, nombre):
+        """Texto de un mensaje (leído de su archivo)"""
+        with open(ruta_archivo(self.carpeta, nombre), 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def agregar_entradas(self, entradas):
+        """
+        Registra mensajes recién escritos sin volver a leerlos
+        
+        Args:
+            entradas: Iterable de (nombre, ruta, hash de texto)
+        """
+        nuevos = []
+        
+        for nombre, ruta, hash_texto in entradas:
+            estado = os.stat(ruta)
+            sub = os.path.relpath(os.path.dirname(ruta), self.carpeta)
+            
+            if nombre not in self.entradas:
+                nuevos.append(nombre)
+            
+            self.entradas[nombre] = {
+                'tamano': estado.st_size,
+                'mtime': estado.st_mtime_ns,
+                'hash': hash_texto,
+                'sub': '' if sub == os.curdir else sub
+            }
+        
+        if nuevos:
+            self.nombres = sorted(self.nombres + nuevos)
+        
+        self.modificado = True
+    
+    def hashes(self):
+        """Conjunto de hashes de texto de todos los mensajes"""
+        return {entrada['hash'] for entrada in self.entradas.values()}
+    
+    def hash_de(self, nombre):
+        """Hash de contenido de un mensaje (None si no está en el catálogo)"""
+        entrada = self.entradas.get(nombre)
+        return entrada['hash'] if entrada else None
+
+
+def obtener_catalogo_mensajes(carpeta, completo=False):
+    """
+    Abre el catálogo de una carpeta de mensajes, lo sincroniza y lo guarda
+    si hubo cambios
+    
+    Args:
+        carpeta: Carpeta de mensajes
+        completo: Comparar tamaño y fecha de cada archivo aunque su carpeta
+                  no haya cambiado (detecta ediciones en el mismo archivo)
+    
+    Returns:
+        CatalogoMensajes
+    """
+    catalogo = CatalogoMensajes(carpeta)
+    cambios = catalogo.actualizar(completo)
+    
+    if catalogo.modificado and os.path.exists(carpeta):
+        catalogo.guardar()
+        
+        if any(cambios.values()):
+            print(f"🗂️  Catálogo de mensajes actualizado: +{cambios['agregados']} "
+                  f"-{cambios['eliminados']} ~{cambios['modificados']} ({len(catalogo)} mensajes)")
+    
+    return catalogo
@@ -0,0 +1,265 @@
+"""
+Manifiesto de la cola de predicaciones (cola-facebook)
+Una base SQLite registra cada predica-NNN.txt con su estado (pendiente o
+publicada), y una tabla de contadores lleva cuántas hay en cada uno. Así
+contar, ver la siguiente, encolar y marcar publicada no recorren las
+carpetas. Si el manifiesto falta se reconstruye desde el disco, y
+reparar() lo vuelve a sincronizar cuando se tocaron archivos a mano.
+"""
+
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+from compartido.disposicion_carpetas import ruta_archivo, iterar_archivos
+
+
+CARPETA_COLA = "cola-facebook"
+NOMBRE_MANIFIESTO = "cola.db"
+
+PATRON_PREDICACION = re.compile(r'^predica-(\d+)\.txt$')
+
+ESTADOS = ('pendiente', 'publicada')
+CARPETA_ESTADO = {'pendiente': 'pendientes', 'publicada': 'publicados'}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS predicaciones (
+    nombre TEXT PRIMARY KEY,
+    numero INTEGER,
+    estado TEXT NOT NULL,
+    fecha TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_predicaciones_estado ON predicaciones (estado, nombre);
+CREATE INDEX IF NOT EXISTS idx_predicaciones_numero ON predicaciones (numero);
+
+CREATE TABLE IF NOT EXISTS contadores (
+    estado TEXT PRIMARY KEY,
+    cantidad INTEGER NOT NULL
+);
+"""
+
+
+def numero_predicacion(nombre_archivo):
+    """
+    Número de una predicación a partir de su nombre (predica-007.txt → 7)
+    
+    Returns:
+        int o None si el nombre no tiene el formato esperado
+    """
+    coincidencia = PATRON_PREDICACION.match(nombre_archivo)
+    return int(coincidencia.group(1)) if coincidencia else None
+
+
+class ColaPredicaciones:
+    """
+    Manifiesto de predicaciones pendientes y publicadas
+    Orden de salida: alfabético por nombre (predica-001, predica-002, ...)
+    """
+    
+    def __init__(self, carpeta_cola=CARPETA_COLA, archivo_manifiesto=None):
+        self.carpeta_cola = carpeta_cola
+        self.archivo_manifiesto = archivo_manifiesto or self.ruta_manifiesto(carpeta_cola)
+        
+        os.makedirs(carpeta_cola, exist_ok=True)
+        nuevo = not os.path.exists(self.archivo_manifiesto)
+        
+        self.conexion = sqlite3.connect(self.archivo_manifiesto)
+        self.conexion.row_factory = sqlite3.Row
+        self.conexion.executescript(ESQUEMA)
+        
+        if nuevo:
+            self.reparar()
+    
+    @staticmethod
+    def ruta_manifiesto(carpeta_cola=CARPETA_COLA):
+        """Ruta del manifiesto de una carpeta de cola (sin abrirlo)"""
+        return os.path.join(carpeta_cola, NOMBRE_MANIFIESTO)
+    
+    def carpeta(self, estado):
+        """Carpeta en disco de un estado ('pendiente' o 'publicada')"""
+        return os.path.join(self.carpeta_cola, CARPETA_ESTADO[estado])
+    
+    def _sumar(self, estado, cantidad):
+        """Ajusta el contador de un estado dentro de la transacción actual"""
+        self.conexion.execute(
+            "INSERT INTO contadores (estado, cantidad) VALUES (?, ?) "
+            "ON CONFLICT(estado) DO UPDATE SET cantidad = cantidad + excluded.cantidad",
+            (estado, cantidad)
+        )
+    
+    def contar(self, estado='pendiente'):
+        """Cantidad de predicaciones en un estado (lectura de un contador)"""
+        fila = self.conexion.execute(
+            "SELECT cantidad FROM contadores WHERE estado = ?", (estado,)
+        ).fetchone()
+        return fila['cantidad'] if fila else 0
+    
+    def encolar(self, nombre_archivo):
+        """
+        Agrega una predicación como pendiente (el archivo ya debe estar escrito)
+        
+        Returns:
+            bool: True si se agregó, False si ya estaba en el manifiesto
+        """
+        with self.conexion:
+            cursor = self.conexion.execute(
+                "INSERT OR IGNORE INTO predicaciones (nombre, numero, estado, fecha) VALUES (?, ?, 'pendiente', ?)",
+                (nombre_archivo, numero_predicacion(nombre_archivo), datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            if cursor.rowcount:
+                self._sumar('pendiente', 1)
+        
+        return bool(cursor.rowcount)
+    
+    def siguiente(self):
+        """
+        Siguiente predicación pendiente sin sacarla de la cola
+        Las entradas cuyo archivo ya no existe se quitan del manifiesto
+        
+        Returns:
+            str o None si no hay pendientes
+        """
+        while True:
+            fila = self.conexion.execute(
+                "SELECT nombre FROM predicaciones WHERE estado = 'pendiente' ORDER BY nombre LIMIT 1"
+            ).fetchone()
+            
+            if not fila:
+                return None
+            
+            if os.path.exists(ruta_archivo(self.carpeta('pendiente'), fila['nombre'])):
+                return fila['nombre']
+            
+            self.quitar(fila['nombre'])
+    
+    def listar_pendientes(self, limite=None):
+        """
+        Próximas predicaciones pendientes en orden de salida
+        (sin comprobar los archivos, para vistas previas)
+        
+        Returns:
+            list: Nombres de archivo
+        """
+        return [
+            fila['nombre'] for fila in self.conexion.execute(
+                "SELECT nombre FROM predicaciones WHERE estado = 'pendiente' ORDER BY nombre LIMIT ?",
+                (-1 if limite is None else limite,)
+            )
+        ]
+    
+    def marcar_publicada(self, nombre_archivo):
+        """
+        Pasa una predicación de pendiente a publicada
+        
+        Returns:
+            bool: True si estaba pendiente en el manifiesto
+        """
+        with self.conexion:
+            cursor = self.conexion.execute(
+                "UPDATE predicaciones SET estado = 'publicada', fecha = ? WHERE nombre = ? AND estado = 'pendiente'",
+                (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), nombre_archivo)
+            )
+            if cursor.rowcount:
+                self._sumar('pendiente', -1)
+                self._sumar('publicada', 1)
+            elif not self.conexion.execute(
+                "SELECT 1 FROM predicaciones WHERE nombre = ?", (nombre_archivo,)
+            ).fetchone():
+                # Movida a mano sin pasar por el manifiesto
+                self.conexion.execute(
+                    "INSERT INTO predicaciones (nombre, numero, estado, fecha) VALUES (?, ?, 'publicada', ?)",
+                    (nombre_archivo, numero_predicacion(nombre_archivo), datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                )
+                self._sumar('publicada', 1)
+        
+        return bool(cursor.rowcount)
+    
+    def quitar(self, nombre_archivo):
+        """Quita una predicación del manifiesto (el archivo ya no existe)"""
+        with self.conexion:
+            fila = self.conexion.execute(
+                "SELECT estado FROM predicaciones WHERE nombre = ?", (nombre_archivo,)
+            ).fetchone()
+            if fila:
+                self.conexion.execute("DELETE FROM predicaciones WHERE nombre = ?", (nombre_archivo,))
+                self._sumar(fila['estado'], -1)
+    
+    def siguiente_numero(self):
+        """Siguiente número libre para una predicación nueva (índice de número)"""
+        fila = self.conexion.execute("SELECT MAX(numero) AS numero FROM predicaciones").fetchone()
+        return (fila['numero'] or 0) + 1
+    
+    def reparar(self):
+        """
+        Reconstruye el manifiesto a partir de las carpetas pendientes/ y publicados/
+        Conserva la fecha de las entradas que siguen en el mismo estado
+        
+        Returns:
+            dict: {'pendiente': n, 'publicada': n, 'agregadas': n, 'quitadas': n}
+        """
+        en_disco = {}
+        for estado in ESTADOS:
+            for entrada in iterar_archivos(self.carpeta(estado)):
+                if PATRON_PREDICACION.match(entrada.name):
+                    # Si aparece en las dos carpetas, ya fue publicada
+                    if en_disco.get(entrada.name) != 'publicada':
+                        en_disco[entrada.name] = estado
+        
+        anteriores = {
+            fila['nombre']: (fila['estado'], fila['fecha'])
+            for fila in self.conexion.execute("SELECT nombre, estado, fecha FROM predicaciones")
+        }
+        ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        with self.conexion:
+            self.conexion.execute("DELETE FROM predicaciones")
+            self.conexion.execute("DELETE FROM contadores")
+            
+            self.conexion.executemany(
+                "INSERT INTO predicaciones (nombre, numero, estado, fecha) VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        nombre,
+                        numero_predicacion(nombre),
+                        estado,
+                        anteriores[nombre][1] if anteriores.get(nombre, (None,))[0] == estado else ahora
+                    )
+                    for nombre, estado in en_disco.items()
+                ]
+            )
+            
+            for estado in ESTADOS:
+                self._sumar(estado, sum(1 for valor in en_disco.values() if valor == estado))
+        
+        return {
+            'pendiente': self.contar('pendiente'),
+            'publicada': self.contar('publicada'),
+            'agregadas': sum(1 for nombre, estado in en_disco.items() if anteriores.get(nombre, (None,))[0] != estado),
+            'quitadas': sum(1 for nombre in anteriores if nombre not in en_disco)
+        }
+    
+    def cerrar(self):
+        """Cierra la conexión"""
+        self.conexion.close()
+
+
+def reparar_cola_predicaciones(carpeta_cola=CARPETA_COLA):
+    """
+    Reconstruye el manifiesto de la cola desde el disco y muestra el resultado
+    
+    Returns:
+        dict: Resultado de ColaPredicaciones.reparar()
+    """
+    cola = ColaPredicaciones(carpeta_cola)
+    
+    try:
+        resultado = cola.reparar()
+    finally:
+        cola.cerrar()
+    
+    print(f"🔧 Manifiesto de la cola reconstruido: {resultado['pendiente']} pendientes, "
+          f"{resultado['publicada']} publicadas "
+          f"(+{resultado['agregadas']} -{resultado['quitadas']} cambios respecto al anterior)")
+    
+    return resultado
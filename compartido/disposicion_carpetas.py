@@ -0,0 +1,188 @@
+"""
+Disposición de archivos en las carpetas de mensajes y de la cola
+- plana: carpeta/nombre.txt
+- fragmentada: carpeta/ab/nombre.txt, donde 'ab' sale del hash del nombre
+  (256 subcarpetas, ~400 archivos por subcarpeta con 100.000 archivos)
+La disposición de cada carpeta se indica con un archivo .disposicion dentro
+de ella. Las rutas se resuelven por nombre sin recorrer nada, y si un
+archivo no está donde indica la disposición (migración a medias) se busca
+en la otra ubicación posible.
+"""
+
+import os
+import re
+import sys
+import hashlib
+
+
+MARCA_DISPOSICION = ".disposicion"
+DISPOSICION_PLANA = "plana"
+DISPOSICION_FRAGMENTADA = "fragmentada"
+
+PATRON_SUBCARPETA = re.compile(r'^[0-9a-f]{2}$')
+
+
+def subcarpeta_fragmento(nombre_archivo):
+    """
+    Subcarpeta de un archivo en la disposición fragmentada
+    Se calcula sin la extensión, así predica-001.txt y predica-001.jpg
+    quedan juntos
+    """
+    base = os.path.splitext(nombre_archivo)[0]
+    return hashlib.blake2b(base.encode('utf-8'), digest_size=1).hexdigest()
+
+
+def obtener_disposicion(carpeta):
+    """Disposición de una carpeta ('plana' o 'fragmentada')"""
+    marca = os.path.join(carpeta, MARCA_DISPOSICION)
+    
+    try:
+        with open(marca, 'r', encoding='utf-8') as f:
+            return DISPOSICION_FRAGMENTADA if f.read().strip() == DISPOSICION_FRAGMENTADA else DISPOSICION_PLANA
+    except OSError:
+        return DISPOSICION_PLANA
+
+
+def _rutas_posibles(carpeta, nombre_archivo):
+    """Ruta según la disposición actual y ruta alternativa"""
+    plana = os.path.join(carpeta, nombre_archivo)
+    fragmentada = os.path.join(carpeta, subcarpeta_fragmento(nombre_archivo), nombre_archivo)
+    
+    if obtener_disposicion(carpeta) == DISPOSICION_FRAGMENTADA:
+        return fragmentada, plana
+    return plana, fragmentada
+
+
+def ruta_archivo(carpeta, nombre_archivo):
+    """
+    Ruta de lectura de un archivo de la carpeta
+    
+    Returns:
+        str: Ruta donde está el archivo (o donde debería estar si no existe)
+    """
+    principal, alternativa = _rutas_posibles(carpeta, nombre_archivo)
+    
+    if not os.path.exists(principal) and os.path.exists(alternativa):
+        return alternativa
+    return principal
+
+
+def preparar_ruta(carpeta, nombre_archivo):
+    """
+    Ruta de escritura de un archivo nuevo según la disposición de la carpeta
+    (crea la subcarpeta si hace falta)
+    """
+    ruta = _rutas_posibles(carpeta, nombre_archivo)[0]
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    return ruta
+
+
+def es_subcarpeta_fragmento(nombre):
+    """Indica si un nombre de carpeta es una subcarpeta de fragmento"""
+    return bool(PATRON_SUBCARPETA.match(nombre))
+
+
+def iterar_archivos(carpeta, extensiones=('.txt',)):
+    """
+    Recorre los archivos de la carpeta en cualquiera de las dos disposiciones
+    
+    Args:
+        carpeta: Carpeta a recorrer
+        extensiones: Extensiones a incluir (None = todas)
+    
+    Yields:
+        os.DirEntry de cada archivo
+    """
+    if not os.path.exists(carpeta):
+        return
+    
+    subcarpetas = []
+    
+    with os.scandir(carpeta) as entradas:
+        for entrada in entradas:
+            if entrada.is_dir():
+                if es_subcarpeta_fragmento(entrada.name):
+                    subcarpetas.append(entrada.path)
+            elif entrada.name != MARCA_DISPOSICION and (extensiones is None or entrada.name.endswith(extensiones)):
+                yield entrada
+    
+    for subcarpeta in subcarpetas:
+        with os.scandir(subcarpeta) as entradas:
+            for entrada in entradas:
+                if entrada.is_file() and (extensiones is None or entrada.name.endswith(extensiones)):
+                    yield entrada
+
+
+def migrar_disposicion(carpeta, disposicion):
+    """
+    Cambia la disposición de una carpeta moviendo sus archivos
+    La marca se escribe antes de mover, así la lectura sigue funcionando si
+    la migración se interrumpe (se vuelve a ejecutar para terminarla)
+    
+    Args:
+        carpeta: Carpeta a migrar
+        disposicion: 'plana' o 'fragmentada'
+    
+    Returns:
+        int: Cantidad de archivos movidos
+    """
+    if not os.path.exists(carpeta):
+        return 0
+    
+    marca = os.path.join(carpeta, MARCA_DISPOSICION)
+    with open(marca, 'w', encoding='utf-8') as f:
+        f.write(disposicion + "\n")
+    
+    movidos = 0
+    
+    for entrada in list(iterar_archivos(carpeta, extensiones=None)):
+        if entrada.name == '.gitkeep':
+            continue
+        
+        destino = preparar_ruta(carpeta, entrada.name)
+        if os.path.normpath(entrada.path) != os.path.normpath(destino):
+            os.replace(entrada.path, destino)
+            movidos += 1
+    
+    # Quitar subcarpetas que quedaron vacías
+    with os.scandir(carpeta) as entradas:
+        for entrada in entradas:
+            if entrada.is_dir() and es_subcarpeta_fragmento(entrada.name) and not os.listdir(entrada.path):
+                os.rmdir(entrada.path)
+    
+    if disposicion == DISPOSICION_PLANA:
+        os.remove(marca)
+    
+    return movidos
+
+
+def main():
+    """
+    Migra las carpetas de mensajes y de la cola entre disposiciones
+    Uso: py -m compartido.disposicion_carpetas --fragmentar | --aplanar [carpeta ...]
+    """
+    from compartido.gestor_archivos import leer_config_global
+    
+    if '--fragmentar' in sys.argv:
+        disposicion = DISPOSICION_FRAGMENTADA
+    elif '--aplanar' in sys.argv:
+        disposicion = DISPOSICION_PLANA
+    else:
+        print(main.__doc__)
+        return
+    
+    carpetas = [argumento for argumento in sys.argv[1:] if not argumento.startswith('--')]
+    if not carpetas:
+        carpetas = [
+            leer_config_global()['carpeta_mensajes'],
+            'cola-facebook/pendientes',
+            'cola-facebook/publicados'
+        ]
+    
+    for carpeta in carpetas:
+        movidos = migrar_disposicion(carpeta, disposicion)
+        print(f"📁 {carpeta}: {disposicion} ({movidos} archivos movidos)")
+
+
+if __name__ == "__main__":
+    main()
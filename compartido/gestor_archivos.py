@@ -1,74 +1,208 @@
 import os
 import configparser
-import random
 import shutil
+from dataclasses import dataclass
 from datetime import datetime
 
+from compartido.catalogo_mensajes import obtener_catalogo_mensajes
+from compartido.paquete_mensajes import PaqueteMensajes, existe_paquete
+from compartido.bolsa_mensajes import BolsaMensajes
+from compartido.similitud_mensajes import IndiceSimilitud
+from compartido.cola_predicaciones import ColaPredicaciones
+from compartido.disposicion_carpetas import ruta_archivo, preparar_ruta
 
-def leer_config_global():
+
+@dataclass(frozen=True)
+class ConfigGlobal:
     """
-    Lee config_global.txt y retorna un diccionario con la configuración
-    Similar al sistema de Marketplace pero adaptado para Facebook
+    Configuración de config_global.txt con tipos ya convertidos
+    Admite acceso como diccionario (config['clave'], config.get(...)) para
+    mantener compatibilidad con el código que usaba el dict anterior
     """
-    archivo_config = "config_global.txt"
     
+    # [GENERAL]
+    nombre_proyecto: str
+    carpeta_mensajes: str
+    navegador: str
+    
+    # [PUBLICACION]
+    tiempo_entre_intentos: int
+    max_intentos_por_publicacion: int
+    espera_despues_publicar: int
+    verificar_publicacion_exitosa: bool
+    espera_estabilizacion_modal: int
+    
+    # [LIMITES]
+    tiempo_minimo_entre_publicaciones_segundos: int
+    permitir_duplicados: bool
+    permitir_forzar_publicacion_manual: bool
+    
+    # [MENSAJES]
+    seleccion: str
+    historial_evitar_repetir: int
+    formato_fecha: bool
+    agregar_hashtags: bool
+    hashtags: str
+    agregar_firma: bool
+    texto_firma: str
+    
+    # [DEBUG] (tiene prioridad sobre modo_debug de [GENERAL], como en el dict anterior)
+    modo_debug: str
+    
+    # [NAVEGADOR]
+    usar_perfil_existente: bool
+    carpeta_perfil_custom: str
+    desactivar_notificaciones: bool
+    maximizar_ventana: bool
+    
+    # [PUBLICACION] (opcionales)
+    usar_plan_publicaciones: bool = False
+    dias_plan: int = 7
+    publicaciones_por_dia: int = 4
+    
+    # [MENSAJES] (opcionales)
+    usar_paquete_mensajes: bool = False
+    umbral_similitud: float = 0.6
+    verificar_ediciones_mensajes: bool = False
+    
+    # [PREDICACIONES]
+    activar_predicaciones: bool = False
+    alternar_con_predicaciones: bool = False
+    nombre_grupo_whatsapp: str = 'Prédicas'
+    mensajes_por_extraccion: int = 10
+    agregar_introduccion_predica: bool = True
+    texto_introduccion_predica: str = '🎬 Predicación recomendada:\n\n'
+    agregar_hashtags_predicaciones: bool = True
+    hashtags_predicaciones: str = '#Predicación,#Fe,#Cristiano'
+    tiempo_espera_previsualizacion: int = 12
+    usar_estrategia_optimizada_enlaces: bool = True
+    
+    # [REGISTRO]
+    motor_registro: str = 'diario'
+    eventos_por_compactacion: int = 200
+    entradas_por_segmento: int = 1000
+    tamano_ranking_mensajes: int = 10
+    retencion_entradas: int = 5000
+    retencion_dias: int = 0
+    
+    def __getitem__(self, clave):
+        try:
+            return getattr(self, clave)
+        except AttributeError:
+            raise KeyError(clave) from None
+    
+    def get(self, clave, defecto=None):
+        return getattr(self, clave, defecto)
+    
+    @classmethod
+    def desde_archivo(cls, archivo_config):
+        """Lee y convierte config_global.txt"""
+        config = configparser.ConfigParser()
+        config.read(archivo_config, encoding='utf-8')
+        
+        def opcional(seccion, clave, conversion, campo=None):
+            """Convierte una opción solo si existe (si no, queda el valor por defecto)"""
+            if config.has_option(seccion, clave):
+                valores[campo or clave] = conversion(config[seccion][clave])
+        
+        def si_no(valor):
+            return valor.lower() == 'si'
+        
+        valores = {
+            # [GENERAL]
+            'nombre_proyecto': config['GENERAL']['nombre_proyecto'],
+            'carpeta_mensajes': config['GENERAL']['carpeta_mensajes'],
+            'navegador': config['GENERAL']['navegador'].lower(),
+            
+            # [PUBLICACION]
+            'tiempo_entre_intentos': int(config['PUBLICACION']['tiempo_entre_intentos']),
+            'max_intentos_por_publicacion': int(config['PUBLICACION']['max_intentos_por_publicacion']),
+            'espera_despues_publicar': int(config['PUBLICACION']['espera_despues_publicar']),
+            'verificar_publicacion_exitosa': si_no(config['PUBLICACION']['verificar_publicacion_exitosa']),
+            'espera_estabilizacion_modal': int(config['PUBLICACION']['espera_estabilizacion_modal']),
+            
+            # [LIMITES]
+            'tiempo_minimo_entre_publicaciones_segundos': int(config['LIMITES']['tiempo_minimo_entre_publicaciones_segundos']),
+            'permitir_duplicados': si_no(config['LIMITES']['permitir_duplicados']),
+            'permitir_forzar_publicacion_manual': si_no(config['LIMITES']['permitir_forzar_publicacion_manual']),
+            
+            # [MENSAJES]
+            'seleccion': config['MENSAJES']['seleccion'].lower(),
+            'historial_evitar_repetir': int(config['MENSAJES']['historial_evitar_repetir']),
+            'formato_fecha': si_no(config['MENSAJES']['formato_fecha']),
+            'agregar_hashtags': si_no(config['MENSAJES']['agregar_hashtags']),
+            'hashtags': config['MENSAJES']['hashtags'],
+            'agregar_firma': si_no(config['MENSAJES']['agregar_firma']),
+            'texto_firma': config['MENSAJES']['texto_firma'],
+            
+            # [DEBUG]
+            'modo_debug': config['DEBUG']['modo_debug'].lower(),
+            
+            # [NAVEGADOR]
+            'usar_perfil_existente': si_no(config['NAVEGADOR']['usar_perfil_existente']),
+            'carpeta_perfil_custom': config['NAVEGADOR']['carpeta_perfil_custom'],
+            'desactivar_notificaciones': si_no(config['NAVEGADOR']['desactivar_notificaciones']),
+            'maximizar_ventana': si_no(config['NAVEGADOR']['maximizar_ventana'])
+        }
+        
+        # [PUBLICACION] (opcionales)
+        opcional('PUBLICACION', 'usar_plan_publicaciones', si_no)
+        opcional('PUBLICACION', 'dias_plan', int)
+        opcional('PUBLICACION', 'publicaciones_por_dia', int)
+        
+        # [MENSAJES] (opcionales)
+        opcional('MENSAJES', 'usar_paquete_mensajes', si_no)
+        opcional('MENSAJES', 'umbral_similitud', float)
+        opcional('MENSAJES', 'verificar_ediciones_mensajes', si_no)
+        
+        # [PREDICACIONES]
+        opcional('PREDICACIONES', 'activar_predicaciones', si_no)
+        opcional('PREDICACIONES', 'alternar_con_predicaciones', si_no)
+        opcional('PREDICACIONES', 'nombre_grupo_whatsapp', str)
+        opcional('PREDICACIONES', 'mensajes_por_extraccion', int)
+        opcional('PREDICACIONES', 'agregar_introduccion_predica', si_no)
+        opcional('PREDICACIONES', 'texto_introduccion_predica', lambda valor: valor.replace('\\n', '\n'))
+        opcional('PREDICACIONES', 'agregar_hashtags_predicaciones', si_no)
+        opcional('PREDICACIONES', 'hashtags_predicaciones', str)
+        opcional('PREDICACIONES', 'tiempo_espera_previsualizacion', int)
+        opcional('PREDICACIONES', 'usar_estrategia_optimizada_enlaces', si_no)
+        
+        # [REGISTRO]
+        opcional('REGISTRO', 'motor', str.lower, campo='motor_registro')
+        opcional('REGISTRO', 'eventos_por_compactacion', int)
+        opcional('REGISTRO', 'entradas_por_segmento', int)
+        opcional('REGISTRO', 'tamano_ranking_mensajes', int)
+        opcional('REGISTRO', 'retencion_entradas', int)
+        opcional('REGISTRO', 'retencion_dias', int)
+        
+        return cls(**valores)
+
+
+# Configuración ya leída: se reutiliza mientras el archivo no cambie
+_config_en_cache = {'firma': None, 'config': None}
+
+
+def leer_config_global(archivo_config="config_global.txt"):
+    """
+    Retorna la configuración de config_global.txt (ConfigGlobal)
+    Se lee una sola vez por proceso y se vuelve a leer solo si cambia la
+    fecha de modificación o el tamaño del archivo (un stat por llamada)
+    """
     if not os.path.exists(archivo_config):
         print("⚠️  No existe config_global.txt. Creando configuración por defecto...")
         crear_config_defecto()
     
-    config = configparser.ConfigParser()
-    config.read(archivo_config, encoding='utf-8')
-    
-    # Convertir a diccionario con tipos correctos
-    config_dict = {
-        # [GENERAL]
-        'nombre_proyecto': config['GENERAL']['nombre_proyecto'],
-        'carpeta_mensajes': config['GENERAL']['carpeta_mensajes'],
-        'navegador': config['GENERAL']['navegador'].lower(),
-        'modo_debug': config['GENERAL']['modo_debug'].lower() == 'si',
-        
-        # [PUBLICACION]
-        'tiempo_entre_intentos': int(config['PUBLICACION']['tiempo_entre_intentos']),
-        'max_intentos_por_publicacion': int(config['PUBLICACION']['max_intentos_por_publicacion']),
-        'espera_despues_publicar': int(config['PUBLICACION']['espera_despues_publicar']),
-        'verificar_publicacion_exitosa': config['PUBLICACION']['verificar_publicacion_exitosa'].lower() == 'si',
-        'espera_estabilizacion_modal': int(config['PUBLICACION']['espera_estabilizacion_modal']),
-        
-        # [LIMITES]
-        'tiempo_minimo_entre_publicaciones_segundos': int(config['LIMITES']['tiempo_minimo_entre_publicaciones_segundos']),
-        'permitir_duplicados': config['LIMITES']['permitir_duplicados'].lower() == 'si',
-        'permitir_forzar_publicacion_manual': config['LIMITES']['permitir_forzar_publicacion_manual'].lower() == 'si',
-        
-        # [MENSAJES]
-        'seleccion': config['MENSAJES']['seleccion'].lower(),
-        'historial_evitar_repetir': int(config['MENSAJES']['historial_evitar_repetir']),
-        'formato_fecha': config['MENSAJES']['formato_fecha'].lower() == 'si',
-        'agregar_hashtags': config['MENSAJES']['agregar_hashtags'].lower() == 'si',
-        'hashtags': config['MENSAJES']['hashtags'],
-        'agregar_firma': config['MENSAJES']['agregar_firma'].lower() == 'si',
-        'texto_firma': config['MENSAJES']['texto_firma'],
-        
-        # [DEBUG]
-        'modo_debug': config['DEBUG']['modo_debug'].lower(),
-        
-        # [NAVEGADOR]
-        'usar_perfil_existente': config['NAVEGADOR']['usar_perfil_existente'].lower() == 'si',
-        'carpeta_perfil_custom': config['NAVEGADOR']['carpeta_perfil_custom'],
-        'desactivar_notificaciones': config['NAVEGADOR']['desactivar_notificaciones'].lower() == 'si',
-        'maximizar_ventana': config['NAVEGADOR']['maximizar_ventana'].lower() == 'si',
-        
-        # [PREDICACIONES]
-        'activar_predicaciones': config['PREDICACIONES']['activar_predicaciones'].lower() == 'si' if config.has_option('PREDICACIONES', 'activar_predicaciones') else False,
-        'alternar_con_predicaciones': config['PREDICACIONES']['alternar_con_predicaciones'].lower() == 'si' if config.has_option('PREDICACIONES', 'alternar_con_predicaciones') else False,
-        'nombre_grupo_whatsapp': config['PREDICACIONES']['nombre_grupo_whatsapp'] if config.has_option('PREDICACIONES', 'nombre_grupo_whatsapp') else 'Prédicas',
-        'mensajes_por_extraccion': int(config['PREDICACIONES']['mensajes_por_extraccion']) if config.has_option('PREDICACIONES', 'mensajes_por_extraccion') else 10,
-        'agregar_introduccion_predica': config['PREDICACIONES']['agregar_introduccion_predica'].lower() == 'si' if config.has_option('PREDICACIONES', 'agregar_introduccion_predica') else True,
-        'texto_introduccion_predica': config['PREDICACIONES']['texto_introduccion_predica'].replace('\\n', '\n') if config.has_option('PREDICACIONES', 'texto_introduccion_predica') else '🎬 Predicación recomendada:\n\n',
-        'agregar_hashtags_predicaciones': config['PREDICACIONES']['agregar_hashtags_predicaciones'].lower() == 'si' if config.has_option('PREDICACIONES', 'agregar_hashtags_predicaciones') else True,
-        'hashtags_predicaciones': config['PREDICACIONES']['hashtags_predicaciones'] if config.has_option('PREDICACIONES', 'hashtags_predicaciones') else '#Predicación,#Fe,#Cristiano'
-    }
+    try:
+        estado = os.stat(archivo_config)
+        firma = (os.path.abspath(archivo_config), estado.st_mtime_ns, estado.st_size)
+    except OSError:
+        firma = None
     
-    return config_dict
+    if firma is None or firma != _config_en_cache['firma']:
+        _config_en_cache['config'] = ConfigGlobal.desde_archivo(archivo_config)
+        _config_en_cache['firma'] = firma
+    
+    return _config_en_cache['config']
 
 
 def crear_config_defecto():
@@ -119,45 +253,51 @@ def verificar_y_crear_estructura():
     return True
 
 
+def _consultar_cola(operacion):
+    """Abre el manifiesto de la cola, ejecuta la operación y lo cierra"""
+    cola = ColaPredicaciones()
+    try:
+        return operacion(cola)
+    finally:
+        cola.cerrar()
+
+
 def contar_predicaciones_pendientes():
     """
     Cuenta cuántas predicaciones hay en cola-facebook/pendientes/
+    (contador del manifiesto de la cola, sin recorrer la carpeta)
     
     Returns:
         int: Número de predicaciones pendientes
     """
-    carpeta = 'cola-facebook/pendientes'
-    
-    if not os.path.exists(carpeta):
+    if not os.path.exists('cola-facebook/pendientes'):
         return 0
     
-    archivos = [f for f in os.listdir(carpeta) 
-               if f.endswith('.txt') and f.startswith('predica-')]
-    
-    return len(archivos)
+    return _consultar_cola(lambda cola: cola.contar('pendiente'))
 
 
 def contar_predicaciones_publicadas():
     """
     Cuenta cuántas predicaciones hay en cola-facebook/publicados/
+    (contador del manifiesto de la cola, sin recorrer la carpeta)
     
     Returns:
         int: Número de predicaciones publicadas
     """
-    carpeta = 'cola-facebook/publicados'
-    
-    if not os.path.exists(carpeta):
+    if not os.path.exists('cola-facebook/publicados'):
         return 0
     
-    archivos = [f for f in os.listdir(carpeta) 
-               if f.endswith('.txt') and f.startswith('predica-')]
-    
-    return len(archivos)
+    return _consultar_cola(lambda cola: cola.contar('publicada'))
 
 
-def obtener_siguiente_predicacion():
+def obtener_siguiente_predicacion(archivo_planificado=None):
     """
-    Obtiene la siguiente predicación pendiente (orden alfabético)
+    Obtiene la siguiente predicación pendiente (orden alfabético,
+    consulta sobre el índice del manifiesto de la cola)
+    
+    Args:
+        archivo_planificado: Predicación elegida por el plan de publicaciones;
+                             si ya no está en pendientes se usa la siguiente
     
     Returns:
         tuple: (ruta_completa, nombre_archivo) o (None, None)
@@ -167,19 +307,18 @@ def obtener_siguiente_predicacion():
     if not os.path.exists(carpeta):
         return None, None
     
-    # Obtener archivos .txt que empiecen con 'predica-'
-    archivos = [f for f in os.listdir(carpeta) 
-               if f.endswith('.txt') and f.startswith('predica-')]
+    if archivo_planificado:
+        ruta_planificada = ruta_archivo(carpeta, archivo_planificado)
+        if os.path.exists(ruta_planificada):
+            return ruta_planificada, archivo_planificado
+        print(f"⚠️  La predicación {archivo_planificado} ya no está pendiente, se usa la siguiente")
     
-    if not archivos:
-        return None, None
+    archivo_siguiente = _consultar_cola(lambda cola: cola.siguiente())
     
-    # Ordenar alfabéticamente (predica-001.txt, predica-002.txt, etc.)
-    archivos.sort()
+    if not archivo_siguiente:
+        return None, None
     
-    # Tomar el primero
-    archivo_siguiente = archivos[0]
-    ruta_completa = os.path.join(carpeta, archivo_siguiente)
+    ruta_completa = ruta_archivo(carpeta, archivo_siguiente)
     
     return ruta_completa, archivo_siguiente
 
@@ -201,25 +340,26 @@ def mover_predicacion_a_publicados(nombre_archivo):
     # Asegurar que existan las carpetas
     os.makedirs(carpeta_publicados, exist_ok=True)
     
-    # Rutas del archivo .txt
-    origen_txt = os.path.join(carpeta_pendientes, nombre_archivo)
-    destino_txt = os.path.join(carpeta_publicados, nombre_archivo)
+    # Ruta del archivo .txt (según la disposición de cada carpeta)
+    origen_txt = ruta_archivo(carpeta_pendientes, nombre_archivo)
     
     try:
         # Mover archivo .txt
         if os.path.exists(origen_txt):
-            shutil.move(origen_txt, destino_txt)
+            shutil.move(origen_txt, preparar_ruta(carpeta_publicados, nombre_archivo))
             print(f"   📦 Movido: {nombre_archivo}")
         
+        # Actualizar el manifiesto de la cola
+        _consultar_cola(lambda cola: cola.marcar_publicada(nombre_archivo))
+        
         # Buscar archivo de imagen asociado (mismo nombre pero .jpg)
         nombre_base = nombre_archivo.replace('.txt', '')
         nombre_imagen = f"{nombre_base}.jpg"
         
-        origen_img = os.path.join(carpeta_pendientes, nombre_imagen)
-        destino_img = os.path.join(carpeta_publicados, nombre_imagen)
+        origen_img = ruta_archivo(carpeta_pendientes, nombre_imagen)
         
         if os.path.exists(origen_img):
-            shutil.move(origen_img, destino_img)
+            shutil.move(origen_img, preparar_ruta(carpeta_publicados, nombre_imagen))
             print(f"   🖼️  Movida imagen: {nombre_imagen}")
         
         return True
@@ -229,84 +369,169 @@ def mover_predicacion_a_publicados(nombre_archivo):
         return False
 
 
-def obtener_mensaje_aleatorio_sin_repetir(registro_publicaciones):
+def abrir_fuente_mensajes(config):
     """
-    Obtiene un mensaje aleatorio evitando los últimos N publicados
+    Fuente de los mensajes para la selección: el paquete de mensajes si
+    está activado (usar_paquete_mensajes) y creado; si no, el catálogo de
+    la carpeta. Las dos tienen la misma interfaz (nombres, leer, siguiente...)
     
-    Args:
-        registro_publicaciones: Diccionario con historial de publicaciones
-        
     Returns:
-        tuple: (contenido_mensaje, nombre_archivo) o (None, None) si no hay mensajes
+        PaqueteMensajes, CatalogoMensajes o None si no existe la carpeta
     """
-    config = leer_config_global()
     carpeta = config['carpeta_mensajes']
     
-    # Verificar que exista la carpeta
-    if not os.path.exists(carpeta):
-        print(f"❌ No existe la carpeta: {carpeta}")
-        return None, None
+    if config['usar_paquete_mensajes'] and existe_paquete(carpeta):
+        return PaqueteMensajes(carpeta)
     
-    # Obtener todos los archivos .txt
-    todos_mensajes = [f for f in os.listdir(carpeta) if f.endswith('.txt')]
+    if not os.path.exists(carpeta):
+        return None
     
-    if not todos_mensajes:
-        print(f"❌ No hay archivos .txt en la carpeta: {carpeta}")
-        return None, None
+    return obtener_catalogo_mensajes(carpeta, completo=config['verificar_ediciones_mensajes'])
+
+
+def cerrar_fuente_mensajes(catalogo):
+    """
+    Libera una fuente abierta con abrir_fuente_mensajes (los mapeos del
+    paquete; en Windows un paquete mapeado no se puede reemplazar)
+    El catálogo de carpeta no deja nada abierto
+    """
+    if isinstance(catalogo, PaqueteMensajes):
+        catalogo.cerrar()
+
+
+def sacar_mensajes_aleatorios(config, catalogo, historial_reciente, cantidad=1):
+    """
+    Saca mensajes de la bolsa aleatoria evitando los últimos N publicados
+    (al empezar ronda) y los casi iguales a ellos. Cada mensaje sacado
+    cuenta como reciente para el siguiente, así se pueden sacar varios
+    de una vez (plan de publicaciones)
     
-    print(f"📦 Total de mensajes disponibles: {len(todos_mensajes)}")
+    Args:
+        config: Configuración global
+        catalogo: Fuente de mensajes (abrir_fuente_mensajes)
+        historial_reciente: Mensajes bíblicos publicados, del más viejo al más nuevo
+        cantidad: Cantidad de mensajes a sacar
     
-    # Obtener historial de últimos N mensajes
-    historial_reciente = registro_publicaciones.get('historial_reciente', [])
+    Returns:
+        list: Nombres sacados (menos que 'cantidad' solo si no hay mensajes)
+    """
+    carpeta = config['carpeta_mensajes']
     limite_historial = config['historial_evitar_repetir']
+    recientes = list(historial_reciente)
+    sacados = []
     
-    # Mensajes bloqueados (últimos N publicados)
-    mensajes_bloqueados = historial_reciente[-limite_historial:] if historial_reciente else []
+    bolsa = BolsaMensajes(carpeta)
+    cambios = bolsa.sincronizar(catalogo)
     
-    # Mensajes disponibles (no están en el historial reciente)
-    mensajes_disponibles = [m for m in todos_mensajes if m not in mensajes_bloqueados]
+    if any(cambios.values()) and config['modo_debug'] in ['detallado', 'completo']:
+        print(f"🃏 Bolsa ajustada: +{cambios['agregados']} -{cambios['eliminados']}")
     
-    print(f"🚫 Mensajes bloqueados (últimos {limite_historial}): {len(mensajes_bloqueados)}")
-    print(f"✅ Mensajes disponibles: {len(mensajes_disponibles)}")
+    # Mensajes casi iguales a los recientes (índice MinHash, sin comparar todo)
+    indice = IndiceSimilitud(carpeta) if config['umbral_similitud'] > 0 else None
     
-    # Si no hay mensajes disponibles, usar todos (caso extremo)
-    if not mensajes_disponibles:
-        print("⚠️  No hay mensajes disponibles. Usando todos los mensajes.")
-        mensajes_disponibles = todos_mensajes
+    try:
+        if indice:
+            indice.sincronizar(catalogo)
+        
+        for _ in range(cantidad):
+            mensajes_recientes = recientes[-limite_historial:] if recientes else []
+            
+            evitar = set()
+            if indice and mensajes_recientes:
+                evitar = indice.similares_a_recientes(mensajes_recientes, config['umbral_similitud'])
+                
+                if evitar and config['modo_debug'] in ['detallado', 'completo']:
+                    print(f"🪞 Mensajes casi iguales a los recientes (se saltean): {len(evitar)}")
+            
+            nombre = bolsa.sacar(mensajes_recientes, evitar)
+            if nombre is None:
+                break
+            
+            sacados.append(nombre)
+            recientes.append(nombre)
+    finally:
+        if indice:
+            indice.cerrar()
     
-    # Mostrar mensajes bloqueados en debug
-    if mensajes_bloqueados and config['modo_debug'] in ['detallado', 'completo']:
-        print(f"\n🚫 Bloqueados actualmente:")
-        for i, msg in enumerate(mensajes_bloqueados, 1):
-            print(f"   {i}. {msg}")
+    bolsa.guardar()
+    print(f"🃏 Ronda {bolsa.ronda}: quedan {len(bolsa)} de {len(catalogo)} mensajes sin usar")
     
-    # Seleccionar uno aleatorio de los disponibles
-    mensaje_seleccionado = random.choice(mensajes_disponibles)
+    return sacados
+
+
+def devolver_mensajes_aleatorios(config, nombres):
+    """
+    Devuelve a la bolsa aleatoria mensajes sacados que no se publicaron
+    (ej: reservados por un plan que se descarta)
+    """
+    bolsa = BolsaMensajes(config['carpeta_mensajes'])
+    bolsa.devolver(nombres)
+    bolsa.guardar()
+
+
+def obtener_mensaje_aleatorio_sin_repetir(registro_publicaciones):
+    """
+    Obtiene un mensaje aleatorio sin repetir hasta agotar todos los mensajes
+    (bolsa barajada y guardada junto a la carpeta de mensajes). Al empezar
+    cada ronda se evitan también los últimos N publicados, y en todo momento
+    los mensajes casi iguales a ellos (umbral_similitud, 0 = desactivado)
+    
+    Args:
+        registro_publicaciones: Diccionario con historial de publicaciones
+        
+    Returns:
+        tuple: (contenido_mensaje, nombre_archivo) o (None, None) si no hay mensajes
+    """
+    config = leer_config_global()
+    carpeta = config['carpeta_mensajes']
     
-    print(f"\n🎲 Mensaje seleccionado: {mensaje_seleccionado}")
+    # Catálogo de mensajes (paquete o carpeta, sin recorrerla si no cambió)
+    catalogo = abrir_fuente_mensajes(config)
     
-    # Leer contenido del mensaje
-    ruta_mensaje = os.path.join(carpeta, mensaje_seleccionado)
     try:
-        with open(ruta_mensaje, 'r', encoding='utf-8') as f:
-            contenido = f.read().strip()
+        if catalogo is None:
+            print(f"❌ No existe la carpeta: {carpeta}")
+            return None, None
         
-        # Aplicar transformaciones según config
-        contenido = aplicar_transformaciones_mensaje(contenido, config)
+        if not len(catalogo):
+            print(f"❌ No hay archivos .txt en la carpeta: {carpeta}")
+            return None, None
         
-        return contenido, mensaje_seleccionado
-    
-    except Exception as e:
-        print(f"❌ Error leyendo mensaje {mensaje_seleccionado}: {e}")
-        return None, None
+        print(f"📦 Total de mensajes disponibles: {len(catalogo)}")
+        
+        # Sacar el siguiente mensaje de la bolsa
+        sacados = sacar_mensajes_aleatorios(config, catalogo, registro_publicaciones.get('historial_reciente', []))
+        mensaje_seleccionado = sacados[0] if sacados else None
+        
+        print(f"\n🎲 Mensaje seleccionado: {mensaje_seleccionado}")
+        
+        # Leer contenido del mensaje
+        try:
+            contenido = catalogo.leer(mensaje_seleccionado).strip()
+            
+            # Aplicar transformaciones según config
+            contenido = aplicar_transformaciones_mensaje(contenido, config)
+            
+            return contenido, mensaje_seleccionado
+        
+        except Exception as e:
+            print(f"❌ Error leyendo mensaje {mensaje_seleccionado}: {e}")
+            return None, None
+    finally:
+        cerrar_fuente_mensajes(catalogo)
 
 
-def obtener_mensaje_secuencial(registro_publicaciones):
+def obtener_mensaje_secuencial(registro_publicaciones, ultimo_biblico=None):
     """
     Obtiene el siguiente mensaje en orden alfabético
+    Parte del cursor secuencial del registro (último bíblico y su posición)
     
     Args:
         registro_publicaciones: Diccionario con historial de publicaciones
+        ultimo_biblico: Último mensaje bíblico publicado, para registros sin
+                        cursor (ej: consultado con
+                        GestorRegistro.obtener_ultima_publicacion). Si no se
+                        indica, se busca en historial_completo
         
     Returns:
         tuple: (contenido_mensaje, nombre_archivo) o (None, None) si no hay mensajes
@@ -314,62 +539,92 @@ def obtener_mensaje_secuencial(registro_publicaciones):
     config = leer_config_global()
     carpeta = config['carpeta_mensajes']
     
-    # Verificar que exista la carpeta
-    if not os.path.exists(carpeta):
-        print(f"❌ No existe la carpeta: {carpeta}")
-        return None, None
-    
-    # Obtener todos los archivos .txt ordenados
-    todos_mensajes = sorted([f for f in os.listdir(carpeta) if f.endswith('.txt')])
-    
-    if not todos_mensajes:
-        print(f"❌ No hay archivos .txt en la carpeta: {carpeta}")
-        return None, None
+    # Catálogo de mensajes (paquete o carpeta, ya ordenado alfabéticamente)
+    catalogo = abrir_fuente_mensajes(config)
     
-    # Obtener el último mensaje publicado
-    historial = registro_publicaciones.get('historial_completo', [])
-    
-    if not historial:
-        # Primera publicación, usar el primero
-        mensaje_seleccionado = todos_mensajes[0]
-    else:
+    try:
+        if catalogo is None:
+            print(f"❌ No existe la carpeta: {carpeta}")
+            return None, None
+        
+        if not len(catalogo):
+            print(f"❌ No hay archivos .txt en la carpeta: {carpeta}")
+            return None, None
+        
+        cursor = registro_publicaciones.get('cursor_secuencial') or {}
+        
         # Obtener el último publicado (solo bíblicos)
-        ultimo_biblico = None
-        for entrada in reversed(historial):
-            if entrada.get('tipo', 'biblico') == 'biblico':
-                ultimo_biblico = entrada.get('mensaje_archivo')
-                break
+        if cursor.get('archivo'):
+            ultimo_biblico = cursor['archivo']
+        elif ultimo_biblico is None:
+            historial = registro_publicaciones.get('historial_completo', [])
+            for entrada in reversed(historial):
+                if entrada.get('tipo', 'biblico') == 'biblico':
+                    ultimo_biblico = entrada.get('mensaje_archivo')
+                    break
         
         if not ultimo_biblico:
-            # No hay bíblicos previos, empezar desde el primero
-            mensaje_seleccionado = todos_mensajes[0]
+            # Primera publicación o sin bíblicos previos, empezar desde el primero
+            mensaje_seleccionado = catalogo.nombres[0]
         else:
-            try:
-                # Encontrar índice del último publicado
-                indice_actual = todos_mensajes.index(ultimo_biblico)
-                # Siguiente mensaje (con rotación)
-                indice_siguiente = (indice_actual + 1) % len(todos_mensajes)
-                mensaje_seleccionado = todos_mensajes[indice_siguiente]
-            except ValueError:
-                # Si el último publicado no existe, empezar desde el primero
-                mensaje_seleccionado = todos_mensajes[0]
-    
-    print(f"📋 Mensaje secuencial seleccionado: {mensaje_seleccionado}")
-    
-    # Leer contenido
-    ruta_mensaje = os.path.join(carpeta, mensaje_seleccionado)
-    try:
-        with open(ruta_mensaje, 'r', encoding='utf-8') as f:
-            contenido = f.read().strip()
+            # Siguiente en orden alfabético (con rotación): directo desde la posición
+            # del cursor, o por búsqueda binaria si la carpeta cambió antes de él.
+            # Si el último publicado ya no existe se continúa desde donde estaría
+            mensaje_seleccionado = catalogo.siguiente_desde_cursor(ultimo_biblico, cursor.get('posicion'))
+        
+        print(f"📋 Mensaje secuencial seleccionado: {mensaje_seleccionado}")
         
-        # Aplicar transformaciones
-        contenido = aplicar_transformaciones_mensaje(contenido, config)
+        # Leer contenido
+        try:
+            contenido = catalogo.leer(mensaje_seleccionado).strip()
+            
+            # Aplicar transformaciones
+            contenido = aplicar_transformaciones_mensaje(contenido, config)
+            
+            return contenido, mensaje_seleccionado
         
-        return contenido, mensaje_seleccionado
+        except Exception as e:
+            print(f"❌ Error leyendo mensaje {mensaje_seleccionado}: {e}")
+            return None, None
+    finally:
+        cerrar_fuente_mensajes(catalogo)
+
+
+def obtener_mensaje_por_nombre(nombre_archivo):
+    """
+    Lee un mensaje bíblico ya elegido (ej: por el plan de publicaciones)
     
-    except Exception as e:
-        print(f"❌ Error leyendo mensaje {mensaje_seleccionado}: {e}")
-        return None, None
+    Returns:
+        tuple: (contenido_mensaje, nombre_archivo) o (None, None) si no existe
+    """
+    config = leer_config_global()
+    catalogo = abrir_fuente_mensajes(config)
+    
+    try:
+        if catalogo is None or nombre_archivo not in catalogo:
+            print(f"❌ El mensaje {nombre_archivo} ya no existe")
+            return None, None
+        
+        contenido = catalogo.leer(nombre_archivo).strip()
+        return aplicar_transformaciones_mensaje(contenido, config), nombre_archivo
+    finally:
+        cerrar_fuente_mensajes(catalogo)
+
+
+def obtener_posicion_mensaje(nombre_archivo):
+    """
+    Posición de un mensaje en el orden alfabético del catálogo
+    (se guarda en el cursor secuencial al registrar la publicación)
+    
+    Returns:
+        int o None si el mensaje no está en el catálogo
+    """
+    catalogo = abrir_fuente_mensajes(leer_config_global())
+    
+    try:
+        return catalogo.posicion(nombre_archivo) if catalogo is not None else None
+    finally:
+        cerrar_fuente_mensajes(catalogo)
 
 
 def aplicar_transformaciones_mensaje(contenido, config):
@@ -466,20 +721,21 @@ def obtener_estadisticas_mensajes():
     """
     config = leer_config_global()
     carpeta = config['carpeta_mensajes']
+    catalogo = abrir_fuente_mensajes(config)
     
-    if not os.path.exists(carpeta):
+    try:
+        if catalogo is None:
+            return {
+                'total_mensajes': 0,
+                'mensajes_validos': [],
+                'existe_carpeta': False
+            }
+        
         return {
-            'total_mensajes': 0,
-            'mensajes_validos': [],
-            'existe_carpeta': False
+            'total_mensajes': len(catalogo),
+            'mensajes_validos': list(catalogo.nombres),
+            'existe_carpeta': True,
+            'ruta_carpeta': os.path.abspath(carpeta)
         }
-    
-    todos_archivos = os.listdir(carpeta)
-    mensajes_txt = [f for f in todos_archivos if f.endswith('.txt')]
-    
-    return {
-        'total_mensajes': len(mensajes_txt),
-        'mensajes_validos': sorted(mensajes_txt),
-        'existe_carpeta': True,
-        'ruta_carpeta': os.path.abspath(carpeta)
-    }
+    finally:
+        cerrar_fuente_mensajes(catalogo)
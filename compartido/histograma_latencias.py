@@ -0,0 +1,103 @@
+"""
+Histograma de latencias de tamaño fijo
+Cubetas geométricas (cada límite es 25% mayor que el anterior) desde 0.5s
+hasta ~1 hora, más una cubeta de desborde. Se guarda como una lista de
+conteos dentro del registro y se actualiza en memoria constante. Junto al
+histograma se puede guardar el máximo observado para acotar los percentiles
+altos, que de otro modo caerían en el límite superior de su cubeta.
+"""
+
+import bisect
+import math
+
+
+LIMITES_CUBETAS = tuple(round(0.5 * 1.25 ** i, 3) for i in range(41))
+
+
+def histograma_vacio():
+    """Lista de conteos para todas las cubetas (la última es el desborde)"""
+    return [0] * (len(LIMITES_CUBETAS) + 1)
+
+
+def registrar_latencia(histograma, segundos):
+    """Suma una medición a la cubeta que le corresponde"""
+    histograma[bisect.bisect_left(LIMITES_CUBETAS, segundos)] += 1
+
+
+def combinar_histogramas(histogramas):
+    """Suma varios histogramas en uno nuevo"""
+    combinado = histograma_vacio()
+    for histograma in histogramas:
+        for posicion, conteo in enumerate(histograma):
+            combinado[posicion] += conteo
+    return combinado
+
+
+def calcular_percentil(histograma, percentil, maximo=None):
+    """
+    Estima un percentil interpolando linealmente dentro de su cubeta
+    
+    Suponer las muestras repartidas de forma uniforme entre los límites de
+    la cubeta evita que p90 y p99 caigan siempre en el mismo límite superior
+    cuando comparten cubeta.
+    
+    Args:
+        histograma: Lista de conteos
+        percentil: Valor entre 0 y 100
+        maximo: Mayor medición observada (opcional); el resultado nunca lo supera
+    
+    Returns:
+        float o None si el histograma está vacío
+    """
+    total = sum(histograma)
+    if total == 0:
+        return None
+    
+    objetivo = max(1, math.ceil(total * percentil / 100))
+    acumulado = 0
+    valor = LIMITES_CUBETAS[-1]
+    
+    for posicion, conteo in enumerate(histograma):
+        if acumulado + conteo >= objetivo:
+            if posicion >= len(LIMITES_CUBETAS):
+                # Cubeta de desborde: sin límite superior, solo el máximo sirve
+                valor = maximo if maximo is not None else LIMITES_CUBETAS[-1]
+                break
+            
+            inferior = LIMITES_CUBETAS[posicion - 1] if posicion > 0 else 0.0
+            superior = LIMITES_CUBETAS[posicion]
+            if maximo is not None and inferior < maximo < superior:
+                # La cubeta del máximo solo llega hasta el máximo observado
+                superior = maximo
+            valor = inferior + (superior - inferior) * (objetivo - acumulado) / conteo
+            break
+        acumulado += conteo
+    
+    if maximo is not None:
+        valor = min(valor, maximo)
+    
+    return round(valor, 3)
+
+
+def registrar_maximo(maximo, segundos):
+    """Devuelve el nuevo máximo observado tras una medición"""
+    return segundos if maximo is None else max(maximo, segundos)
+
+
+def resumir_percentiles(histograma, maximo=None):
+    """
+    Percentiles p50, p90 y p99 de un histograma
+    
+    Args:
+        histograma: Lista de conteos
+        maximo: Mayor medición observada (opcional)
+    
+    Returns:
+        dict: {'p50': s, 'p90': s, 'p99': s, 'muestras': n}
+    """
+    return {
+        'p50': calcular_percentil(histograma, 50, maximo),
+        'p90': calcular_percentil(histograma, 90, maximo),
+        'p99': calcular_percentil(histograma, 99, maximo),
+        'muestras': sum(histograma)
+    }
@@ -0,0 +1,225 @@
+"""
+Importador masivo de mensajes (biblias, devocionales...)
+Lee el archivo de origen por partes, sin cargarlo entero en memoria:
+- texto: pasajes separados por una línea separadora (por defecto '---';
+  con separador vacío, por líneas en blanco)
+- csv: una columna con el texto (por defecto 'texto', con encabezado)
+- jsonl: un objeto JSON por línea con el texto en un campo (por defecto 'texto')
+Cada pasaje se descarta si su hash de texto ya está en el catálogo (o ya
+apareció en la misma importación), y se escribe como <prefijo>-NNNNNN.txt
+en la carpeta de mensajes. El catálogo se actualiza por lotes con los
+hashes ya calculados, sin volver a leer los archivos.
+"""
+
+import os
+import re
+import csv
+import sys
+import json
+
+from compartido.catalogo_mensajes import CatalogoMensajes, calcular_hash_texto
+from compartido.disposicion_carpetas import preparar_ruta
+from compartido.paquete_mensajes import importar_carpeta
+
+
+MENSAJES_POR_LOTE = 500
+DIGITOS_NUMERO = 6
+FORMATOS = {'.txt': 'texto', '.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+
+def leer_pasajes_texto(archivo, separador='---'):
+    """
+    Pasajes de un archivo de texto, separados por una línea separadora
+    
+    Yields:
+        str: Texto de cada pasaje
+    """
+    lineas = []
+    
+    with open(archivo, 'r', encoding='utf-8-sig') as f:
+        for linea in f:
+            if linea.strip() == separador:
+                if lineas:
+                    yield ''.join(lineas)
+                lineas = []
+            else:
+                lineas.append(linea)
+    
+    if lineas:
+        yield ''.join(lineas)
+
+
+def leer_pasajes_csv(archivo, columna='texto'):
+    """
+    Pasajes de un CSV con encabezado (una fila por pasaje)
+    
+    Yields:
+        str: Texto de la columna indicada
+    """
+    with open(archivo, 'r', encoding='utf-8-sig', newline='') as f:
+        lector = csv.DictReader(f)
+        
+        if columna not in (lector.fieldnames or []):
+            raise ValueError(f"El CSV no tiene la columna '{columna}'")
+        
+        for fila in lector:
+            yield fila[columna] or ''
+
+
+def leer_pasajes_jsonl(archivo, campo='texto'):
+    """
+    Pasajes de un archivo JSON lines (un objeto por línea)
+    
+    Yields:
+        str: Texto del campo indicado
+    """
+    with open(archivo, 'r', encoding='utf-8-sig') as f:
+        for numero_linea, linea in enumerate(f, 1):
+            if not linea.strip():
+                continue
+            
+            try:
+                objeto = json.loads(linea)
+            except ValueError:
+                print(f"⚠️  Línea {numero_linea} ignorada: JSON inválido")
+                continue
+            
+            yield str(objeto.get(campo) or '')
+
+
+def prefijo_desde_archivo(archivo):
+    """Prefijo de nombres a partir del nombre del archivo de origen (rvr1960.csv → rvr1960)"""
+    base = os.path.splitext(os.path.basename(archivo))[0].lower()
+    return re.sub(r'[^a-z0-9]+', '-', base).strip('-') or 'mensaje'
+
+
+def importar_mensajes(archivo, carpeta, formato=None, separador='---', campo='texto', prefijo=None):
+    """
+    Importa los pasajes de un archivo a la carpeta de mensajes
+    
+    Args:
+        archivo: Archivo de origen
+        carpeta: Carpeta de mensajes destino
+        formato: 'texto', 'csv' o 'jsonl' (None = según la extensión)
+        separador: Línea que separa pasajes (formato texto)
+        campo: Columna (csv) o campo (jsonl) con el texto
+        prefijo: Prefijo de los nombres (None = nombre del archivo de origen)
+    
+    Returns:
+        dict: {'leidos': n, 'importados': n, 'duplicados': n, 'vacios': n}
+    """
+    formato = formato or FORMATOS.get(os.path.splitext(archivo)[1].lower(), 'texto')
+    prefijo = prefijo or prefijo_desde_archivo(archivo)
+    
+    if formato == 'csv':
+        pasajes = leer_pasajes_csv(archivo, campo)
+    elif formato == 'jsonl':
+        pasajes = leer_pasajes_jsonl(archivo, campo)
+    else:
+        pasajes = leer_pasajes_texto(archivo, separador)
+    
+    os.makedirs(carpeta, exist_ok=True)
+    catalogo = CatalogoMensajes(carpeta)
+    catalogo.actualizar()
+    
+    hashes = catalogo.hashes()
+    patron_numero = re.compile(rf'^{re.escape(prefijo)}-(\d+)\.txt$')
+    numero = max(
+        (int(coincidencia.group(1)) for coincidencia in map(patron_numero.match, catalogo.nombres) if coincidencia),
+        default=0
+    )
+    
+    resultado = {'leidos': 0, 'importados': 0, 'duplicados': 0, 'vacios': 0}
+    lote = []
+    
+    def escribir_lote():
+        for nombre, ruta, texto, _ in lote:
+            with open(ruta, 'w', encoding='utf-8') as f:
+                f.write(texto)
+        catalogo.agregar_entradas((nombre, ruta, hash_texto) for nombre, ruta, _, hash_texto in lote)
+        resultado['importados'] += len(lote)
+        lote.clear()
+        print(f"   💾 {resultado['importados']} mensajes importados ({resultado['duplicados']} duplicados)")
+    
+    for texto in pasajes:
+        resultado['leidos'] += 1
+        texto = texto.strip()
+        
+        if not texto:
+            resultado['vacios'] += 1
+            continue
+        
+        hash_texto = calcular_hash_texto(texto)
+        if hash_texto in hashes:
+            resultado['duplicados'] += 1
+            continue
+        hashes.add(hash_texto)
+        
+        numero += 1
+        nombre = f"{prefijo}-{numero:0{DIGITOS_NUMERO}d}.txt"
+        lote.append((nombre, preparar_ruta(carpeta, nombre), texto, hash_texto))
+        
+        if len(lote) >= MENSAJES_POR_LOTE:
+            escribir_lote()
+    
+    if lote:
+        escribir_lote()
+    
+    # Sincronizar las fechas de carpeta con lo escrito (no relee los archivos)
+    catalogo.actualizar()
+    catalogo.guardar()
+    
+    return resultado
+
+
+def main():
+    """
+    Importa un archivo de pasajes a la carpeta de mensajes
+    Uso: py -m compartido.importador_mensajes ARCHIVO [--formato texto|csv|jsonl]
+         [--separador ---] [--campo texto] [--prefijo nombre] [--carpeta mensajes]
+    """
+    from compartido.gestor_archivos import leer_config_global
+    
+    argumentos = sys.argv[1:]
+    opciones = {}
+    posicionales = []
+    
+    while argumentos:
+        argumento = argumentos.pop(0)
+        if argumento.startswith('--') and argumentos:
+            opciones[argumento[2:]] = argumentos.pop(0)
+        else:
+            posicionales.append(argumento)
+    
+    if not posicionales:
+        print(main.__doc__)
+        return
+    
+    config = leer_config_global()
+    carpeta = opciones.get('carpeta', config['carpeta_mensajes'])
+    archivo = posicionales[0]
+    
+    print(f"📥 Importando {archivo} → {carpeta}/")
+    
+    resultado = importar_mensajes(
+        archivo,
+        carpeta,
+        formato=opciones.get('formato'),
+        separador=opciones.get('separador', '---'),
+        campo=opciones.get('campo', 'texto'),
+        prefijo=opciones.get('prefijo')
+    )
+    
+    print(f"\n✅ Pasajes leídos: {resultado['leidos']}")
+    print(f"   Importados: {resultado['importados']}")
+    print(f"   Duplicados descartados: {resultado['duplicados']}")
+    print(f"   Vacíos: {resultado['vacios']}")
+    
+    # Si se publica desde el paquete, regenerarlo con los mensajes nuevos
+    if resultado['importados'] and config['usar_paquete_mensajes']:
+        cantidad = importar_carpeta(carpeta)
+        print(f"📦 Paquete de mensajes regenerado ({cantidad} mensajes)")
+
+
+if __name__ == "__main__":
+    main()
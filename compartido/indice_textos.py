@@ -0,0 +1,351 @@
+"""
+Índice de búsqueda de texto sobre los mensajes y el historial de publicaciones
+Índice invertido en SQLite (indice_textos.db): cada palabra, en minúsculas
+y sin acentos ("Fé" y "fe" son la misma), apunta a los documentos que la
+contienen. Documentos:
+- mensaje: cada archivo de la carpeta de mensajes (se reindexan solo los
+  que cambiaron de hash, y solo si el catálogo cambió)
+- historial: cada publicación registrada (vista previa + archivo); se
+  indexan solo las posteriores a la última ya indexada
+Una búsqueda es la intersección de las listas de cada palabra, sin leer
+ningún archivo de mensajes ni el registro.
+"""
+
+import re
+import sys
+import sqlite3
+import unicodedata
+
+
+ARCHIVO_INDICE = "indice_textos.db"
+PATRON_PALABRA = re.compile(r'\w+')
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS estado (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+
+CREATE TABLE IF NOT EXISTS documentos (
+    id INTEGER PRIMARY KEY,
+    origen TEXT NOT NULL,
+    clave TEXT NOT NULL,
+    archivo TEXT,
+    fecha TEXT,
+    hash TEXT,
+    resumen TEXT,
+    terminos TEXT,
+    UNIQUE (origen, clave)
+);
+CREATE INDEX IF NOT EXISTS idx_documentos_archivo ON documentos (origen, archivo);
+
+CREATE TABLE IF NOT EXISTS terminos (
+    termino TEXT NOT NULL,
+    documento INTEGER NOT NULL,
+    PRIMARY KEY (termino, documento)
+) WITHOUT ROWID;
+"""
+
+
+def tokenizar(texto):
+    """
+    Palabras de un texto en minúsculas y sin acentos (la ñ queda como n)
+    
+    Returns:
+        list: Palabras en el orden en que aparecen
+    """
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    texto = ''.join(caracter for caracter in texto if not unicodedata.combining(caracter))
+    return PATRON_PALABRA.findall(texto)
+
+
+class IndiceTextos:
+    """
+    Índice invertido persistente de mensajes e historial
+    """
+    
+    def __init__(self, archivo_indice=ARCHIVO_INDICE):
+        self.archivo_indice = archivo_indice
+        
+        self.conexion = sqlite3.connect(archivo_indice)
+        self.conexion.row_factory = sqlite3.Row
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.executescript(ESQUEMA)
+    
+    def _leer_estado(self, clave):
+        fila = self.conexion.execute("SELECT valor FROM estado WHERE clave = ?", (clave,)).fetchone()
+        return fila['valor'] if fila else None
+    
+    def _guardar_estado(self, clave, valor):
+        self.conexion.execute(
+            "INSERT OR REPLACE INTO estado (clave, valor) VALUES (?, ?)", (clave, str(valor))
+        )
+    
+    def _agregar_documento(self, origen, clave, texto, archivo=None, fecha=None, hash_texto=None):
+        """Inserta un documento y sus términos (dentro de la transacción actual)"""
+        terminos = sorted(set(tokenizar(f"{archivo or ''} {texto}")))
+        resumen = ' '.join(texto.split())[:100]
+        
+        cursor = self.conexion.execute(
+            "INSERT INTO documentos (origen, clave, archivo, fecha, hash, resumen, terminos) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (origen, clave, archivo, fecha, hash_texto, resumen, ' '.join(terminos))
+        )
+        self.conexion.executemany(
+            "INSERT OR IGNORE INTO terminos (termino, documento) VALUES (?, ?)",
+            [(termino, cursor.lastrowid) for termino in terminos]
+        )
+    
+    def _quitar_documento(self, id_documento, terminos):
+        """Quita un documento y sus términos (por clave primaria, sin recorrer)"""
+        self.conexion.executemany(
+            "DELETE FROM terminos WHERE termino = ? AND documento = ?",
+            [(termino, id_documento) for termino in terminos.split()]
+        )
+        self.conexion.execute("DELETE FROM documentos WHERE id = ?", (id_documento,))
+    
+    def actualizar_mensajes(self, catalogo):
+        """
+        Indexa los mensajes nuevos o modificados y quita los eliminados
+        Solo compara con el catálogo si este cambió desde la última vez
+        
+        Args:
+            catalogo: CatalogoMensajes o PaqueteMensajes
+        
+        Returns:
+            dict: {'agregados': n, 'eliminados': n}
+        """
+        cambios = {'agregados': 0, 'eliminados': 0}
+        
+        if self._leer_estado('mtime_catalogo') == str(catalogo.mtime_carpeta):
+            return cambios
+        
+        indexados = {
+            fila['clave']: fila
+            for fila in self.conexion.execute(
+                "SELECT id, clave, hash, terminos FROM documentos WHERE origen = 'mensaje'"
+            )
+        }
+        
+        with self.conexion:
+            for nombre, fila in indexados.items():
+                if nombre not in catalogo:
+                    self._quitar_documento(fila['id'], fila['terminos'])
+                    cambios['eliminados'] += 1
+            
+            for nombre in catalogo.nombres:
+                hash_texto = catalogo.hash_de(nombre)
+                fila = indexados.get(nombre)
+                
+                if fila is not None:
+                    if fila['hash'] == hash_texto:
+                        continue
+                    self._quitar_documento(fila['id'], fila['terminos'])
+                
+                self._agregar_documento('mensaje', nombre, catalogo.leer(nombre), archivo=nombre, hash_texto=hash_texto)
+                cambios['agregados'] += 1
+            
+            self._guardar_estado('mtime_catalogo', catalogo.mtime_carpeta)
+        
+        return cambios
+    
+    def actualizar_historial(self, gestor):
+        """
+        Indexa las publicaciones registradas después de la última indexada
+        La primera vez incluye también el historial archivado; después solo
+        se lee el historial desde la última fecha indexada
+        
+        Args:
+            gestor: GestorRegistro
+        
+        Returns:
+            int: Publicaciones agregadas
+        """
+        ultima_fecha = self._leer_estado('fecha_historial')
+        
+        if ultima_fecha:
+            entradas = list(gestor.iterar_historial_desde(ultima_fecha))
+        else:
+            entradas = gestor.consultar_archivo('publicaciones') + gestor.obtener_historial_completo()
+        
+        if not entradas:
+            return 0
+        
+        agregadas = 0
+        with self.conexion:
+            for entrada in entradas:
+                fecha = entrada.get('fecha', '')
+                archivo = entrada.get('mensaje_archivo', '')
+                
+                existe = self.conexion.execute(
+                    "SELECT 1 FROM documentos WHERE origen = 'historial' AND clave = ?", (f"{fecha}|{archivo}",)
+                ).fetchone()
+                if existe:
+                    continue
+                
+                self._agregar_documento(
+                    'historial', f"{fecha}|{archivo}", entrada.get('contenido_preview', ''),
+                    archivo=archivo, fecha=fecha
+                )
+                agregadas += 1
+            
+            self._guardar_estado('fecha_historial', max(entrada.get('fecha', '') for entrada in entradas))
+        
+        return agregadas
+    
+    def buscar(self, consulta, origen=None, desde=None, hasta=None, limite=20):
+        """
+        Busca documentos que contengan todas las palabras de la consulta
+        Una palabra terminada en * busca por prefijo (salm* → salmo, salmos)
+        Una publicación coincide también si el mensaje publicado coincide
+        (así "salmo 23" encuentra publicaciones cuya vista previa no lo dice)
+        
+        Args:
+            consulta: Palabras a buscar (sin distinguir acentos ni mayúsculas)
+            origen: 'mensaje', 'historial' o None para ambos
+            desde: Fecha mínima AAAA-MM-DD (solo historial)
+            hasta: Fecha máxima AAAA-MM-DD (solo historial, inclusive)
+            limite: Máximo de resultados
+        
+        Returns:
+            list: Diccionarios {origen, archivo, fecha, resumen}
+        """
+        subconsultas = []
+        parametros = []
+        
+        for palabra in consulta.split():
+            prefijo = palabra.endswith('*')
+            terminos = tokenizar(palabra)
+            
+            for i, termino in enumerate(terminos):
+                if prefijo and i == len(terminos) - 1:
+                    subconsultas.append("SELECT documento FROM terminos WHERE termino >= ? AND termino < ?")
+                    parametros += [termino, termino + '\uffff']
+                else:
+                    subconsultas.append("SELECT documento FROM terminos WHERE termino = ?")
+                    parametros.append(termino)
+        
+        if not subconsultas:
+            return []
+        
+        condiciones = []
+        
+        if origen == 'mensaje':
+            condiciones.append("d.origen = 'mensaje' AND d.id IN coincidentes")
+        else:
+            condicion = (
+                "(d.origen = 'historial' AND (d.id IN coincidentes OR d.archivo IN ("
+                "SELECT archivo FROM documentos WHERE origen = 'mensaje' AND id IN coincidentes)))"
+            )
+            if origen is None:
+                condicion = f"({condicion} OR (d.origen = 'mensaje' AND d.id IN coincidentes))"
+            condiciones.append(condicion)
+        
+        filtros_fecha = []
+        if desde:
+            filtros_fecha.append("d.fecha >= ?")
+        if hasta:
+            filtros_fecha.append("d.fecha < ?")
+        if filtros_fecha:
+            condiciones.append(f"(d.origen = 'mensaje' OR ({' AND '.join(filtros_fecha)}))")
+        
+        sql = (
+            f"WITH coincidentes AS ({' INTERSECT '.join(subconsultas)}) "
+            f"SELECT d.origen, d.archivo, d.fecha, d.resumen FROM documentos d WHERE {' AND '.join(condiciones)} "
+            f"ORDER BY d.origen = 'mensaje', d.fecha DESC, d.archivo LIMIT ?"
+        )
+        
+        parametros += [fecha for fecha in (desde, f"{hasta}~" if hasta else None) if fecha]
+        parametros.append(limite)
+        
+        return [dict(fila) for fila in self.conexion.execute(sql, parametros)]
+    
+    def contar(self):
+        """Cantidad de documentos indexados por origen"""
+        return dict(self.conexion.execute("SELECT origen, COUNT(*) FROM documentos GROUP BY origen").fetchall())
+    
+    def reconstruir(self):
+        """Vacía el índice (se vuelve a llenar en la próxima actualización)"""
+        with self.conexion:
+            self.conexion.execute("DELETE FROM terminos")
+            self.conexion.execute("DELETE FROM documentos")
+            self.conexion.execute("DELETE FROM estado")
+    
+    def cerrar(self):
+        """Cierra la conexión"""
+        self.conexion.close()
+
+
+def main():
+    """
+    Busca en los mensajes y en el historial de publicaciones
+    Uso: py -m compartido.indice_textos "salmo 23" [--mensajes | --historial]
+         [--mes AAAA-MM] [--desde AAAA-MM-DD] [--hasta AAAA-MM-DD] [--limite 20]
+         py -m compartido.indice_textos --reconstruir
+    """
+    from gestor_registro import GestorRegistro
+    from compartido.gestor_archivos import leer_config_global, abrir_fuente_mensajes, cerrar_fuente_mensajes
+    
+    argumentos = sys.argv[1:]
+    opciones = {}
+    palabras = []
+    
+    while argumentos:
+        argumento = argumentos.pop(0)
+        if argumento in ('--mensajes', '--historial', '--reconstruir'):
+            opciones[argumento[2:]] = True
+        elif argumento.startswith('--') and argumentos:
+            opciones[argumento[2:]] = argumentos.pop(0)
+        else:
+            palabras.append(argumento)
+    
+    if not palabras and not opciones.get('reconstruir'):
+        print(main.__doc__)
+        return
+    
+    indice = IndiceTextos()
+    
+    try:
+        if opciones.get('reconstruir'):
+            indice.reconstruir()
+        
+        # Poner al día el índice (solo lo que cambió)
+        catalogo = abrir_fuente_mensajes(leer_config_global())
+        if catalogo is not None:
+            try:
+                cambios = indice.actualizar_mensajes(catalogo)
+            finally:
+                cerrar_fuente_mensajes(catalogo)
+            if any(cambios.values()):
+                print(f"🔎 Mensajes indexados: +{cambios['agregados']} -{cambios['eliminados']}")
+        
+        if GestorRegistro.existe_registro():
+            agregadas = indice.actualizar_historial(GestorRegistro())
+            if agregadas:
+                print(f"🔎 Publicaciones indexadas: +{agregadas}")
+        
+        if not palabras:
+            print(f"✅ Índice reconstruido: {indice.contar()}")
+            return
+        
+        desde, hasta = opciones.get('desde'), opciones.get('hasta')
+        if opciones.get('mes'):
+            desde, hasta = f"{opciones['mes']}-01", f"{opciones['mes']}-31"
+        
+        origen = 'mensaje' if opciones.get('mensajes') else 'historial' if opciones.get('historial') else None
+        consulta = ' '.join(palabras)
+        resultados = indice.buscar(consulta, origen, desde, hasta, int(opciones.get('limite', 20)))
+        
+        print(f"\n🔎 \"{consulta}\": {len(resultados)} resultados")
+        for resultado in resultados:
+            if resultado['origen'] == 'historial':
+                print(f"   📅 {resultado['fecha']} | {resultado['archivo']} | {resultado['resumen'][:60]}")
+            else:
+                print(f"   📄 {resultado['archivo']} | {resultado['resumen'][:60]}")
+    
+    finally:
+        indice.cerrar()
+
+
+if __name__ == "__main__":
+    main()
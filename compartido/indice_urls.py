@@ -0,0 +1,293 @@
+"""
+Índice persistente de URLs publicadas
+- <base>.urls: lista de URLs, una por línea, solo se agrega al final
+- <base>.idx: tabla hash en disco (direccionamiento abierto) con el resumen
+  de 16 bytes de cada URL; contiene() lee una o dos ranuras sin cargar nada
+El .idx se reconstruye desde el .urls si falta o está dañado
+Las URLs se guardan y comparan en forma canónica (urls_predicaciones)
+"""
+
+import io
+import os
+import json
+import struct
+import hashlib
+
+from compartido.urls_predicaciones import canonicalizar_url
+
+
+MAGIA_INDICE = b'IURL'
+CABECERA_INDICE = struct.Struct('<4sQQ')  # magia, capacidad, cantidad
+TAMANO_RANURA = 16
+RANURA_VACIA = bytes(TAMANO_RANURA)
+CAPACIDAD_INICIAL = 1024
+CARGA_MAXIMA = 0.5
+
+
+def _resumen_url(url):
+    """Resumen de 16 bytes de una URL (nunca igual a la ranura vacía)"""
+    resumen = hashlib.blake2b(url.encode('utf-8'), digest_size=TAMANO_RANURA).digest()
+    return resumen if resumen != RANURA_VACIA else b'\x01' + resumen[1:]
+
+
+class IndiceURLs:
+    """
+    Conjunto de URLs guardado en disco
+    Pertenencia y alta en tiempo constante, sin importar cuántas URLs haya
+    """
+    
+    def __init__(self, archivo_urls, archivo_indice, normalizar=None):
+        self.archivo_urls = archivo_urls
+        self.archivo_indice = archivo_indice
+        self.normalizar = normalizar or (lambda url: url)
+        
+        carpeta = os.path.dirname(archivo_urls)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        
+        if not self._indice_valido():
+            self.reconstruir()
+    
+    def _indice_valido(self):
+        """Verifica la cabecera y el tamaño del archivo de índice"""
+        if not os.path.exists(self.archivo_indice):
+            return False
+        
+        try:
+            capacidad, _ = self._leer_cabecera()
+        except (ValueError, struct.error):
+            return False
+        
+        return os.path.getsize(self.archivo_indice) == CABECERA_INDICE.size + capacidad * TAMANO_RANURA
+    
+    def _leer_cabecera(self):
+        """Lee capacidad y cantidad del índice"""
+        with open(self.archivo_indice, 'rb') as f:
+            magia, capacidad, cantidad = CABECERA_INDICE.unpack(f.read(CABECERA_INDICE.size))
+        
+        if magia != MAGIA_INDICE or capacidad == 0:
+            raise ValueError("Índice de URLs inválido")
+        
+        return capacidad, cantidad
+    
+    @staticmethod
+    def _buscar_ranura(archivo, capacidad, resumen):
+        """
+        Busca la ranura de un resumen con sondeo lineal
+        
+        Returns:
+            tuple: (posición, True si ya estaba)
+        """
+        posicion = int.from_bytes(resumen[:8], 'little') % capacidad
+        
+        while True:
+            archivo.seek(CABECERA_INDICE.size + posicion * TAMANO_RANURA)
+            ranura = archivo.read(TAMANO_RANURA)
+            
+            if ranura == resumen:
+                return posicion, True
+            if ranura == RANURA_VACIA:
+                return posicion, False
+            
+            posicion = (posicion + 1) % capacidad
+    
+    def contiene(self, url):
+        """Indica si la URL ya está en el índice"""
+        resumen = _resumen_url(self.normalizar(url))
+        
+        with open(self.archivo_indice, 'rb') as f:
+            _, capacidad, _ = CABECERA_INDICE.unpack(f.read(CABECERA_INDICE.size))
+            return self._buscar_ranura(f, capacidad, resumen)[1]
+    
+    def __contains__(self, url):
+        return self.contiene(url)
+    
+    def __len__(self):
+        return self._leer_cabecera()[1]
+    
+    def instantanea(self):
+        """
+        Copia en memoria de la tabla de resúmenes (16 bytes por ranura, no
+        las URLs) para hacer muchas consultas sin leer el disco
+        No ve las URLs agregadas después de tomarla
+        
+        Returns:
+            InstantaneaURLs
+        """
+        with open(self.archivo_indice, 'rb') as f:
+            return InstantaneaURLs(f.read(), self.normalizar)
+    
+    def agregar(self, url):
+        """
+        Agrega una URL si no estaba
+        
+        Returns:
+            bool: True si se agregó, False si ya existía
+        """
+        url = self.normalizar(url)
+        resumen = _resumen_url(url)
+        capacidad, cantidad = self._leer_cabecera()
+        
+        # Crecer antes de superar la carga máxima (costo amortizado constante)
+        if cantidad + 1 > capacidad * CARGA_MAXIMA:
+            if self.contiene(url):
+                return False
+            self._escribir_url(url)
+            self.reconstruir(capacidad * 2)
+            return True
+        
+        with open(self.archivo_indice, 'r+b') as f:
+            posicion, existe = self._buscar_ranura(f, capacidad, resumen)
+            if existe:
+                return False
+            
+            # El .urls es la referencia: se escribe antes que el índice
+            self._escribir_url(url)
+            
+            f.seek(CABECERA_INDICE.size + posicion * TAMANO_RANURA)
+            f.write(resumen)
+            f.seek(0)
+            f.write(CABECERA_INDICE.pack(MAGIA_INDICE, capacidad, cantidad + 1))
+        
+        return True
+    
+    def _escribir_url(self, url):
+        """Agrega una URL al final del archivo .urls"""
+        with open(self.archivo_urls, 'a', encoding='utf-8') as f:
+            f.write(url + "\n")
+    
+    def iterar(self):
+        """Recorre las URLs en orden de alta"""
+        if not os.path.exists(self.archivo_urls):
+            return
+        
+        with open(self.archivo_urls, 'r', encoding='utf-8') as f:
+            for linea in f:
+                url = linea.strip()
+                if url:
+                    yield url
+    
+    def renormalizar(self):
+        """
+        Reescribe el .urls aplicando la normalización actual a cada URL
+        (quitando las que pasan a ser repetidas) y reconstruye el índice
+        
+        Returns:
+            tuple: (URLs antes, URLs después)
+        """
+        antes = 0
+        vistas = set()
+        urls = []
+        
+        for url in self.iterar():
+            antes += 1
+            normalizada = self.normalizar(url)
+            if normalizada not in vistas:
+                vistas.add(normalizada)
+                urls.append(normalizada)
+        
+        archivo_temporal = self.archivo_urls + ".tmp"
+        with open(archivo_temporal, 'w', encoding='utf-8') as f:
+            for url in urls:
+                f.write(url + "\n")
+        os.replace(archivo_temporal, self.archivo_urls)
+        
+        self.reconstruir()
+        return antes, len(urls)
+    
+    def reconstruir(self, capacidad_minima=CAPACIDAD_INICIAL):
+        """
+        Reconstruye la tabla hash desde el archivo .urls
+        Las URLs repetidas en el .urls se cuentan una sola vez
+        """
+        resumenes = {_resumen_url(url) for url in self.iterar()}
+        
+        capacidad = max(capacidad_minima, CAPACIDAD_INICIAL)
+        while len(resumenes) > capacidad * CARGA_MAXIMA:
+            capacidad *= 2
+        
+        tabla = bytearray(capacidad * TAMANO_RANURA)
+        for resumen in resumenes:
+            posicion = int.from_bytes(resumen[:8], 'little') % capacidad
+            while tabla[posicion * TAMANO_RANURA:(posicion + 1) * TAMANO_RANURA] != RANURA_VACIA:
+                posicion = (posicion + 1) % capacidad
+            tabla[posicion * TAMANO_RANURA:(posicion + 1) * TAMANO_RANURA] = resumen
+        
+        archivo_temporal = self.archivo_indice + ".tmp"
+        with open(archivo_temporal, 'wb') as f:
+            f.write(CABECERA_INDICE.pack(MAGIA_INDICE, capacidad, len(resumenes)))
+            f.write(tabla)
+        os.replace(archivo_temporal, self.archivo_indice)
+
+
+class InstantaneaURLs:
+    """
+    Tabla de resúmenes de un IndiceURLs cargada en memoria (solo lectura)
+    Mismo sondeo lineal que el índice, sobre los bytes ya leídos
+    """
+    
+    def __init__(self, contenido_indice, normalizar):
+        self.tabla = io.BytesIO(contenido_indice)
+        self.normalizar = normalizar
+        _, self.capacidad, self.cantidad = CABECERA_INDICE.unpack_from(contenido_indice, 0)
+    
+    def __contains__(self, url):
+        resumen = _resumen_url(self.normalizar(url))
+        return IndiceURLs._buscar_ranura(self.tabla, self.capacidad, resumen)[1]
+    
+    def __len__(self):
+        return self.cantidad
+
+
+def abrir_historial_publicados(archivo_historial="cola-facebook/historial_publicados.json"):
+    """
+    Abre el índice de URLs publicadas asociado a historial_publicados.json
+    Si el JSON todavía trae la lista 'urls_publicadas' (versión anterior),
+    la pasa al índice y la quita del JSON. Si el índice se creó antes de la
+    normalización de URLs, lo recanonicaliza una vez.
+    
+    Returns:
+        IndiceURLs
+    """
+    base = os.path.splitext(archivo_historial)[0]
+    indice = IndiceURLs(base + ".urls", base + ".idx", normalizar=canonicalizar_url)
+    
+    historial = {}
+    if os.path.exists(archivo_historial):
+        try:
+            with open(archivo_historial, 'r', encoding='utf-8') as f:
+                historial = json.load(f)
+        except (OSError, ValueError):
+            return indice
+    
+    if 'urls_publicadas' not in historial and historial.get('urls_canonicas'):
+        return indice
+    
+    if 'urls_publicadas' in historial:
+        for url in historial.pop('urls_publicadas'):
+            indice.agregar(url)
+        print(f"🔄 Historial de URLs publicadas migrado al índice ({len(indice)} URLs)")
+    
+    if not historial.get('urls_canonicas'):
+        antes, despues = indice.renormalizar()
+        if antes != despues:
+            print(f"🔄 URLs publicadas normalizadas: {antes} → {despues} (se unieron duplicadas)")
+        historial['urls_canonicas'] = True
+    
+    archivo_temporal = archivo_historial + ".tmp"
+    with open(archivo_temporal, 'w', encoding='utf-8') as f:
+        json.dump(historial, f, indent=2, ensure_ascii=False)
+    os.replace(archivo_temporal, archivo_historial)
+    
+    return indice
+
+
+def recanonicalizar_historial_publicados(archivo_historial="cola-facebook/historial_publicados.json"):
+    """
+    Vuelve a aplicar la normalización de URLs a todo el historial publicado
+    (útil al agregar reglas nuevas a urls_predicaciones)
+    
+    Returns:
+        tuple: (URLs antes, URLs después)
+    """
+    return abrir_historial_publicados(archivo_historial).renormalizar()
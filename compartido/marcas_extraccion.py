@@ -0,0 +1,97 @@
+"""
+Marcas de agua de la extracción de predicaciones, por grupo de WhatsApp
+Cada grupo guarda el tramo del chat ya revisado, que siempre es continuo:
+- id_reciente / fecha_reciente: mensaje más nuevo revisado
+- id_antiguo / fecha_antigua: mensaje más viejo revisado
+- inicio_alcanzado: ya se llegó al principio del chat
+Una extracción revisa solo los mensajes más nuevos que id_reciente y,
+si hace falta, sigue hacia atrás desde id_antiguo (los del medio se
+saltean sin leerlos). Se guardan en cola-facebook/marcas_extraccion.json.
+"""
+
+import os
+import re
+import json
+from datetime import datetime
+
+
+ARCHIVO_MARCAS = "cola-facebook/marcas_extraccion.json"
+
+# "[10:30, 18/10/2026] Nombre: " o "[9:05 p. m., 3/1/26] Nombre: "
+PATRON_FECHA_MENSAJE = re.compile(
+    r'\[(\d{1,2}):(\d{2})(?:\s*([ap])\.?\s*m\.?)?,\s*(\d{1,2})/(\d{1,2})/(\d{2,4})\]',
+    re.IGNORECASE
+)
+
+
+def leer_fecha_mensaje(texto_previo):
+    """
+    Fecha de un mensaje a partir de su data-pre-plain-text de WhatsApp Web
+    (formato día/mes/año, con hora de 24 h o con a. m./p. m.)
+    
+    Returns:
+        str: AAAA-MM-DD HH:MM, o None si no tiene el formato esperado
+    """
+    coincidencia = PATRON_FECHA_MENSAJE.search(texto_previo or '')
+    if not coincidencia:
+        return None
+    
+    hora, minuto, meridiano, dia, mes, anio = coincidencia.groups()
+    hora, anio = int(hora), int(anio)
+    
+    if meridiano:
+        hora = hora % 12 + (12 if meridiano.lower() == 'p' else 0)
+    if anio < 100:
+        anio += 2000
+    
+    try:
+        return datetime(anio, int(mes), int(dia), hora, int(minuto)).strftime("%Y-%m-%d %H:%M")
+    except ValueError:
+        return None
+
+
+class MarcasExtraccion:
+    """
+    Marcas de agua guardadas de todos los grupos
+    """
+    
+    def __init__(self, archivo_marcas=ARCHIVO_MARCAS):
+        self.archivo_marcas = archivo_marcas
+        self.marcas = {}
+        
+        if os.path.exists(archivo_marcas):
+            try:
+                with open(archivo_marcas, 'r', encoding='utf-8') as f:
+                    self.marcas = json.load(f)
+            except (OSError, ValueError):
+                self.marcas = {}
+    
+    def obtener(self, nombre_grupo):
+        """
+        Marca de un grupo
+        
+        Returns:
+            dict: Copia de la marca ({} si el grupo nunca se extrajo)
+        """
+        return dict(self.marcas.get(nombre_grupo, {}))
+    
+    def actualizar(self, nombre_grupo, **campos):
+        """Actualiza campos de la marca de un grupo y la guarda"""
+        marca = self.marcas.setdefault(nombre_grupo, {})
+        marca.update(campos)
+        marca['fecha_actualizacion'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.guardar()
+    
+    def reiniciar(self, nombre_grupo):
+        """Borra la marca de un grupo (la próxima extracción revisa todo el chat)"""
+        if self.marcas.pop(nombre_grupo, None) is not None:
+            self.guardar()
+    
+    def guardar(self):
+        """Guarda las marcas de forma atómica"""
+        os.makedirs(os.path.dirname(self.archivo_marcas) or '.', exist_ok=True)
+        
+        archivo_temporal = self.archivo_marcas + ".tmp"
+        with open(archivo_temporal, 'w', encoding='utf-8') as f:
+            json.dump(self.marcas, f, indent=2, ensure_ascii=False)
+        os.replace(archivo_temporal, self.archivo_marcas)
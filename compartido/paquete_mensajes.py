@@ -0,0 +1,271 @@
+"""
+Paquete de mensajes: todos los mensajes en un solo archivo
+- <carpeta_mensajes>.paquete.dat: textos en UTF-8, uno detrás de otro
+- <carpeta_mensajes>.paquete.idx: cabecera + un registro de ancho fijo por
+  mensaje (nombre, desplazamiento, longitud, hash del texto), ordenado por
+  nombre. Los paquetes de la versión 1 no guardan el hash y se siguen
+  leyendo (el hash se calcula del texto); --importar los pasa a la versión 2
+Ambos se leen con mmap: buscar un mensaje por nombre es una búsqueda binaria
+sobre el índice y leerlo es un recorte del archivo de datos, sin abrir un
+archivo por mensaje. Ofrece la misma interfaz de consulta que
+CatalogoMensajes (nombres, posicion, siguiente...) para que la selección
+funcione igual con cualquiera de los dos.
+"""
+
+import os
+import sys
+import mmap
+import struct
+import bisect
+
+from compartido.catalogo_mensajes import calcular_hash_texto
+from compartido.disposicion_carpetas import iterar_archivos, preparar_ruta
+
+
+SUFIJO_PAQUETE = ".paquete"
+MAGIA_PAQUETE = b'PMSG'
+VERSION_PAQUETE = 2
+CABECERA_PAQUETE = struct.Struct('<4sII')     # magia, versión, cantidad
+ANCHO_NOMBRE = 120
+REGISTROS_INDICE = {
+    1: struct.Struct(f'<{ANCHO_NOMBRE}sQI'),     # nombre, desplazamiento, longitud
+    2: struct.Struct(f'<{ANCHO_NOMBRE}sQI8s')    # ... + hash del texto (calcular_hash_texto)
+}
+REGISTRO_INDICE = REGISTROS_INDICE[VERSION_PAQUETE]
+
+
+def rutas_paquete(carpeta):
+    """
+    Rutas del paquete asociado a una carpeta de mensajes
+    
+    Returns:
+        tuple: (archivo_datos, archivo_indice)
+    """
+    base = os.path.normpath(carpeta) + SUFIJO_PAQUETE
+    return base + ".dat", base + ".idx"
+
+
+def existe_paquete(carpeta):
+    """Indica si la carpeta de mensajes tiene un paquete creado"""
+    return all(os.path.exists(ruta) for ruta in rutas_paquete(carpeta))
+
+
+def _mapear(ruta):
+    """Mapea un archivo en memoria de solo lectura (None si está vacío)"""
+    with open(ruta, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class _NombresPaquete:
+    """Secuencia ordenada de nombres leída directamente del índice"""
+    
+    def __init__(self, paquete):
+        self.paquete = paquete
+    
+    def __len__(self):
+        return len(self.paquete)
+    
+    def __getitem__(self, posicion):
+        if isinstance(posicion, slice):
+            return [self[i] for i in range(*posicion.indices(len(self)))]
+        if posicion < 0:
+            posicion += len(self)
+        if not 0 <= posicion < len(self):
+            raise IndexError(posicion)
+        return self.paquete._registro(posicion)[0]
+    
+    def __iter__(self):
+        for posicion in range(len(self)):
+            yield self[posicion]
+
+
+class PaqueteMensajes:
+    """
+    Lectura de un paquete de mensajes mapeado en memoria
+    """
+    
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        self.archivo_datos, self.archivo_indice = rutas_paquete(carpeta)
+        
+        self.indice = _mapear(self.archivo_indice)
+        if self.indice is None:
+            raise ValueError(f"Índice de paquete vacío: {self.archivo_indice}")
+        
+        magia, self.version, self.cantidad = CABECERA_PAQUETE.unpack_from(self.indice, 0)
+        if magia != MAGIA_PAQUETE or self.version not in REGISTROS_INDICE:
+            raise ValueError(f"Índice de paquete inválido: {self.archivo_indice}")
+        self.registro_indice = REGISTROS_INDICE[self.version]
+        
+        self.datos = _mapear(self.archivo_datos)
+        self.nombres = _NombresPaquete(self)
+        
+        # Equivalente a la fecha de la carpeta del catálogo (para la bolsa)
+        self.mtime_carpeta = os.stat(self.archivo_indice).st_mtime_ns
+    
+    def _registro(self, posicion):
+        """Nombre, desplazamiento y longitud del mensaje en una posición"""
+        nombre, desplazamiento, longitud = self.registro_indice.unpack_from(
+            self.indice, CABECERA_PAQUETE.size + posicion * self.registro_indice.size
+        )[:3]
+        return nombre.rstrip(b'\x00').decode('utf-8'), desplazamiento, longitud
+    
+    def __len__(self):
+        return self.cantidad
+    
+    def __contains__(self, nombre):
+        return self.posicion(nombre) is not None
+    
+    def posicion(self, nombre):
+        """
+        Posición de un mensaje en el orden alfabético (búsqueda binaria)
+        
+        Returns:
+            int o None si no está en el paquete
+        """
+        posicion = bisect.bisect_left(self.nombres, nombre)
+        if posicion < self.cantidad and self.nombres[posicion] == nombre:
+            return posicion
+        return None
+    
+    def siguiente(self, nombre):
+        """Mensaje que sigue a 'nombre' en orden alfabético (con rotación)"""
+        if not self.cantidad:
+            return None
+        
+        posicion = bisect.bisect_right(self.nombres, nombre)
+        return self.nombres[posicion % self.cantidad]
+    
+    def siguiente_desde_cursor(self, nombre, posicion):
+        """Mensaje que sigue a un cursor guardado (nombre + posición)"""
+        if not self.cantidad:
+            return None
+        
+        if posicion is not None and 0 <= posicion < self.cantidad and self.nombres[posicion] == nombre:
+            return self.nombres[(posicion + 1) % self.cantidad]
+        
+        return self.siguiente(nombre)
+    
+    def leer(self, nombre):
+        """
+        Texto de un mensaje
+        
+        Raises:
+            KeyError: Si el mensaje no está en el paquete
+        """
+        posicion = self.posicion(nombre)
+        if posicion is None:
+            raise KeyError(nombre)
+        
+        _, desplazamiento, longitud = self._registro(posicion)
+        
+        # Archivo de datos vacío (todos los mensajes vacíos): no hay mapeo
+        if self.datos is None:
+            return ''
+        
+        return self.datos[desplazamiento:desplazamiento + longitud].decode('utf-8')
+    
+    def hash_de(self, nombre):
+        """
+        Hash de texto de un mensaje (None si no está en el paquete)
+        Se lee del índice sin tocar el texto, salvo en paquetes de la versión 1
+        """
+        posicion = self.posicion(nombre)
+        if posicion is None:
+            return None
+        
+        if self.version == 1:
+            return calcular_hash_texto(self.leer(nombre))
+        
+        return self.registro_indice.unpack_from(
+            self.indice, CABECERA_PAQUETE.size + posicion * self.registro_indice.size
+        )[3].hex()
+    
+    def cerrar(self):
+        """Libera los mapeos"""
+        for mapeo in (self.indice, self.datos):
+            if mapeo is not None:
+                mapeo.close()
+
+
+def importar_carpeta(carpeta):
+    """
+    Crea (o reemplaza) el paquete con los .txt de la carpeta de mensajes
+    Los archivos se escriben aparte y se reemplazan al final
+    
+    Returns:
+        int: Cantidad de mensajes empaquetados
+    """
+    archivo_datos, archivo_indice = rutas_paquete(carpeta)
+    rutas = {entrada.name: entrada.path for entrada in iterar_archivos(carpeta)}
+    nombres = sorted(rutas)
+    
+    for nombre in nombres:
+        if len(nombre.encode('utf-8')) > ANCHO_NOMBRE:
+            raise ValueError(f"Nombre demasiado largo para el paquete: {nombre}")
+    
+    desplazamiento = 0
+    with open(archivo_datos + ".tmp", 'wb') as datos, open(archivo_indice + ".tmp", 'wb') as indice:
+        indice.write(CABECERA_PAQUETE.pack(MAGIA_PAQUETE, VERSION_PAQUETE, len(nombres)))
+        
+        for nombre in nombres:
+            with open(rutas[nombre], 'r', encoding='utf-8') as f:
+                contenido = f.read().encode('utf-8')
+            
+            datos.write(contenido)
+            indice.write(REGISTRO_INDICE.pack(
+                nombre.encode('utf-8'), desplazamiento, len(contenido),
+                bytes.fromhex(calcular_hash_texto(contenido.decode('utf-8')))
+            ))
+            desplazamiento += len(contenido)
+    
+    os.replace(archivo_datos + ".tmp", archivo_datos)
+    os.replace(archivo_indice + ".tmp", archivo_indice)
+    
+    return len(nombres)
+
+
+def exportar_paquete(carpeta):
+    """
+    Escribe cada mensaje del paquete como .txt en la carpeta de mensajes
+    (respeta la disposición de la carpeta; sobrescribe los existentes)
+    
+    Returns:
+        int: Cantidad de mensajes exportados
+    """
+    paquete = PaqueteMensajes(carpeta)
+    
+    try:
+        os.makedirs(carpeta, exist_ok=True)
+        for nombre in paquete.nombres:
+            with open(preparar_ruta(carpeta, nombre), 'w', encoding='utf-8') as f:
+                f.write(paquete.leer(nombre))
+        return len(paquete)
+    finally:
+        paquete.cerrar()
+
+
+def main():
+    """
+    Convierte entre la carpeta de mensajes y el paquete
+    Uso: py -m compartido.paquete_mensajes --importar | --exportar [carpeta]
+    """
+    from compartido.gestor_archivos import leer_config_global
+    
+    carpetas = [argumento for argumento in sys.argv[1:] if not argumento.startswith('--')]
+    carpeta = carpetas[0] if carpetas else leer_config_global()['carpeta_mensajes']
+    
+    if '--importar' in sys.argv:
+        cantidad = importar_carpeta(carpeta)
+        print(f"📦 {cantidad} mensajes empaquetados en {rutas_paquete(carpeta)[0]}")
+    elif '--exportar' in sys.argv:
+        cantidad = exportar_paquete(carpeta)
+        print(f"📂 {cantidad} mensajes exportados a {carpeta}/")
+    else:
+        print(main.__doc__)
+
+
+if __name__ == "__main__":
+    main()
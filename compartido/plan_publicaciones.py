@@ -0,0 +1,436 @@
+"""
+Plan de publicaciones precalculado
+Decide de antemano qué se publica en cada turno de los próximos N días
+(mensaje bíblico o predicación, y qué archivo) y lo guarda en
+plan_publicaciones.json. Cada ejecución toma el siguiente turno del plan
+sin volver a decidir nada. El plan se rehace solo cuando deja de valer:
+- se agotó o cambió la configuración que lo define
+- cambió el catálogo de mensajes
+- hubo publicaciones fuera del plan (el registro no coincide)
+- la cola de predicaciones no alcanza, o llegaron predicaciones que el
+  plan no pudo usar
+Los mensajes aleatorios reservados por un plan descartado vuelven a la
+bolsa.
+
+Para validar el plan no se abre el catálogo: el plan guarda la fecha de
+cada carpeta de mensajes (o del índice del paquete) y basta un os.stat.
+Tampoco se abre la cola si su manifiesto no cambió desde la última vez que
+el plan contó las predicaciones pendientes.
+"""
+
+import os
+import sys
+import json
+from datetime import datetime, timedelta
+
+from compartido.gestor_archivos import (
+    leer_config_global,
+    abrir_fuente_mensajes,
+    cerrar_fuente_mensajes,
+    sacar_mensajes_aleatorios,
+    devolver_mensajes_aleatorios
+)
+from compartido.paquete_mensajes import PaqueteMensajes, existe_paquete
+from compartido.cola_predicaciones import ColaPredicaciones
+
+
+ARCHIVO_PLAN = "plan_publicaciones.json"
+VERSION_PLAN = 1
+
+
+def huella_config(config):
+    """Opciones de configuración de las que depende el plan"""
+    return [
+        config['carpeta_mensajes'],
+        config['seleccion'],
+        config['usar_paquete_mensajes'],
+        config['activar_predicaciones'],
+        config['alternar_con_predicaciones'],
+        config['publicaciones_por_dia']
+    ]
+
+
+def cargar_plan(archivo_plan=ARCHIVO_PLAN):
+    """
+    Carga el plan guardado
+    
+    Returns:
+        dict o None si no existe, está dañado o es de otra versión
+    """
+    if not os.path.exists(archivo_plan):
+        return None
+    
+    try:
+        with open(archivo_plan, 'r', encoding='utf-8') as f:
+            plan = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    return plan if plan.get('version') == VERSION_PLAN else None
+
+
+def guardar_plan(plan, archivo_plan=ARCHIVO_PLAN):
+    """Guarda el plan de forma atómica"""
+    archivo_temporal = archivo_plan + ".tmp"
+    with open(archivo_temporal, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, indent=1, ensure_ascii=False)
+    os.replace(archivo_temporal, archivo_plan)
+
+
+def _fecha_archivo(ruta):
+    """Fecha de modificación en ns (None si no existe)"""
+    try:
+        return os.stat(ruta).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _estado_cola():
+    """
+    Predicaciones pendientes según el manifiesto de la cola, y la fecha del
+    manifiesto al contarlas
+    
+    Returns:
+        dict: {'pendientes': n, 'mtime': ns}
+    """
+    cola = ColaPredicaciones()
+    try:
+        return {'pendientes': cola.contar('pendiente'), 'mtime': _fecha_archivo(cola.archivo_manifiesto)}
+    finally:
+        cola.cerrar()
+
+
+def _pendientes_cola(plan):
+    """Pendientes de la cola: las guardadas en el plan si el manifiesto no cambió"""
+    estado = plan.get('estado_cola')
+    ruta = ColaPredicaciones.ruta_manifiesto()
+    
+    if estado and estado['mtime'] is not None and estado['mtime'] == _fecha_archivo(ruta):
+        return estado['pendientes']
+    
+    estado = _estado_cola()
+    plan['estado_cola'] = estado
+    return estado['pendientes']
+
+
+def _fechas_fuente(catalogo):
+    """
+    Fechas que invalidan el plan: las de la carpeta de mensajes y sus
+    subcarpetas, o la del índice del paquete
+    
+    Returns:
+        dict: {ruta: mtime en ns}
+    """
+    if catalogo is None:
+        return {}
+    
+    if isinstance(catalogo, PaqueteMensajes):
+        return {catalogo.archivo_indice: catalogo.mtime_carpeta}
+    
+    return {
+        os.path.join(catalogo.carpeta, sub) if sub else catalogo.carpeta: mtime
+        for sub, mtime in catalogo.mtimes.items()
+    }
+
+
+def _fuente_cambio(plan, config):
+    """Indica si cambió la fuente de mensajes del plan (solo con os.stat)"""
+    fechas = plan.get('fechas_fuente')
+    if fechas is None:
+        return True
+    
+    carpeta = config['carpeta_mensajes']
+    usa_paquete = config['usar_paquete_mensajes'] and existe_paquete(carpeta)
+    if usa_paquete != plan.get('fuente_paquete'):
+        return True
+    
+    if not fechas:
+        return os.path.exists(carpeta)
+    
+    return any(_fecha_archivo(ruta) != mtime for ruta, mtime in fechas.items())
+
+
+def crear_plan(config, gestor, dias=None):
+    """
+    Calcula el plan de los próximos días
+    Simula la alternancia 1:1 de decidir_tipo_publicacion y saca de una vez
+    los mensajes bíblicos (de la bolsa aleatoria o siguiendo el cursor
+    secuencial)
+    
+    Args:
+        config: Configuración global
+        gestor: GestorRegistro
+        dias: Días a planificar (None = dias_plan de la configuración)
+    
+    Returns:
+        dict: Plan nuevo (sin guardar)
+    """
+    dias = dias or config['dias_plan']
+    cantidad = dias * config['publicaciones_por_dia']
+    alternar = config['activar_predicaciones'] and config['alternar_con_predicaciones']
+    
+    # Predicaciones disponibles, en orden de salida
+    pendientes = []
+    estado_cola = None
+    if alternar:
+        cola = ColaPredicaciones()
+        try:
+            pendientes = cola.listar_pendientes(cantidad)
+            estado_cola = {
+                'pendientes': cola.contar('pendiente'),
+                'mtime': _fecha_archivo(cola.archivo_manifiesto)
+            }
+        finally:
+            cola.cerrar()
+    
+    # Tipos de cada turno (misma regla que decidir_tipo_publicacion)
+    ultima = gestor.obtener_ultima_publicacion()
+    ultimo_tipo = ultima.get('tipo', 'biblico') if ultima else None
+    tipos = []
+    predicaciones_usadas = 0
+    faltaron_predicaciones = False
+    
+    for _ in range(cantidad):
+        tipo = 'biblico'
+        if alternar and ultimo_tipo == 'biblico':
+            if predicaciones_usadas < len(pendientes):
+                tipo = 'predicacion'
+                predicaciones_usadas += 1
+            else:
+                faltaron_predicaciones = True
+        tipos.append(tipo)
+        ultimo_tipo = tipo
+    
+    # Mensajes bíblicos de cada turno
+    catalogo = abrir_fuente_mensajes(config)
+    fechas_fuente = _fechas_fuente(catalogo)
+    fuente_paquete = isinstance(catalogo, PaqueteMensajes)
+    cantidad_biblicos = tipos.count('biblico')
+    biblicos = []
+    
+    try:
+        if catalogo is not None and len(catalogo) and cantidad_biblicos:
+            if config['seleccion'] == 'aleatoria':
+                biblicos = sacar_mensajes_aleatorios(
+                    config, catalogo, gestor.registro.get('historial_reciente', []), cantidad_biblicos
+                )
+            else:
+                cursor = gestor.registro.get('cursor_secuencial') or {}
+                nombre, posicion = cursor.get('archivo'), cursor.get('posicion')
+                if not nombre:
+                    ultimo_biblico = gestor.obtener_ultima_publicacion('biblico')
+                    nombre = ultimo_biblico['mensaje_archivo'] if ultimo_biblico else None
+                
+                for _ in range(cantidad_biblicos):
+                    nombre = catalogo.siguiente_desde_cursor(nombre, posicion) if nombre else catalogo.nombres[0]
+                    posicion = catalogo.posicion(nombre)
+                    biblicos.append(nombre)
+    finally:
+        cerrar_fuente_mensajes(catalogo)
+    
+    ranuras = []
+    siguiente_biblico = iter(biblicos)
+    siguiente_predicacion = iter(pendientes)
+    for tipo in tipos:
+        archivo = next(siguiente_biblico if tipo == 'biblico' else siguiente_predicacion, None)
+        ranuras.append({'tipo': tipo, 'archivo': archivo})
+    
+    return {
+        'version': VERSION_PLAN,
+        'creado': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'fecha_inicio': datetime.now().strftime("%Y-%m-%d"),
+        'publicaciones_por_dia': config['publicaciones_por_dia'],
+        'huella_config': huella_config(config),
+        'fechas_fuente': fechas_fuente,
+        'fuente_paquete': fuente_paquete,
+        'estado_cola': estado_cola,
+        'fecha_ultima_publicacion': gestor.registro.get('fecha_ultima_publicacion'),
+        'faltaron_predicaciones': faltaron_predicaciones,
+        'consumidas': 0,
+        'ranuras': ranuras
+    }
+
+
+def motivo_replanificar(plan, config, gestor):
+    """
+    Indica si el plan dejó de valer
+    Solo abre la cola si hace falta contar predicaciones y su manifiesto
+    cambió desde el último conteo (que queda guardado en el plan)
+    
+    Returns:
+        str con el motivo, o None si el plan sigue valiendo
+    """
+    if plan is None:
+        return "no hay plan"
+    
+    if plan['huella_config'] != huella_config(config):
+        return "cambió la configuración"
+    
+    restantes = plan['ranuras'][plan['consumidas']:]
+    if not restantes:
+        return "plan agotado"
+    
+    if _fuente_cambio(plan, config):
+        return "cambió el catálogo de mensajes"
+    
+    if plan['fecha_ultima_publicacion'] != gestor.registro.get('fecha_ultima_publicacion'):
+        return "hubo publicaciones fuera del plan"
+    
+    predicaciones_restantes = sum(1 for ranura in restantes if ranura['tipo'] == 'predicacion')
+    if not predicaciones_restantes and not plan['faltaron_predicaciones']:
+        return None
+    
+    pendientes = _pendientes_cola(plan)
+    if pendientes < predicaciones_restantes:
+        return "faltan predicaciones en la cola"
+    
+    if plan['faltaron_predicaciones'] and pendientes > predicaciones_restantes:
+        return "llegaron predicaciones nuevas"
+    
+    return None
+
+
+def replanificar(config, gestor, plan_anterior=None, dias=None):
+    """
+    Descarta el plan anterior (devolviendo a la bolsa sus mensajes
+    aleatorios sin publicar), crea uno nuevo y lo guarda
+    
+    Returns:
+        dict: Plan nuevo
+    """
+    if plan_anterior and plan_anterior['huella_config'][1] == 'aleatoria':
+        ultimo_biblico = gestor.obtener_ultima_publicacion('biblico')
+        publicado = ultimo_biblico['mensaje_archivo'] if ultimo_biblico else None
+        
+        sin_publicar = [
+            ranura['archivo']
+            for ranura in plan_anterior['ranuras'][plan_anterior['consumidas']:]
+            if ranura['tipo'] == 'biblico' and ranura['archivo'] and ranura['archivo'] != publicado
+        ]
+        if sin_publicar:
+            devolver_mensajes_aleatorios(config, sin_publicar)
+    
+    plan = crear_plan(config, gestor, dias)
+    guardar_plan(plan)
+    return plan
+
+
+def obtener_ranura_plan(config, gestor):
+    """
+    Siguiente turno del plan (rehaciéndolo antes si dejó de valer)
+    
+    Returns:
+        dict: {'tipo': 'biblico'|'predicacion', 'archivo': nombre o None}
+    """
+    plan = cargar_plan()
+    estado_cola = plan.get('estado_cola') if plan else None
+    motivo = motivo_replanificar(plan, config, gestor)
+    
+    if motivo:
+        print(f"🗓️  Replanificando publicaciones ({motivo})")
+        plan = replanificar(config, gestor, plan)
+    elif plan.get('estado_cola') != estado_cola:
+        # Se volvió a contar la cola: guardar el conteo para la próxima vez
+        guardar_plan(plan)
+    
+    ranura = plan['ranuras'][plan['consumidas']] if plan['consumidas'] < len(plan['ranuras']) else None
+    
+    if ranura:
+        print(f"🗓️  Turno {plan['consumidas'] + 1} de {len(plan['ranuras'])} del plan: "
+              f"{'📖' if ranura['tipo'] == 'biblico' else '🎬'} {ranura['archivo'] or '(sin archivo)'}")
+    
+    return ranura
+
+
+def rehacer_ranura_plan(config, gestor, motivo):
+    """
+    Rehace el plan aunque siga valiendo (ej: no se encontró el mensaje del
+    turno actual) y devuelve su primer turno
+    
+    Returns:
+        dict: {'tipo', 'archivo'} o None si el plan nuevo no tiene turnos
+    """
+    print(f"🗓️  Replanificando publicaciones ({motivo})")
+    plan = replanificar(config, gestor, cargar_plan())
+    
+    ranura = plan['ranuras'][0] if plan['ranuras'] else None
+    
+    if ranura:
+        print(f"🗓️  Turno 1 de {len(plan['ranuras'])} del plan: "
+              f"{'📖' if ranura['tipo'] == 'biblico' else '🎬'} {ranura['archivo'] or '(sin archivo)'}")
+    
+    return ranura
+
+
+def confirmar_ranura_plan(gestor):
+    """
+    Marca como publicado el turno actual del plan
+    (llamar después de registrar la publicación exitosa)
+    """
+    plan = cargar_plan()
+    if plan is None or plan['consumidas'] >= len(plan['ranuras']):
+        return
+    
+    ranura = plan['ranuras'][plan['consumidas']]
+    plan['consumidas'] += 1
+    plan['fecha_ultima_publicacion'] = gestor.registro.get('fecha_ultima_publicacion')
+    
+    # Publicar una predicación la mueve en la cola: volver a contar ahora
+    # para que el próximo turno no tenga que abrirla
+    if ranura['tipo'] == 'predicacion':
+        plan['estado_cola'] = _estado_cola()
+    
+    guardar_plan(plan)
+
+
+def mostrar_plan(plan):
+    """Muestra el plan agrupado por día (vista previa)"""
+    por_dia = plan['publicaciones_por_dia'] or 1
+    inicio = datetime.strptime(plan['fecha_inicio'], "%Y-%m-%d")
+    
+    print(f"\n🗓️  PLAN DE PUBLICACIONES (creado {plan['creado']})")
+    print(f"   Turnos: {len(plan['ranuras'])} | Publicados: {plan['consumidas']} | {por_dia} por día")
+    
+    for indice, ranura in enumerate(plan['ranuras']):
+        if indice % por_dia == 0:
+            print(f"\n📅 {(inicio + timedelta(days=indice // por_dia)).strftime('%Y-%m-%d')}")
+        
+        marca = "✅" if indice < plan['consumidas'] else "  "
+        icono = "📖" if ranura['tipo'] == 'biblico' else "🎬"
+        print(f"   {marca} {indice % por_dia + 1}. {icono} {ranura['archivo'] or '(sin archivo)'}")
+    
+    if plan['faltaron_predicaciones']:
+        print("\n⚠️  No hay predicaciones suficientes para alternar en todos los turnos")
+
+
+def main():
+    """
+    Plan de publicaciones de los próximos días
+    Uso: py -m compartido.plan_publicaciones --ver | --planificar [dias]
+         --ver: muestra el plan (lo rehace antes si dejó de valer)
+         --planificar: rehace el plan ahora
+    """
+    from gestor_registro import GestorRegistro
+    
+    if '--planificar' not in sys.argv and '--ver' not in sys.argv:
+        print(main.__doc__)
+        return
+    
+    config = leer_config_global()
+    gestor = GestorRegistro()
+    plan = cargar_plan()
+    
+    if '--planificar' in sys.argv:
+        dias = [int(argumento) for argumento in sys.argv[1:] if argumento.isdigit()]
+        plan = replanificar(config, gestor, plan, dias[0] if dias else None)
+    else:
+        motivo = motivo_replanificar(plan, config, gestor)
+        if motivo:
+            print(f"🗓️  Replanificando publicaciones ({motivo})")
+            plan = replanificar(config, gestor, plan)
+    
+    mostrar_plan(plan)
+
+
+if __name__ == "__main__":
+    main()
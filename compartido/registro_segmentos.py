@@ -0,0 +1,342 @@
+"""
+Almacén segmentado para el registro de publicaciones
+La cabecera (contadores, estadísticas, últimas publicaciones) es un JSON
+pequeño; el historial se guarda en segmentos JSONL rotativos que solo se
+leen cuando se pide el historial completo
+"""
+
+import os
+import json
+
+
+COLECCIONES = ('publicaciones', 'errores', 'extracciones')
+
+
+class AlmacenRegistroSegmentado:
+    """
+    Persistencia del registro en cabecera JSON + segmentos JSONL
+    Mismos métodos que AlmacenRegistroSQLite: las escrituras quedan
+    preparadas en memoria hasta confirmar()
+    """
+    
+    def __init__(self, archivo_cabecera, carpeta_segmentos, entradas_por_segmento=1000):
+        self.archivo_cabecera = archivo_cabecera
+        self.carpeta_segmentos = carpeta_segmentos
+        self.entradas_por_segmento = max(1, entradas_por_segmento)
+        
+        self.indice = self._crear_indice_vacio()
+        self.estado = None
+        self.pendientes = {coleccion: [] for coleccion in COLECCIONES}
+        self.reemplazos = {}
+        self.retirados = {coleccion: [] for coleccion in COLECCIONES}  # segmentos a borrar al confirmar
+    
+    @staticmethod
+    def _crear_meta_vacia():
+        """Metadatos de segmentos de una colección sin historial"""
+        return {'primero': 1, 'actual': 1, 'entradas': 0, 'bytes': 0, 'total': 0, 'cerrados': {}}
+    
+    def _crear_indice_vacio(self):
+        """Índice de segmentos y resumen del historial guardado en la cabecera"""
+        return {
+            'segmentos': {coleccion: self._crear_meta_vacia() for coleccion in COLECCIONES},
+            'ultimas_publicaciones': {},  # tipo → última entrada ('*' = cualquier tipo)
+            'conteo_por_tipo': {}
+        }
+    
+    def _ruta_segmento(self, coleccion, numero):
+        """Ruta del archivo de un segmento"""
+        return os.path.join(self.carpeta_segmentos, f"{coleccion}-{numero:04d}.jsonl")
+    
+    def cargar_estado(self):
+        """
+        Carga la cabecera sin leer ningún segmento
+        
+        Returns:
+            dict o None si no existe la cabecera
+        """
+        self.pendientes = {coleccion: [] for coleccion in COLECCIONES}
+        self.reemplazos = {}
+        self.retirados = {coleccion: [] for coleccion in COLECCIONES}
+        
+        if not os.path.exists(self.archivo_cabecera):
+            self.indice = self._crear_indice_vacio()
+            return None
+        
+        with open(self.archivo_cabecera, 'r', encoding='utf-8') as f:
+            estado = json.load(f)
+        
+        self.indice = estado.pop('historial_segmentado', None) or self._crear_indice_vacio()
+        
+        # Índices anteriores a la retención no tienen 'primero' ni 'cerrados'
+        for meta in self.indice['segmentos'].values():
+            meta.setdefault('primero', 1)
+            meta.setdefault('cerrados', {})
+        
+        return estado
+    
+    def guardar_estado(self, estado):
+        """Prepara la cabecera para el próximo confirmar()"""
+        self.estado = estado
+    
+    def agregar(self, coleccion, entrada):
+        """Prepara una entrada de historial para el próximo confirmar()"""
+        self.pendientes[coleccion].append(entrada)
+        
+        if coleccion == 'publicaciones':
+            self._actualizar_resumen(entrada)
+    
+    def reemplazar(self, coleccion, entradas):
+        """Prepara el reemplazo completo de una colección"""
+        self.reemplazos[coleccion] = list(entradas)
+        self.pendientes[coleccion] = []
+        self.retirados[coleccion] = []
+        self.indice['segmentos'][coleccion] = self._crear_meta_vacia()
+        
+        if coleccion == 'publicaciones':
+            self.indice['ultimas_publicaciones'] = {}
+            self.indice['conteo_por_tipo'] = {}
+            for entrada in self.reemplazos[coleccion]:
+                self._actualizar_resumen(entrada)
+    
+    def _actualizar_resumen(self, entrada):
+        """Actualiza últimas publicaciones y conteo por tipo con una entrada nueva"""
+        tipo = entrada.get('tipo', 'biblico')
+        
+        self.indice['ultimas_publicaciones']['*'] = entrada
+        self.indice['ultimas_publicaciones'][tipo] = entrada
+        self.indice['conteo_por_tipo'][tipo] = self.indice['conteo_por_tipo'].get(tipo, 0) + 1
+    
+    def confirmar(self):
+        """
+        Escribe las entradas preparadas en los segmentos y luego la cabecera
+        La cabecera es la referencia: lo escrito en segmentos después de la
+        última cabecera válida se descarta en el siguiente confirmar()
+        """
+        os.makedirs(self.carpeta_segmentos, exist_ok=True)
+        
+        for coleccion in COLECCIONES:
+            if coleccion in self.reemplazos:
+                self._borrar_segmentos(coleccion)
+                entradas = self.reemplazos[coleccion] + self.pendientes[coleccion]
+            else:
+                self._reparar_segmento_actual(coleccion)
+                entradas = self.pendientes[coleccion]
+            
+            if entradas:
+                self._escribir_entradas(coleccion, entradas)
+        
+        cabecera = dict(self.estado or {})
+        cabecera['historial_segmentado'] = self.indice
+        
+        archivo_temporal = self.archivo_cabecera + ".tmp"
+        with open(archivo_temporal, 'w', encoding='utf-8') as f:
+            json.dump(cabecera, f, indent=2, ensure_ascii=False)
+        os.replace(archivo_temporal, self.archivo_cabecera)
+        
+        # Los segmentos retirados ya no figuran en la cabecera
+        for coleccion, numeros in self.retirados.items():
+            for numero in numeros:
+                ruta = self._ruta_segmento(coleccion, numero)
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+        
+        self.pendientes = {coleccion: [] for coleccion in COLECCIONES}
+        self.reemplazos = {}
+        self.retirados = {coleccion: [] for coleccion in COLECCIONES}
+    
+    def deshacer(self):
+        """Descarta lo preparado y vuelve al índice guardado en disco"""
+        self.cargar_estado()
+    
+    def _escribir_entradas(self, coleccion, entradas):
+        """Agrega entradas al segmento actual, rotando al llegar al límite"""
+        meta = self.indice['segmentos'][coleccion]
+        archivo = open(self._ruta_segmento(coleccion, meta['actual']), 'ab')
+        
+        try:
+            for entrada in entradas:
+                if meta['entradas'] >= self.entradas_por_segmento:
+                    archivo.close()
+                    if 'ultima_fecha' in meta:
+                        meta['cerrados'][str(meta['actual'])] = {
+                            'entradas': meta['entradas'],
+                            'ultima_fecha': meta['ultima_fecha']
+                        }
+                    meta['actual'] += 1
+                    meta['entradas'] = 0
+                    meta['bytes'] = 0
+                    archivo = open(self._ruta_segmento(coleccion, meta['actual']), 'ab')
+                
+                linea = (json.dumps(entrada, ensure_ascii=False) + "\n").encode('utf-8')
+                archivo.write(linea)
+                
+                meta['entradas'] += 1
+                meta['bytes'] += len(linea)
+                meta['total'] += 1
+                meta['ultima_fecha'] = entrada.get('fecha')
+        finally:
+            archivo.close()
+    
+    def _reparar_segmento_actual(self, coleccion):
+        """Descarta escrituras de un confirmar() interrumpido antes de guardar la cabecera"""
+        meta = self.indice['segmentos'][coleccion]
+        
+        ruta_actual = self._ruta_segmento(coleccion, meta['actual'])
+        if os.path.exists(ruta_actual) and os.path.getsize(ruta_actual) > meta['bytes']:
+            os.truncate(ruta_actual, meta['bytes'])
+        
+        ruta_siguiente = self._ruta_segmento(coleccion, meta['actual'] + 1)
+        if os.path.exists(ruta_siguiente):
+            os.remove(ruta_siguiente)
+    
+    def _borrar_segmentos(self, coleccion):
+        """Elimina todos los segmentos de una colección"""
+        if not os.path.exists(self.carpeta_segmentos):
+            return
+        
+        for archivo in os.listdir(self.carpeta_segmentos):
+            if archivo.startswith(f"{coleccion}-") and archivo.endswith('.jsonl'):
+                os.remove(os.path.join(self.carpeta_segmentos, archivo))
+    
+    def _leer_segmento(self, coleccion, numero):
+        """Lee las entradas confirmadas de un segmento"""
+        meta = self.indice['segmentos'][coleccion]
+        ruta = self._ruta_segmento(coleccion, numero)
+        if not os.path.exists(ruta):
+            return []
+        
+        # Leer solo la parte confirmada del segmento actual
+        limite = meta['bytes'] if numero == meta['actual'] else None
+        
+        with open(ruta, 'rb') as f:
+            contenido = f.read(limite) if limite is not None else f.read()
+        
+        return [json.loads(linea) for linea in contenido.decode('utf-8').splitlines() if linea.strip()]
+    
+    def iterar(self, coleccion):
+        """Recorre una colección en orden cronológico leyendo los segmentos bajo demanda"""
+        if coleccion in self.reemplazos:
+            yield from self.reemplazos[coleccion]
+        else:
+            meta = self.indice['segmentos'][coleccion]
+            
+            for numero in range(meta['primero'], meta['actual'] + 1):
+                if numero not in self.retirados[coleccion]:
+                    yield from self._leer_segmento(coleccion, numero)
+        
+        yield from self.pendientes[coleccion]
+    
+    def iterar_desde(self, coleccion, fecha):
+        """
+        Recorre las entradas con fecha igual o posterior a 'fecha'
+        Los segmentos cerrados que terminan antes no se leen
+        """
+        for entrada in self._iterar_segmentos_desde(coleccion, fecha):
+            if entrada.get('fecha', '') >= fecha:
+                yield entrada
+    
+    def _iterar_segmentos_desde(self, coleccion, fecha):
+        """Entradas de los segmentos que pueden tener fechas desde 'fecha' (y las pendientes)"""
+        if coleccion in self.reemplazos:
+            yield from self.reemplazos[coleccion]
+        else:
+            meta = self.indice['segmentos'][coleccion]
+            
+            for numero in range(meta['primero'], meta['actual'] + 1):
+                if numero in self.retirados[coleccion]:
+                    continue
+                if numero < meta['actual'] and (self._info_segmento_cerrado(coleccion, numero)['ultima_fecha'] or '') < fecha:
+                    continue
+                yield from self._leer_segmento(coleccion, numero)
+        
+        yield from self.pendientes[coleccion]
+    
+    def _info_segmento_cerrado(self, coleccion, numero):
+        """Entradas y última fecha de un segmento cerrado (se calcula si falta en el índice)"""
+        cerrados = self.indice['segmentos'][coleccion]['cerrados']
+        
+        if str(numero) not in cerrados:
+            entradas = self._leer_segmento(coleccion, numero)
+            cerrados[str(numero)] = {
+                'entradas': len(entradas),
+                'ultima_fecha': entradas[-1].get('fecha') if entradas else None
+            }
+        
+        return cerrados[str(numero)]
+    
+    def retirar_antiguas(self, coleccion, retener_entradas=0, fecha_limite=None):
+        """
+        Retira del historial vivo los segmentos cerrados fuera de la retención
+        Se retiran segmentos completos: el segmento actual nunca se archiva
+        
+        Args:
+            coleccion: Colección a recortar
+            retener_entradas: Mínimo de entradas a conservar (0 = sin límite)
+            fecha_limite: Fecha 'AAAA-MM-DD HH:MM:SS'; se retiran segmentos anteriores (None = sin límite)
+        
+        Returns:
+            list: Entradas retiradas en orden cronológico
+        """
+        if coleccion in self.reemplazos:
+            return []
+        
+        meta = self.indice['segmentos'][coleccion]
+        retiradas = []
+        
+        while meta['primero'] < meta['actual']:
+            numero = meta['primero']
+            info = self._info_segmento_cerrado(coleccion, numero)
+            
+            sobra = retener_entradas > 0 and self.contar(coleccion) - info['entradas'] >= retener_entradas
+            vencido = bool(fecha_limite and info['ultima_fecha'] and info['ultima_fecha'] < fecha_limite)
+            
+            if not (sobra or vencido):
+                break
+            
+            retiradas.extend(self._leer_segmento(coleccion, numero))
+            meta['total'] -= info['entradas']
+            meta['cerrados'].pop(str(numero), None)
+            meta['primero'] += 1
+            self.retirados[coleccion].append(numero)
+        
+        return retiradas
+    
+    def listar(self, coleccion):
+        """
+        Lista una colección completa en orden cronológico
+        
+        Returns:
+            list: Entradas como diccionarios
+        """
+        return list(self.iterar(coleccion))
+    
+    def contar(self, coleccion):
+        """Cuenta las entradas de una colección sin leer segmentos"""
+        if coleccion in self.reemplazos:
+            base = len(self.reemplazos[coleccion])
+        else:
+            base = self.indice['segmentos'][coleccion]['total']
+        
+        return base + len(self.pendientes[coleccion])
+    
+    def ultima_publicacion(self, tipo=None):
+        """
+        Obtiene la última publicación (opcionalmente de un tipo) desde la cabecera
+        
+        Returns:
+            dict o None
+        """
+        return self.indice['ultimas_publicaciones'].get(tipo or '*')
+    
+    def contar_por_tipo(self):
+        """
+        Cuenta publicaciones por tipo desde la cabecera
+        
+        Returns:
+            dict: {tipo: cantidad}
+        """
+        return dict(self.indice['conteo_por_tipo'])
+    
+    def cerrar(self):
+        """Sin recursos abiertos entre operaciones"""
+        pass
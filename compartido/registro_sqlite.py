@@ -0,0 +1,278 @@
+"""
+Almacén SQLite para el registro de publicaciones
+Guarda el historial en tablas indexadas y el resto del registro
+(contadores, estadísticas) como un documento JSON pequeño
+"""
+
+import os
+import json
+import sqlite3
+
+
+# Columnas de cada colección del historial (en el orden de la tabla)
+COLUMNAS = {
+    'publicaciones': (
+        'fecha', 'mensaje_archivo', 'contenido_preview', 'longitud',
+        'estado', 'intentos', 'tiempo_ejecucion', 'tipo'
+    ),
+    'errores': ('fecha', 'mensaje_archivo', 'error', 'tipo'),
+    'extracciones': ('fecha', 'grupo', 'cantidad_extraida', 'indice_anterior', 'indice_nuevo')
+}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS estado (
+    clave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS publicaciones (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fecha TEXT,
+    mensaje_archivo TEXT,
+    contenido_preview TEXT,
+    longitud INTEGER,
+    estado TEXT,
+    intentos INTEGER,
+    tiempo_ejecucion REAL,
+    tipo TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_publicaciones_fecha ON publicaciones (fecha);
+CREATE INDEX IF NOT EXISTS idx_publicaciones_tipo ON publicaciones (tipo);
+CREATE INDEX IF NOT EXISTS idx_publicaciones_mensaje ON publicaciones (mensaje_archivo);
+
+CREATE TABLE IF NOT EXISTS errores (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fecha TEXT,
+    mensaje_archivo TEXT,
+    error TEXT,
+    tipo TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_errores_fecha ON errores (fecha);
+CREATE INDEX IF NOT EXISTS idx_errores_tipo ON errores (tipo);
+CREATE INDEX IF NOT EXISTS idx_errores_mensaje ON errores (mensaje_archivo);
+
+CREATE TABLE IF NOT EXISTS extracciones (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fecha TEXT,
+    grupo TEXT,
+    cantidad_extraida INTEGER,
+    indice_anterior INTEGER,
+    indice_nuevo INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_extracciones_fecha ON extracciones (fecha);
+"""
+
+
+class AlmacenRegistroSQLite:
+    """
+    Persistencia del registro en una base SQLite
+    Las escrituras quedan en una transacción abierta hasta confirmar()
+    """
+    
+    def __init__(self, archivo_db):
+        self.archivo_db = archivo_db
+        
+        carpeta = os.path.dirname(archivo_db)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        
+        self.conexion = sqlite3.connect(archivo_db)
+        self.conexion.row_factory = sqlite3.Row
+        self.conexion.executescript(ESQUEMA)
+    
+    def cargar_estado(self):
+        """
+        Carga el documento de estado (registro sin historial)
+        
+        Returns:
+            dict o None si la base está vacía
+        """
+        fila = self.conexion.execute(
+            "SELECT valor FROM estado WHERE clave = 'registro'"
+        ).fetchone()
+        
+        return json.loads(fila['valor']) if fila else None
+    
+    def guardar_estado(self, estado):
+        """Guarda el documento de estado dentro de la transacción actual"""
+        self.conexion.execute(
+            "INSERT OR REPLACE INTO estado (clave, valor) VALUES ('registro', ?)",
+            (json.dumps(estado, ensure_ascii=False),)
+        )
+    
+    def agregar(self, coleccion, entrada):
+        """Inserta una entrada de historial dentro de la transacción actual"""
+        columnas = COLUMNAS[coleccion]
+        marcadores = ', '.join('?' for _ in columnas)
+        
+        self.conexion.execute(
+            f"INSERT INTO {coleccion} ({', '.join(columnas)}) VALUES ({marcadores})",
+            [entrada.get(columna) for columna in columnas]
+        )
+    
+    def reemplazar(self, coleccion, entradas):
+        """Reemplaza todo el contenido de una colección"""
+        self.conexion.execute(f"DELETE FROM {coleccion}")
+        for entrada in entradas:
+            self.agregar(coleccion, entrada)
+    
+    def retirar_antiguas(self, coleccion, retener_entradas=0, fecha_limite=None):
+        """
+        Retira del historial vivo las entradas fuera de la retención
+        Usa el id (entradas) y el índice de fecha (días) sin recorrer la tabla
+        
+        Args:
+            coleccion: Colección a recortar
+            retener_entradas: Máximo de entradas a conservar (0 = sin límite)
+            fecha_limite: Fecha 'AAAA-MM-DD HH:MM:SS'; se retira lo anterior (None = sin límite)
+        
+        Returns:
+            list: Entradas retiradas en orden cronológico
+        """
+        id_corte = None
+        
+        if retener_entradas > 0:
+            fila = self.conexion.execute(
+                f"SELECT id FROM {coleccion} ORDER BY id DESC LIMIT 1 OFFSET ?",
+                (retener_entradas,)
+            ).fetchone()
+            if fila:
+                id_corte = fila['id']
+        
+        if fecha_limite:
+            fila = self.conexion.execute(
+                f"SELECT MAX(id) AS id FROM {coleccion} WHERE fecha < ?",
+                (fecha_limite,)
+            ).fetchone()
+            if fila['id'] is not None:
+                id_corte = max(id_corte or 0, fila['id'])
+        
+        if id_corte is None:
+            return []
+        
+        columnas = ', '.join(COLUMNAS[coleccion])
+        filas = self.conexion.execute(
+            f"SELECT {columnas} FROM {coleccion} WHERE id <= ? ORDER BY id",
+            (id_corte,)
+        )
+        retiradas = [dict(fila) for fila in filas]
+        
+        self.conexion.execute(f"DELETE FROM {coleccion} WHERE id <= ?", (id_corte,))
+        return retiradas
+    
+    def confirmar(self):
+        """Confirma la transacción actual"""
+        self.conexion.commit()
+    
+    def deshacer(self):
+        """Descarta la transacción actual"""
+        self.conexion.rollback()
+    
+    def listar(self, coleccion):
+        """
+        Lista una colección completa en orden de inserción
+        
+        Returns:
+            list: Entradas como diccionarios
+        """
+        columnas = COLUMNAS[coleccion]
+        filas = self.conexion.execute(
+            f"SELECT {', '.join(columnas)} FROM {coleccion} ORDER BY id"
+        )
+        return [dict(fila) for fila in filas]
+    
+    def iterar_desde(self, coleccion, fecha):
+        """
+        Recorre las entradas con fecha igual o posterior a 'fecha'
+        Consulta sobre el índice de fecha, no recorre la tabla
+        """
+        columnas = COLUMNAS[coleccion]
+        filas = self.conexion.execute(
+            f"SELECT {', '.join(columnas)} FROM {coleccion} WHERE fecha >= ? ORDER BY id",
+            (fecha,)
+        )
+        for fila in filas:
+            yield dict(fila)
+    
+    def contar(self, coleccion):
+        """Cuenta las entradas de una colección"""
+        return self.conexion.execute(f"SELECT COUNT(*) FROM {coleccion}").fetchone()[0]
+    
+    def ultima_publicacion(self, tipo=None):
+        """
+        Obtiene la última publicación (opcionalmente de un tipo)
+        Consulta puntual sobre el índice de tipo, no recorre el historial
+        
+        Returns:
+            dict o None
+        """
+        columnas = ', '.join(COLUMNAS['publicaciones'])
+        
+        if tipo is None:
+            fila = self.conexion.execute(
+                f"SELECT {columnas} FROM publicaciones ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+        else:
+            fila = self.conexion.execute(
+                f"SELECT {columnas} FROM publicaciones WHERE tipo = ? ORDER BY id DESC LIMIT 1",
+                (tipo,)
+            ).fetchone()
+        
+        return dict(fila) if fila else None
+    
+    def contar_por_tipo(self):
+        """
+        Cuenta publicaciones por tipo usando el índice de tipo
+        
+        Returns:
+            dict: {tipo: cantidad}
+        """
+        filas = self.conexion.execute(
+            "SELECT tipo, COUNT(*) AS cantidad FROM publicaciones GROUP BY tipo"
+        )
+        return {fila['tipo']: fila['cantidad'] for fila in filas}
+    
+    def cerrar(self):
+        """Cierra la conexión"""
+        self.conexion.close()
+
+
+def migrar_json_a_sqlite(registro, archivo_db):
+    """
+    Migra un registro completo (formato JSON) a una base SQLite
+    
+    Args:
+        registro: Diccionario completo con historial_completo, errores, etc.
+        archivo_db: Ruta de la base SQLite destino
+    
+    Returns:
+        dict: Cantidad de entradas migradas por colección
+    """
+    almacen = AlmacenRegistroSQLite(archivo_db)
+    
+    try:
+        estado = dict(registro)
+        historial = estado.pop('historial_completo', [])
+        errores = estado.pop('errores', [])
+        
+        estado['predicaciones_whatsapp'] = dict(estado.get('predicaciones_whatsapp', {}))
+        extracciones = estado['predicaciones_whatsapp'].pop('historial_extracciones', [])
+        
+        almacen.reemplazar('publicaciones', historial)
+        almacen.reemplazar('errores', errores)
+        almacen.reemplazar('extracciones', extracciones)
+        almacen.guardar_estado(estado)
+        almacen.confirmar()
+        
+        return {
+            'publicaciones': len(historial),
+            'errores': len(errores),
+            'extracciones': len(extracciones)
+        }
+    
+    except Exception:
+        almacen.deshacer()
+        raise
+    
+    finally:
+        almacen.cerrar()
@@ -0,0 +1,254 @@
+"""
+Índice de mensajes casi repetidos (MinHash + LSH)
+Cada mensaje se normaliza (minúsculas, sin acentos, sin puntuación, emojis,
+hashtags, enlaces ni líneas de firma) y se divide en pares de palabras. Su
+firma MinHash de 32 valores se reparte en 16 bandas de 2: dos mensajes con
+similitud 0.6 coinciden en alguna banda el 99.9% de las veces (con 8 bandas
+de 4 solo el 67%); los candidatos de más se descartan comparando firmas. Las
+firmas y las
+bandas se guardan en <carpeta_mensajes>.similitud.db (SQLite), así buscar
+los parecidos a un mensaje es una consulta indexada por banda, sin comparar
+contra todo el catálogo.
+"""
+
+import os
+import re
+import random
+import sqlite3
+import struct
+import hashlib
+import unicodedata
+
+
+SUFIJO_SIMILITUD = ".similitud.db"
+VERSION_SIMILITUD = 2
+NUM_PERMUTACIONES = 32
+FILAS_POR_BANDA = 2
+NUM_BANDAS = NUM_PERMUTACIONES // FILAS_POR_BANDA
+PRIMO = (1 << 61) - 1
+FORMATO_FIRMA = struct.Struct(f'<{NUM_PERMUTACIONES}I')
+
+# Coeficientes fijos: las firmas guardadas siguen siendo comparables entre ejecuciones
+_generador = random.Random(1960)
+COEFICIENTES = [(_generador.randrange(1, PRIMO), _generador.randrange(0, PRIMO)) for _ in range(NUM_PERMUTACIONES)]
+
+PATRON_ENLACE = re.compile(r'https?://\S+|www\.\S+')
+PATRON_HASHTAG = re.compile(r'#\w+')
+PATRON_PALABRA = re.compile(r'\w+')
+INICIO_FIRMA = ('—', '–', '-', '~', '✍')
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS estado (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+
+CREATE TABLE IF NOT EXISTS firmas (
+    nombre TEXT PRIMARY KEY,
+    hash TEXT,
+    firma BLOB
+);
+
+CREATE TABLE IF NOT EXISTS bandas (
+    banda INTEGER,
+    clave INTEGER,
+    nombre TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_bandas_clave ON bandas (banda, clave);
+CREATE INDEX IF NOT EXISTS idx_bandas_nombre ON bandas (nombre);
+"""
+
+
+def normalizar_texto(texto):
+    """
+    Palabras de un mensaje sin lo que no cambia su sentido
+    (mayúsculas, acentos, puntuación, emojis, hashtags, enlaces y líneas
+    de firma que empiezan con guion)
+    
+    Returns:
+        list: Palabras normalizadas
+    """
+    lineas = [linea for linea in texto.splitlines() if not linea.strip().startswith(INICIO_FIRMA)]
+    texto = PATRON_HASHTAG.sub(' ', PATRON_ENLACE.sub(' ', '\n'.join(lineas)))
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    texto = ''.join(caracter for caracter in texto if not unicodedata.combining(caracter))
+    return PATRON_PALABRA.findall(texto)
+
+
+def calcular_firma(texto):
+    """
+    Firma MinHash de un mensaje (pares de palabras consecutivas)
+    
+    Returns:
+        tuple: NUM_PERMUTACIONES enteros de 32 bits, o None si no tiene palabras
+    """
+    palabras = normalizar_texto(texto)
+    tejas = {' '.join(palabras[i:i + 2]) for i in range(max(1, len(palabras) - 1))} if palabras else set()
+    
+    if not tejas:
+        return None
+    
+    valores = [
+        int.from_bytes(hashlib.blake2b(teja.encode('utf-8'), digest_size=8).digest(), 'little')
+        for teja in tejas
+    ]
+    
+    return tuple(
+        min((a * valor + b) % PRIMO for valor in valores) & 0xFFFFFFFF
+        for a, b in COEFICIENTES
+    )
+
+
+def similitud_estimada(firma_a, firma_b):
+    """Similitud de Jaccard estimada entre dos firmas (0 a 1)"""
+    return sum(1 for a, b in zip(firma_a, firma_b) if a == b) / NUM_PERMUTACIONES
+
+
+def claves_bandas(firma):
+    """Clave de cada banda de la firma (entero de 64 bits con signo, para SQLite)"""
+    claves = []
+    for banda in range(NUM_BANDAS):
+        fragmento = FORMATO_FIRMA.pack(*firma)[banda * FILAS_POR_BANDA * 4:(banda + 1) * FILAS_POR_BANDA * 4]
+        claves.append(int.from_bytes(hashlib.blake2b(fragmento, digest_size=8).digest(), 'little', signed=True))
+    return claves
+
+
+class IndiceSimilitud:
+    """
+    Firmas MinHash y bandas LSH de los mensajes de una carpeta
+    """
+    
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        self.archivo_db = os.path.normpath(carpeta) + SUFIJO_SIMILITUD
+        
+        self.conexion = sqlite3.connect(self.archivo_db)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.executescript(ESQUEMA)
+        
+        # Bandas de otra versión (otro reparto de la firma): se vuelve a indexar
+        if self._leer_estado('version') != str(VERSION_SIMILITUD):
+            with self.conexion:
+                for tabla in ('firmas', 'bandas', 'estado'):
+                    self.conexion.execute(f"DELETE FROM {tabla}")
+                self.conexion.execute(
+                    "INSERT INTO estado (clave, valor) VALUES ('version', ?)", (str(VERSION_SIMILITUD),)
+                )
+    
+    def _leer_estado(self, clave):
+        fila = self.conexion.execute("SELECT valor FROM estado WHERE clave = ?", (clave,)).fetchone()
+        return fila[0] if fila else None
+    
+    def _quitar(self, nombre):
+        self.conexion.execute("DELETE FROM firmas WHERE nombre = ?", (nombre,))
+        self.conexion.execute("DELETE FROM bandas WHERE nombre = ?", (nombre,))
+    
+    def _agregar(self, nombre, hash_texto, texto):
+        firma = calcular_firma(texto)
+        
+        self.conexion.execute(
+            "INSERT OR REPLACE INTO firmas (nombre, hash, firma) VALUES (?, ?, ?)",
+            (nombre, hash_texto, FORMATO_FIRMA.pack(*firma) if firma else None)
+        )
+        if firma:
+            self.conexion.executemany(
+                "INSERT INTO bandas (banda, clave, nombre) VALUES (?, ?, ?)",
+                [(banda, clave, nombre) for banda, clave in enumerate(claves_bandas(firma))]
+            )
+    
+    def sincronizar(self, catalogo):
+        """
+        Calcula las firmas de los mensajes nuevos o modificados y quita las
+        de los eliminados. Solo compara con el catálogo si este cambió, y
+        entonces compara hashes guardados (en el catálogo o en el índice del
+        paquete): solo se leen los textos de los mensajes que cambiaron
+        
+        Args:
+            catalogo: CatalogoMensajes o PaqueteMensajes
+        
+        Returns:
+            dict: {'agregados': n, 'eliminados': n}
+        """
+        cambios = {'agregados': 0, 'eliminados': 0}
+        
+        if self._leer_estado('mtime_catalogo') == str(catalogo.mtime_carpeta):
+            return cambios
+        
+        indexados = dict(self.conexion.execute("SELECT nombre, hash FROM firmas"))
+        
+        with self.conexion:
+            for nombre in indexados:
+                if nombre not in catalogo:
+                    self._quitar(nombre)
+                    cambios['eliminados'] += 1
+            
+            for nombre in catalogo.nombres:
+                hash_texto = catalogo.hash_de(nombre)
+                if indexados.get(nombre) == hash_texto:
+                    continue
+                
+                if nombre in indexados:
+                    self._quitar(nombre)
+                self._agregar(nombre, hash_texto, catalogo.leer(nombre))
+                cambios['agregados'] += 1
+            
+            self.conexion.execute(
+                "INSERT OR REPLACE INTO estado (clave, valor) VALUES ('mtime_catalogo', ?)",
+                (str(catalogo.mtime_carpeta),)
+            )
+        
+        return cambios
+    
+    def firma(self, nombre):
+        """Firma guardada de un mensaje (None si no está o no tiene palabras)"""
+        fila = self.conexion.execute("SELECT firma FROM firmas WHERE nombre = ?", (nombre,)).fetchone()
+        return FORMATO_FIRMA.unpack(fila[0]) if fila and fila[0] else None
+    
+    def similares(self, nombre, umbral=0.6):
+        """
+        Mensajes casi iguales a uno dado (candidatos por banda, confirmados
+        con la similitud estimada de las firmas)
+        
+        Returns:
+            dict: {nombre: similitud}
+        """
+        firma = self.firma(nombre)
+        if not firma:
+            return {}
+        
+        candidatos = set()
+        for banda, clave in enumerate(claves_bandas(firma)):
+            candidatos.update(
+                fila[0] for fila in self.conexion.execute(
+                    "SELECT nombre FROM bandas WHERE banda = ? AND clave = ?", (banda, clave)
+                )
+            )
+        candidatos.discard(nombre)
+        
+        parecidos = {}
+        for candidato in candidatos:
+            similitud = similitud_estimada(firma, self.firma(candidato))
+            if similitud >= umbral:
+                parecidos[candidato] = similitud
+        
+        return parecidos
+    
+    def similares_a_recientes(self, recientes, umbral=0.6):
+        """
+        Conjunto de mensajes casi iguales a alguno de los publicados recientemente
+        
+        Args:
+            recientes: Nombres de los últimos mensajes publicados
+            umbral: Similitud mínima (0 a 1)
+        
+        Returns:
+            set: Nombres a evitar
+        """
+        evitar = set()
+        for nombre in recientes:
+            evitar.update(self.similares(nombre, umbral))
+        return evitar
+    
+    def cerrar(self):
+        """Cierra la conexión"""
+        self.conexion.close()
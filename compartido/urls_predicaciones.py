@@ -0,0 +1,184 @@
+"""
+Normalización de URLs de predicaciones
+Una misma predicación puede llegar con distintas URLs (youtu.be, shorts,
+m.youtube.com, parámetros de rastreo...). canonicalizar_url() las lleva a
+una forma única para guardarlas y compararlas.
+"""
+
+import re
+import sys
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+
+DOMINIOS_VALIDOS = ['instagram.com', 'youtube.com', 'youtu.be', 'facebook.com', 'fb.watch', 'tiktok.com']
+
+# Prefijos de host que apuntan al mismo sitio
+PREFIJOS_HOST = ('www.', 'm.', 'mobile.', 'web.', 'mbasic.', 'music.')
+
+# Parámetros de rastreo o de presentación que no cambian el contenido
+# (list e index solo sobran junto a un video: watch?v=ID lo resuelve
+# _canonicalizar_youtube; sin video, list identifica la lista misma)
+PARAMETROS_DESCARTABLES = {
+    'si', 'feature', 'pp', 't', 'start', 'ab_channel',
+    'igshid', 'igsh', 'img_index',
+    'fbclid', 'mibextid', 'rdid', 'ref', 'refsrc', 'sfnsn', 'share_url',
+    'is_from_webapp', 'sender_device', 'web_id', 'is_copy_url', '_r', '_t',
+    'lang', 'source', 'share_app_id', 'share_link_id'
+}
+
+# Sitios que se sirven igual con o sin www. (se unifican con www.)
+HOSTS_CON_WWW = ('youtube.com', 'instagram.com', 'facebook.com', 'tiktok.com')
+
+PATRON_ID_YOUTUBE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+
+
+def _host_base(host):
+    """Host en minúsculas sin puerto ni prefijos equivalentes (www., m., ...)"""
+    host = host.lower().split(':')[0]
+    for prefijo in PREFIJOS_HOST:
+        if host.startswith(prefijo):
+            return host[len(prefijo):]
+    return host
+
+
+def _partes_ruta(ruta):
+    """Segmentos no vacíos de la ruta"""
+    return [parte for parte in ruta.split('/') if parte]
+
+
+def _canonicalizar_youtube(host, partes, parametros):
+    """youtu.be/ID, watch?v=ID, shorts/ID, embed/ID, live/ID → watch?v=ID"""
+    video_id = None
+    
+    if host == 'youtu.be' and partes:
+        video_id = partes[0]
+    elif parametros.get('v'):
+        video_id = parametros['v']
+    elif len(partes) >= 2 and partes[0] in ('shorts', 'embed', 'live', 'v', 'e'):
+        video_id = partes[1]
+    
+    if video_id and PATRON_ID_YOUTUBE.match(video_id):
+        return f"https://www.youtube.com/watch?v={video_id}"
+    
+    return None
+
+
+def _canonicalizar_instagram(partes):
+    """p/ID, reel/ID, reels/ID, tv/ID (con o sin usuario delante) → p/ID/"""
+    for posicion, parte in enumerate(partes[:-1]):
+        if parte in ('p', 'reel', 'reels', 'tv'):
+            return f"https://www.instagram.com/p/{partes[posicion + 1]}/"
+    
+    return None
+
+
+def _canonicalizar_facebook(host, partes, parametros):
+    """watch?v=ID, <página>/videos/ID, reel/ID, fb.watch/CODIGO"""
+    if host == 'fb.watch' and partes:
+        return f"https://fb.watch/{partes[0]}/"
+    
+    video_id = parametros.get('v')
+    
+    if not video_id:
+        for posicion, parte in enumerate(partes[:-1]):
+            if parte in ('videos', 'reel', 'reels'):
+                video_id = partes[posicion + 1]
+                break
+    
+    if video_id and video_id.isdigit():
+        return f"https://www.facebook.com/watch/?v={video_id}"
+    
+    return None
+
+
+def _canonicalizar_tiktok(host, partes):
+    """@usuario/video/ID → forma fija; vm./vt. se conservan (no se pueden resolver sin red)"""
+    if host in ('vm.tiktok.com', 'vt.tiktok.com') and partes:
+        return f"https://{host}/{partes[0]}/"
+    
+    if len(partes) >= 3 and partes[0].startswith('@') and partes[1] == 'video':
+        return f"https://www.tiktok.com/{partes[0].lower()}/video/{partes[2]}"
+    
+    return None
+
+
+def canonicalizar_url(url):
+    """
+    Lleva una URL de predicación a su forma canónica
+    
+    Args:
+        url: URL tal como se extrajo
+    
+    Returns:
+        str: URL canónica (o la original sin parámetros de rastreo si no
+             se reconoce el formato)
+    """
+    if not url:
+        return url
+    
+    url = url.strip()
+    partes_url = urlsplit(url if '://' in url else 'https://' + url)
+    
+    host = _host_base(partes_url.netloc)
+    partes = _partes_ruta(partes_url.path)
+    parametros = dict(parse_qsl(partes_url.query))
+    
+    canonica = None
+    
+    if host in ('youtube.com', 'youtu.be', 'youtube-nocookie.com'):
+        canonica = _canonicalizar_youtube(host, partes, parametros)
+    elif host == 'instagram.com':
+        canonica = _canonicalizar_instagram(partes)
+    elif host in ('facebook.com', 'fb.com', 'fb.watch'):
+        canonica = _canonicalizar_facebook(host, partes, parametros)
+    elif host.endswith('tiktok.com'):
+        canonica = _canonicalizar_tiktok(host, partes)
+    
+    if canonica:
+        return canonica
+    
+    # Formato no reconocido: solo quitar rastreo, fragmento y barra final
+    consulta = urlencode([
+        (clave, valor) for clave, valor in parse_qsl(partes_url.query)
+        if clave.lower() not in PARAMETROS_DESCARTABLES and not clave.lower().startswith('utm_')
+    ])
+    ruta = partes_url.path.rstrip('/')
+    host = f"www.{host}" if host in HOSTS_CON_WWW else host
+    
+    return f"https://{host}{ruta}" + (f"?{consulta}" if consulta else "")
+
+
+def es_url_valida(url):
+    """Verifica si la URL es de una plataforma válida"""
+    return any(dominio in url for dominio in DOMINIOS_VALIDOS)
+
+
+def main():
+    """
+    Función de prueba del módulo
+    Uso: py -m compartido.urls_predicaciones
+    """
+    casos = [
+        ("https://youtu.be/dQw4w9WgXcQ?si=abc", "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+        ("https://m.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123&index=4", "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+        ("https://www.youtube.com/playlist?list=PLaaaa&si=xyz", "https://www.youtube.com/playlist?list=PLaaaa"),
+        ("https://www.youtube.com/playlist?list=PLbbbb", "https://www.youtube.com/playlist?list=PLbbbb"),
+        ("https://www.instagram.com/reel/Cabc123/?igsh=xyz", "https://www.instagram.com/p/Cabc123/"),
+        ("https://m.facebook.com/pagina/videos/123456/", "https://www.facebook.com/watch/?v=123456"),
+    ]
+    
+    fallidos = 0
+    for url, esperada in casos:
+        canonica = canonicalizar_url(url)
+        if canonica == esperada:
+            print(f"✅ {url} → {canonica}")
+        else:
+            fallidos += 1
+            print(f"❌ {url} → {canonica} (se esperaba {esperada})")
+    
+    print(f"\n{len(casos) - fallidos}/{len(casos)} casos correctos")
+    sys.exit(1 if fallidos else 0)
+
+
+if __name__ == "__main__":
+    main()
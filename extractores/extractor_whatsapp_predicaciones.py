@@ -1,6 +1,6 @@
 import os
+import re
 import time
-import json
 import requests
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -9,13 +9,152 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.firefox.options import Options as FirefoxOptions
 
+from compartido.indice_urls import abrir_historial_publicados
+from compartido.cola_predicaciones import ColaPredicaciones
+from compartido.disposicion_carpetas import preparar_ruta, ruta_archivo
+from compartido.histograma_latencias import histograma_vacio, registrar_latencia, registrar_maximo
+from compartido.marcas_extraccion import MarcasExtraccion, leer_fecha_mensaje
+from compartido.urls_predicaciones import canonicalizar_url, es_url_valida
+
+
+# URLs de plataformas dentro del texto de un mensaje
+PATRON_URL_TEXTO = re.compile(
+    r'https?://(?:www\.)?(?:instagram\.com|youtube\.com|youtu\.be|facebook\.com|fb\.watch|tiktok\.com)[^\s]+'
+)
+
+# Lee los mensajes propios del DOM en una sola llamada a WebDriver
+# arguments[0]: marca de la extracción; si viene, devuelve solo los nodos que
+# todavía no tienen esa marca y se la pone (los ya leídos no se vuelven a
+# serializar en las iteraciones siguientes)
+SCRIPT_COSECHA_MENSAJES = """
+const marca = arguments[0];
+const resultado = [];
+for (const mensaje of document.querySelectorAll("div[class*='message-out']")) {
+    if (marca) {
+        if (mensaje.getAttribute("data-cosecha") === marca) continue;
+        mensaje.setAttribute("data-cosecha", marca);
+    }
+    const contenedor = mensaje.closest("div[data-id]");
+    const previo = mensaje.querySelector("div[data-pre-plain-text]");
+    const texto = mensaje.querySelector("span[class*='copyable-text']");
+    resultado.push({
+        id: contenedor ? contenedor.getAttribute("data-id") : null,
+        previo: previo ? previo.getAttribute("data-pre-plain-text") : null,
+        texto: texto ? texto.innerText : "",
+        copiables: Array.from(mensaje.querySelectorAll("a[class*='copyable-text']"), a => a.getAttribute("href") || ""),
+        hrefs: Array.from(mensaje.querySelectorAll("a[href]"), a => a.getAttribute("href"))
+    });
+}
+return resultado;
+"""
+
+# Hace scroll hacia arriba y espera, con un MutationObserver instalado antes
+# del scroll, a que aparezcan mensajes nuevos o el aviso de cifrado que
+# WhatsApp muestra al principio del chat (como máximo arguments[1] ms)
+# El aviso solo cuenta si está fuera de todo mensaje y antes del primero
+# de la lista: un mensaje que cite la frase no es el inicio del chat
+# Devuelve {motivo: 'mensajes'|'inicio'|'limite', ms}
+SCRIPT_SCROLL_Y_ESPERA = """
+const contenedor = arguments[0];
+const limiteMs = arguments[1];
+const terminar = arguments[arguments.length - 1];
+const XPATH_AVISO_INICIO =
+    ".//text()[contains(., 'cifrados de extremo a extremo') or contains(., 'end-to-end encrypted')]" +
+    "[not(ancestor::*[contains(@class, 'message-in') or contains(@class, 'message-out')])]";
+const esInicio = (raiz) => {
+    const aviso = document.evaluate(XPATH_AVISO_INICIO, raiz, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    if (!aviso) return false;
+    const primero = contenedor.querySelector("[class*='message-in'], [class*='message-out']");
+    return !primero || Boolean(aviso.compareDocumentPosition(primero) & Node.DOCUMENT_POSITION_FOLLOWING);
+};
+const inicio = performance.now();
+let reloj = null;
+let listo = false;
+
+const observador = new MutationObserver((cambios) => {
+    for (const cambio of cambios) {
+        for (const nodo of cambio.addedNodes) {
+            if (nodo.nodeType !== 1) continue;
+            if (nodo.matches("div[data-id]") || nodo.querySelector("div[data-id]")) return fin("mensajes");
+            if (esInicio(nodo)) return fin("inicio");
+        }
+    }
+});
+
+function fin(motivo) {
+    if (listo) return;
+    listo = true;
+    observador.disconnect();
+    clearTimeout(reloj);
+    terminar({motivo: motivo, ms: Math.round(performance.now() - inicio)});
+}
+
+observador.observe(contenedor, {childList: true, subtree: true});
+reloj = setTimeout(() => fin("limite"), limiteMs);
+
+contenedor.scrollTop = Math.max(0, contenedor.scrollTop - 3000);
+const primerMensaje = document.querySelector("div[class*='message-out']");
+if (primerMensaje) primerMensaje.scrollIntoView({block: "start", behavior: "smooth"});
+
+// Ya estaba arriba de todo: no va a cargar nada más
+if (esInicio(contenedor)) fin("inicio");
+"""
+
+
+class SesionExtraccion:
+    """
+    Estado de una extracción, leído del disco una sola vez al empezar:
+    pendientes en la cola, instantánea de las URLs publicadas y URLs ya
+    vistas (las de la cola más las extraídas en esta sesión). Durante el
+    bucle de scroll todo se consulta y actualiza en memoria.
+    """
+    
+    def __init__(self, objetivo, pendientes, numero_siguiente, urls_publicadas, urls_pendientes):
+        self.objetivo = objetivo
+        self.pendientes = pendientes
+        self.numero_siguiente = numero_siguiente
+        self.urls_publicadas = urls_publicadas
+        self.urls_vistas = set(urls_pendientes)
+        self.predicaciones = []
+    
+    @property
+    def total_pendientes(self):
+        """Pendientes en la cola más las extraídas en esta sesión"""
+        return self.pendientes + len(self.predicaciones)
+    
+    def objetivo_alcanzado(self):
+        """Indica si ya hay suficientes predicaciones pendientes"""
+        return self.total_pendientes >= self.objetivo
+    
+    def es_nueva(self, url):
+        """La URL (canónica) no está publicada, en la cola ni extraída en esta sesión"""
+        return url not in self.urls_vistas and url not in self.urls_publicadas
+    
+    def agregar(self, url):
+        """
+        Registra una predicación nueva con el siguiente número libre
+        
+        Returns:
+            dict: {'tipo', 'contenido', 'numero'}
+        """
+        predicacion = {
+            'tipo': 'enlace',
+            'contenido': url,
+            'numero': self.numero_siguiente
+        }
+        self.predicaciones.append(predicacion)
+        self.urls_vistas.add(url)
+        self.numero_siguiente += 1
+        return predicacion
+
 
 class ExtractorWhatsAppPredicaciones:
     """
     Extractor de predicaciones desde WhatsApp Web - VERSIÓN FINAL
     - Extrae de más nuevo a más viejo con scroll inteligente
-    - Detecta predicaciones ya publicadas (historial JSON)
+    - Detecta predicaciones ya publicadas (índice de URLs en disco)
     - Se detiene al tener 5 pendientes o al llegar al inicio del grupo
+    - Marca de agua por grupo: no vuelve a revisar mensajes ya revisados
     """
     
     def __init__(self):
@@ -28,53 +167,53 @@ class ExtractorWhatsAppPredicaciones:
         self.PREDICACIONES_OBJETIVO = 5  # Mantener 5 predicaciones pendientes
         self.MAX_SCROLLS = 200  # Máximo de scrolls (seguridad)
         self.SCROLLS_SIN_CAMBIO_LIMITE = 15  # Parar si 15 scrolls no encuentran nuevas
+        self.ITERACIONES_SIN_MENSAJES_LIMITE = 3  # Inicio del chat: 3 scrolls sin mensajes nuevos en el DOM
+        self.ESPERA_MAXIMA_SCROLL = 10  # Segundos máximos esperando mensajes tras un scroll
+        
+        # Espera de cada scroll de la última extracción: (segundos, motivo)
+        self.latencias_scroll = []
         
         # Crear carpetas
         os.makedirs(self.carpeta_pendientes, exist_ok=True)
         os.makedirs(self.carpeta_publicados, exist_ok=True)
+        
+        # Manifiesto de la cola (conteos y numeración sin recorrer carpetas)
+        self.cola = ColaPredicaciones()
+        
+        # Marcas de agua por grupo (tramo del chat ya revisado)
+        self.marcas = MarcasExtraccion()
+        self.marca_pendiente = None
     
     def cargar_historial(self):
-        """Carga el historial de predicaciones publicadas"""
-        if os.path.exists(self.archivo_historial):
-            try:
-                with open(self.archivo_historial, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return self._crear_historial_vacio()
-        return self._crear_historial_vacio()
+        """
+        Abre el índice de URLs publicadas
+        La consulta de pertenencia lee el disco directamente, no carga la lista
+        """
+        return abrir_historial_publicados(self.archivo_historial)
     
-    def _crear_historial_vacio(self):
-        """Crea estructura de historial vacío"""
-        return {
-            "urls_publicadas": [],
-            "total_publicadas": 0,
-            "ultima_actualizacion": None
-        }
+    def cargar_urls_pendientes(self):
+        """
+        URLs (forma canónica) de las predicaciones que ya esperan en la cola,
+        para no extraerlas de nuevo
+        """
+        urls = set()
+        
+        for nombre_archivo in self.cola.listar_pendientes():
+            try:
+                with open(ruta_archivo(self.carpeta_pendientes, nombre_archivo), 'r', encoding='utf-8') as f:
+                    urls.add(canonicalizar_url(f.read().strip()))
+            except OSError:
+                continue
+        
+        return urls
     
     def contar_pendientes(self):
-        """Cuenta cuántas predicaciones hay pendientes"""
-        if not os.path.exists(self.carpeta_pendientes):
-            return 0
-        
-        archivos = [f for f in os.listdir(self.carpeta_pendientes) 
-                   if f.startswith('predica-') and f.endswith('.txt')]
-        return len(archivos)
+        """Cuenta cuántas predicaciones hay pendientes (contador del manifiesto)"""
+        return self.cola.contar('pendiente')
     
     def obtener_siguiente_numero(self):
-        """Obtiene el siguiente número de predicación disponible"""
-        todos = []
-        
-        for carpeta in [self.carpeta_pendientes, self.carpeta_publicados]:
-            if os.path.exists(carpeta):
-                for archivo in os.listdir(carpeta):
-                    if archivo.startswith('predica-') and archivo.endswith('.txt'):
-                        try:
-                            num = int(archivo.replace('predica-', '').replace('.txt', ''))
-                            todos.append(num)
-                        except:
-                            pass
-        
-        return max(todos) + 1 if todos else 1
+        """Obtiene el siguiente número de predicación disponible (índice del manifiesto)"""
+        return self.cola.siguiente_numero()
     
     def iniciar_navegador(self):
         """Inicializa Firefox con perfil existente"""
@@ -106,6 +245,7 @@ class ExtractorWhatsAppPredicaciones:
             
             self.driver = webdriver.Firefox(options=opciones)
             self.driver.maximize_window()
+            self.driver.set_script_timeout(self.ESPERA_MAXIMA_SCROLL + 5)
             print("✅ Navegador iniciado")
             
             # Ir a WhatsApp Web
@@ -168,43 +308,70 @@ class ExtractorWhatsAppPredicaciones:
             print(f"❌ Error buscando grupo: {e}")
             return False
     
-    def extraer_siguiente_lote(self, cantidad=None, indice_inicio=0, solo_propios=True):
+    def extraer_siguiente_lote(self, cantidad=None, indice_inicio=0, solo_propios=True, nombre_grupo=None):
         """
         NUEVA ESTRATEGIA INTELIGENTE:
         Extrae predicaciones con scroll progresivo y detección de publicadas
         Se detiene al tener 5 pendientes o al llegar al inicio del grupo
+        
+        Con nombre_grupo usa la marca de agua del grupo: revisa los mensajes
+        más nuevos que la marca (todos, aunque se pase del objetivo, para que
+        el tramo revisado siga siendo continuo), saltea sin leer el tramo ya
+        revisado y sigue hacia atrás desde el mensaje más viejo revisado
         """
         if cantidad is None:
             cantidad = self.PREDICACIONES_OBJETIVO
         
+        marca = self.marcas.obtener(nombre_grupo) if nombre_grupo else {}
+        
+        # Fases: 'nuevos' (hasta la marca), 'saltando' (tramo ya revisado),
+        # 'relleno' (más viejos que el tramo), 'completo' (grupo sin marca),
+        # 'fin' (ya se había revisado hasta el inicio del chat)
+        fase = 'nuevos' if marca.get('id_reciente') else 'completo'
+        
+        # Todo lo que se necesita del disco se lee acá, una vez; el bucle de
+        # scroll trabaja en memoria
+        sesion = SesionExtraccion(
+            objetivo=self.PREDICACIONES_OBJETIVO,
+            pendientes=self.contar_pendientes(),
+            numero_siguiente=self.obtener_siguiente_numero(),
+            urls_publicadas=self.cargar_historial().instantanea(),
+            urls_pendientes=self.cargar_urls_pendientes()
+        )
+        
         print(f"\n{'='*80}")
         print(f"🎯 EXTRACCIÓN INTELIGENTE DE PREDICACIONES")
         print(f"{'='*80}")
         print(f"   🎯 Objetivo: {self.PREDICACIONES_OBJETIVO} predicaciones pendientes")
-        print(f"   📊 Actualmente pendientes: {self.contar_pendientes()}")
+        print(f"   📊 Actualmente pendientes: {sesion.pendientes}")
+        if marca.get('id_reciente'):
+            print(f"   🔖 Marca: revisado desde {marca.get('fecha_antigua') or '?'} hasta {marca.get('fecha_reciente') or '?'}"
+                  f"{' (inicio del chat alcanzado)' if marca.get('inicio_alcanzado') else ''}")
         print(f"{'='*80}\n")
         
-        # Cargar historial de publicadas
-        historial = self.cargar_historial()
-        urls_publicadas = set(historial["urls_publicadas"])
-        print(f"📚 Historial cargado: {len(urls_publicadas)} predicaciones ya publicadas\n")
+        print(f"📚 Historial cargado: {len(sesion.urls_publicadas)} predicaciones ya publicadas\n")
+        
+        ids_vistos = set()
+        marca_cosecha = f"{time.time():.6f}"    # distingue los nodos leídos en esta extracción
+        mas_nuevo = None    # (id, fecha) del primer mensaje revisado
+        mas_viejo = None    # (id, fecha) del último mensaje revisado
+        inicio_alcanzado = False
+        motivo_scroll = None    # resultado del último scroll ('mensajes', 'inicio', 'limite'...)
+        self.latencias_scroll = []
         
         try:
             contenedor_chat = self.driver.find_element(By.ID, "main")
             
-            predicaciones_extraidas = []
-            numero_siguiente = self.obtener_siguiente_numero()
             scrolls_realizados = 0
             scrolls_sin_nuevos = 0
+            iteraciones_sin_mensajes = 0
             
             print("🔄 Iniciando extracción...\n")
             
             while True:
-                # Verificar si ya tenemos suficientes pendientes
-                total_pendientes = self.contar_pendientes() + len(predicaciones_extraidas)
-                
-                if total_pendientes >= self.PREDICACIONES_OBJETIVO:
-                    print(f"\n✅ OBJETIVO ALCANZADO: {total_pendientes} predicaciones pendientes")
+                # Verificar si ya tenemos suficientes pendientes (los nuevos se revisan igual)
+                if fase != 'nuevos' and sesion.objetivo_alcanzado():
+                    print(f"\n✅ OBJETIVO ALCANZADO: {sesion.total_pendientes} predicaciones pendientes")
                     break
                 
                 # Seguridad: límite de scrolls
@@ -218,122 +385,311 @@ class ExtractorWhatsAppPredicaciones:
                     print("   Probablemente llegamos al inicio del grupo")
                     break
                 
-                # Obtener mensajes actuales del DOM (solo mensajes propios)
-                mensajes_dom = self.driver.find_elements(
-                    By.XPATH, "//div[contains(@class, 'message-out')]"
-                )
+                # Mensajes propios que aparecieron en el DOM desde la iteración anterior
+                mensajes_dom = self._cosechar_mensajes(marca_cosecha)
                 
                 print(f"{'─'*60}")
                 print(f"📊 Iteración #{scrolls_realizados + 1}")
                 print(f"{'─'*60}")
-                print(f"   Mensajes en DOM: {len(mensajes_dom)}")
-                print(f"   Pendientes actuales: {total_pendientes}/{self.PREDICACIONES_OBJETIVO}")
+                print(f"   Mensajes nuevos en DOM: {len(mensajes_dom)}")
+                print(f"   Pendientes actuales: {sesion.total_pendientes}/{sesion.objetivo}")
                 
-                # Extraer URLs de los mensajes actuales
+                # Extraer URLs de los mensajes actuales, del más nuevo al más viejo
                 nuevas_extraidas = 0
+                mensajes_sin_ver = 0
                 
-                for mensaje in mensajes_dom:
-                    url = self._extraer_predicacion_de_mensaje(mensaje)
+                for mensaje in reversed(mensajes_dom):
+                    id_mensaje = mensaje['id']
+                    fecha_mensaje = leer_fecha_mensaje(mensaje['previo'])
+                    clave = id_mensaje or (mensaje['previo'], mensaje['texto'])
                     
-                    if not url:
+                    # WhatsApp puede volver a dibujar un mensaje ya leído (nodo sin marca)
+                    if clave in ids_vistos:
                         continue
+                    ids_vistos.add(clave)
+                    mensajes_sin_ver += 1
+                    
+                    # ¿Llegamos al tramo ya revisado en extracciones anteriores?
+                    if fase == 'nuevos' and self._alcanza_marca(id_mensaje, fecha_mensaje, marca['id_reciente'], marca.get('fecha_reciente')):
+                        fase = 'fin' if marca.get('inicio_alcanzado') else 'saltando'
+                        print("   🔖 Marca alcanzada: mensajes nuevos revisados")
+                        if fase == 'fin':
+                            break
+                    
+                    if fase == 'saltando':
+                        if not self._alcanza_marca(id_mensaje, fecha_mensaje, marca.get('id_antiguo'), marca.get('fecha_antigua')):
+                            continue
+                        fase = 'relleno'
+                        print("   ⏩ Tramo ya revisado salteado, sigo hacia atrás")
+                        if id_mensaje == marca.get('id_antiguo'):
+                            continue
+                    
+                    if fase != 'nuevos' and sesion.objetivo_alcanzado():
+                        break
+                    
+                    # Mensaje revisado: extiende el tramo de la marca
+                    if mas_nuevo is None and fase in ('nuevos', 'completo'):
+                        mas_nuevo = (id_mensaje, fecha_mensaje)
+                    mas_viejo = (id_mensaje, fecha_mensaje)
                     
-                    # ¿Ya está publicada?
-                    if url in urls_publicadas:
+                    url = self._extraer_url_de_cosecha(mensaje)
+                    
+                    if not url:
                         continue
                     
-                    # ¿Ya la extrajimos en esta sesión?
-                    if any(p['contenido'] == url for p in predicaciones_extraidas):
+                    # Forma canónica: la misma predicación con otra URL no se repite
+                    url = canonicalizar_url(url)
+                    
+                    # ¿Ya está publicada, en la cola o extraída en esta sesión?
+                    if not sesion.es_nueva(url):
                         continue
                     
                     # ✅ Es nueva, extraer
-                    predicaciones_extraidas.append({
-                        'tipo': 'enlace',
-                        'contenido': url,
-                        'numero': numero_siguiente
-                    })
+                    predicacion = sesion.agregar(url)
                     
-                    print(f"   ✅ Nueva: predica-{numero_siguiente:03d}.txt")
+                    print(f"   ✅ Nueva: predica-{predicacion['numero']:03d}.txt")
                     print(f"      URL: {url[:60]}...")
                     
-                    numero_siguiente += 1
                     nuevas_extraidas += 1
-                    
-                    # Verificar si ya tenemos suficientes
-                    if self.contar_pendientes() + len(predicaciones_extraidas) >= self.PREDICACIONES_OBJETIVO:
-                        break
+                
+                if fase == 'fin':
+                    print("\n✅ El resto del chat ya se había revisado hasta el inicio")
+                    break
                 
                 if nuevas_extraidas > 0:
                     print(f"   📦 Extraídas en esta iteración: {nuevas_extraidas}")
                     scrolls_sin_nuevos = 0
-                else:
+                elif fase in ('relleno', 'completo'):
                     scrolls_sin_nuevos += 1
                     print(f"   ⏭️  Sin nuevas ({scrolls_sin_nuevos}/{self.SCROLLS_SIN_CAMBIO_LIMITE})")
                 
+                # Solo el aviso de cifrado confirma el inicio del chat (y se guarda
+                # en la marca); si el scroll deja de traer mensajes sin que se vea
+                # el aviso, se termina sin darlo por alcanzado. La cosecha solo ve
+                # mensajes propios: si el scroll cargó mensajes de otros, el DOM
+                # creció y la iteración no cuenta como vacía
+                dom_crecio = mensajes_sin_ver or motivo_scroll == 'mensajes'
+                iteraciones_sin_mensajes = 0 if dom_crecio else iteraciones_sin_mensajes + 1
+                if motivo_scroll == 'inicio' and not mensajes_sin_ver:
+                    inicio_alcanzado = True
+                    print("\n⛔ Aviso de inicio del chat visible: no hay mensajes más antiguos")
+                    break
+                if iteraciones_sin_mensajes >= self.ITERACIONES_SIN_MENSAJES_LIMITE:
+                    print("\n⛔ No cargan mensajes más antiguos (sin ver el aviso de inicio del chat)")
+                    break
+                
                 # Si ya tenemos suficientes, parar
-                if self.contar_pendientes() + len(predicaciones_extraidas) >= self.PREDICACIONES_OBJETIVO:
+                if fase != 'nuevos' and sesion.objetivo_alcanzado():
                     break
                 
-                # Hacer scroll hacia arriba para cargar mensajes más antiguos
+                # Hacer scroll hacia arriba y esperar a que WhatsApp cargue mensajes más antiguos
                 print(f"   🔄 Haciendo scroll para cargar mensajes más antiguos...")
-                self._hacer_scroll_arriba(contenedor_chat)
+                motivo_scroll = self._hacer_scroll_arriba(contenedor_chat)
                 scrolls_realizados += 1
-                
-                # Esperar a que WhatsApp cargue mensajes
-                time.sleep(5)
             
             print(f"\n{'='*80}")
             print(f"📊 RESUMEN DE EXTRACCIÓN")
             print(f"{'='*80}")
-            print(f"   Total extraídas: {len(predicaciones_extraidas)}")
+            print(f"   Total extraídas: {len(sesion.predicaciones)}")
             print(f"   Scrolls realizados: {scrolls_realizados}")
-            print(f"   Pendientes finales: {self.contar_pendientes() + len(predicaciones_extraidas)}")
+            if self.latencias_scroll:
+                esperas = sorted(segundos for segundos, _ in self.latencias_scroll)
+                agotadas = sum(1 for _, motivo in self.latencias_scroll if motivo == 'limite')
+                print(f"   Espera tras scroll: mediana {esperas[len(esperas) // 2]:.2f}s, "
+                      f"máxima {esperas[-1]:.2f}s, {agotadas} al límite de {self.ESPERA_MAXIMA_SCROLL}s")
+            print(f"   Pendientes finales: {sesion.total_pendientes}")
             print(f"{'='*80}\n")
             
-            return predicaciones_extraidas
+            return sesion.predicaciones
             
         except Exception as e:
             print(f"\n❌ ERROR durante extracción: {e}")
             import traceback
             traceback.print_exc()
-            return predicaciones_extraidas
+            return sesion.predicaciones
+        
+        finally:
+            if nombre_grupo:
+                self._preparar_marca(nombre_grupo, marca, fase, mas_nuevo, mas_viejo, inicio_alcanzado)
+    
+    @staticmethod
+    def _alcanza_marca(id_mensaje, fecha_mensaje, id_marca, fecha_marca):
+        """Indica si un mensaje es el de la marca o más viejo que ella"""
+        if id_marca and id_mensaje == id_marca:
+            return True
+        return bool(fecha_mensaje and fecha_marca and fecha_mensaje < fecha_marca)
+    
+    def _preparar_marca(self, nombre_grupo, marca, fase, mas_nuevo, mas_viejo, inicio_alcanzado):
+        """
+        Calcula la nueva marca del grupo según hasta dónde se revisó
+        (se guarda con guardar_marca, después de guardar las predicaciones)
+        Si no se llegó a la marca anterior queda un hueco sin revisar: la
+        marca no cambia y la próxima extracción vuelve a revisar lo nuevo
+        """
+        campos = {}
+        tramo_continuo = fase != 'nuevos' or inicio_alcanzado
+        
+        if tramo_continuo and mas_nuevo and mas_nuevo[0]:
+            campos['id_reciente'], campos['fecha_reciente'] = mas_nuevo
+        
+        if (fase in ('relleno', 'completo') or (fase == 'nuevos' and inicio_alcanzado)) and mas_viejo and mas_viejo[0]:
+            campos['id_antiguo'], campos['fecha_antigua'] = mas_viejo
+        
+        if inicio_alcanzado and fase != 'saltando':
+            campos['inicio_alcanzado'] = True
+        
+        if fase == 'completo' and not campos.get('id_reciente'):
+            campos = {}
+        
+        # Esperas tras scroll acumuladas por grupo, para ajustar ESPERA_MAXIMA_SCROLL
+        if self.latencias_scroll:
+            histograma = marca.get('histograma_scroll') or histograma_vacio()
+            maximo = marca.get('maximo_scroll')
+            for segundos, motivo in self.latencias_scroll:
+                if motivo != 'limite':
+                    registrar_latencia(histograma, segundos)
+                    maximo = registrar_maximo(maximo, segundos)
+            campos['histograma_scroll'] = histograma
+            if maximo is not None:
+                campos['maximo_scroll'] = maximo
+            campos['esperas_agotadas'] = marca.get('esperas_agotadas', 0) + sum(
+                1 for _, motivo in self.latencias_scroll if motivo == 'limite'
+            )
+        
+        self.marca_pendiente = (nombre_grupo, campos) if campos else None
+    
+    def guardar_marca(self):
+        """Guarda la marca de agua calculada en la última extracción"""
+        if self.marca_pendiente:
+            nombre_grupo, campos = self.marca_pendiente
+            self.marcas.actualizar(nombre_grupo, **campos)
+            self.marca_pendiente = None
+    
+    def _cosechar_mensajes(self, marca_cosecha=None):
+        """
+        Datos de los mensajes propios del DOM con un solo execute_script
+        (antes eran hasta 3 llamadas a geckodriver por mensaje)
+        
+        Args:
+            marca_cosecha: Marca de la extracción en curso; con ella solo se
+                devuelven los nodos no leídos antes (None = todos)
+        
+        Returns:
+            list: Diccionarios {id, previo, texto, copiables, hrefs} en orden del DOM
+        """
+        return self.driver.execute_script(SCRIPT_COSECHA_MENSAJES, marca_cosecha) or []
+    
+    def _extraer_url_de_cosecha(self, mensaje):
+        """
+        URL de predicación de un mensaje cosechado, con las mismas estrategias
+        que _extraer_predicacion_de_mensaje pero sin llamadas al navegador
+        
+        Returns:
+            str o None
+        """
+        # Estrategia 1: enlaces con clase copyable-text
+        for href in mensaje.get('copiables') or []:
+            if href and self._es_url_valida(href):
+                return href
+        
+        # Estrategia 2: URL en el texto
+        coincidencia = PATRON_URL_TEXTO.search(mensaje.get('texto') or '')
+        if coincidencia:
+            return coincidencia.group(0)
+        
+        # Estrategia 3: cualquier enlace a una plataforma
+        for href in mensaje.get('hrefs') or []:
+            if href and self._es_url_valida(href):
+                return href
+        
+        return None
+    
+    def medir_cosecha(self):
+        """
+        Compara, sobre el chat abierto, la lectura mensaje por mensaje
+        (_extraer_predicacion_de_mensaje) con la cosecha en una sola llamada:
+        llamadas a WebDriver, tiempo y URLs encontradas
+        
+        Returns:
+            dict: {'por_elemento': {...}, 'cosecha': {...}}
+        """
+        llamadas = {'cantidad': 0}
+        execute_original = self.driver.execute
+        
+        def execute_contado(*args, **kwargs):
+            llamadas['cantidad'] += 1
+            return execute_original(*args, **kwargs)
+        
+        def medir(funcion):
+            llamadas['cantidad'] = 0
+            inicio = time.perf_counter()
+            urls = funcion()
+            return {
+                'llamadas': llamadas['cantidad'],
+                'segundos': round(time.perf_counter() - inicio, 3),
+                'urls': len([url for url in urls if url])
+            }
+        
+        self.driver.execute = execute_contado
+        try:
+            por_elemento = medir(lambda: [
+                self._extraer_predicacion_de_mensaje(mensaje)
+                for mensaje in self.driver.find_elements(By.XPATH, "//div[contains(@class, 'message-out')]")
+            ])
+            cosecha = medir(lambda: [
+                self._extraer_url_de_cosecha(mensaje) for mensaje in self._cosechar_mensajes()
+            ])
+        finally:
+            self.driver.execute = execute_original
+        
+        print(f"\n⏱️  MEDICIÓN DE LECTURA DE MENSAJES")
+        print(f"   {'Método':<14}{'Llamadas':>10}{'Tiempo (s)':>12}{'URLs':>7}")
+        for nombre, resultado in (('Por elemento', por_elemento), ('Cosecha JS', cosecha)):
+            print(f"   {nombre:<14}{resultado['llamadas']:>10}{resultado['segundos']:>12}{resultado['urls']:>7}")
+        
+        return {'por_elemento': por_elemento, 'cosecha': cosecha}
     
     def _hacer_scroll_arriba(self, contenedor_chat):
-        """Hace scroll hacia arriba usando múltiples estrategias"""
+        """
+        Hace scroll hacia arriba y espera a que WhatsApp cargue mensajes
+        (MutationObserver en la página; sin esperas fijas)
+        
+        Returns:
+            str: 'mensajes', 'inicio' (aviso de principio del chat), 'limite'
+                 (pasaron ESPERA_MAXIMA_SCROLL segundos) o 'error'
+        """
+        inicio = time.perf_counter()
+        
         try:
-            # Estrategia 1: scrollTop
-            current_scroll = self.driver.execute_script(
-                "return arguments[0].scrollTop;", 
-                contenedor_chat
-            )
-            new_position = max(0, current_scroll - 3000)
-            self.driver.execute_script(
-                f"arguments[0].scrollTop = {new_position};", 
-                contenedor_chat
-            )
-            time.sleep(0.5)
-            
-            # Estrategia 2: scrollIntoView del primer mensaje
-            try:
-                primer_mensaje = self.driver.find_element(
-                    By.XPATH, 
-                    "(//div[contains(@class, 'message-out')])[1]"
-                )
-                self.driver.execute_script(
-                    "arguments[0].scrollIntoView({block: 'start', behavior: 'smooth'});", 
-                    primer_mensaje
-                )
-                time.sleep(0.5)
-            except:
-                pass
-                
+            resultado = self.driver.execute_async_script(
+                SCRIPT_SCROLL_Y_ESPERA,
+                contenedor_chat,
+                int(self.ESPERA_MAXIMA_SCROLL * 1000)
+            ) or {}
+            motivo = resultado.get('motivo', 'limite')
+            segundos = resultado.get('ms', 0) / 1000 if 'ms' in resultado else time.perf_counter() - inicio
         except Exception as e:
             print(f"   ⚠️  Error en scroll: {e}")
+            motivo, segundos = 'error', time.perf_counter() - inicio
+        
+        self.latencias_scroll.append((segundos, motivo))
+        
+        descripciones = {
+            'mensajes': "Mensajes cargados",
+            'inicio': "Inicio del chat visible",
+            'limite': "Sin mensajes nuevos",
+            'error': "Espera interrumpida"
+        }
+        print(f"   ⏱️  {descripciones.get(motivo, motivo)} en {segundos:.2f}s")
+        
+        return motivo
     
     def _extraer_predicacion_de_mensaje(self, elemento_mensaje):
         """
         Extrae el contenido (URL) de un mensaje individual
         Retorna la URL o None si no encuentra nada válido
+        (lectura elemento por elemento; la extracción usa la cosecha, esto
+        queda como referencia para medir_cosecha)
         """
         try:
             # Estrategia 1: Buscar enlaces con clase copyable-text
@@ -356,9 +712,7 @@ class ExtractorWhatsAppPredicaciones:
                 )
                 texto = texto_elemento.text
                 
-                import re
-                patron_url = r'https?://(?:www\.)?(?:instagram\.com|youtube\.com|youtu\.be|facebook\.com|fb\.watch|tiktok\.com)[^\s]+'
-                match = re.search(patron_url, texto)
+                match = PATRON_URL_TEXTO.search(texto)
                 
                 if match:
                     return match.group(0)
@@ -388,8 +742,7 @@ class ExtractorWhatsAppPredicaciones:
     
     def _es_url_valida(self, url):
         """Verifica si la URL es de una plataforma válida"""
-        dominios_validos = ['instagram.com', 'youtube.com', 'youtu.be', 'facebook.com', 'fb.watch', 'tiktok.com']
-        return any(dominio in url for dominio in dominios_validos)
+        return es_url_valida(url)
     
     def guardar_predicaciones(self, predicaciones):
         """Guarda las predicaciones en archivos individuales"""
@@ -406,11 +759,13 @@ class ExtractorWhatsAppPredicaciones:
             
             if tipo == 'enlace':
                 nombre_archivo = f"predica-{numero:03d}.txt"
-                ruta_archivo = os.path.join(self.carpeta_pendientes, nombre_archivo)
+                ruta_archivo = preparar_ruta(self.carpeta_pendientes, nombre_archivo)
                 
                 with open(ruta_archivo, 'w', encoding='utf-8') as f:
                     f.write(contenido)
                 
+                self.cola.encolar(nombre_archivo)
+                
                 print(f"  ✅ {nombre_archivo}")
         
         print(f"✅ Predicaciones guardadas en: {self.carpeta_pendientes}/\n")
@@ -440,17 +795,41 @@ class ExtractorWhatsAppPredicaciones:
             predicaciones = self.extraer_siguiente_lote(
                 cantidad=cantidad,
                 indice_inicio=indice_inicio,
-                solo_propios=solo_propios
+                solo_propios=solo_propios,
+                nombre_grupo=nombre_grupo
             )
             
             if predicaciones:
                 self.guardar_predicaciones(predicaciones)
             
+            # La marca avanza solo con las predicaciones ya guardadas
+            self.guardar_marca()
+            
             return predicaciones
             
         finally:
             self.cerrar()
     
+    def ejecutar_medicion(self, nombre_grupo):
+        """
+        Abre el grupo y compara las dos formas de leer los mensajes
+        cargados (no guarda nada)
+        """
+        try:
+            if not self.iniciar_navegador():
+                return None
+            
+            if not self.esperar_whatsapp_cargado():
+                return None
+            
+            if not self.buscar_grupo(nombre_grupo):
+                return None
+            
+            return self.medir_cosecha()
+            
+        finally:
+            self.cerrar()
+    
     def cerrar(self):
         """Cierra el navegador"""
         if self.driver:
@@ -7,6 +7,9 @@ from compartido.gestor_archivos import (
     contar_predicaciones_pendientes,
     contar_predicaciones_publicadas
 )
+from compartido.cola_predicaciones import reparar_cola_predicaciones
+from compartido.marcas_extraccion import MarcasExtraccion
+from compartido.histograma_latencias import resumir_percentiles
 from extractores.extractor_whatsapp_predicaciones import ExtractorWhatsAppPredicaciones
 from gestor_registro import GestorRegistro
 
@@ -48,6 +51,13 @@ def mostrar_estado_sistema(gestor, config):
     print(f"   📦 Mensajes por extracción: {config['mensajes_por_extraccion']}")
     print(f"   🔄 Alternancia activa: {'Sí' if config['alternar_con_predicaciones'] else 'No'}")
     
+    # Esperas tras scroll de extracciones anteriores (para ajustar el límite)
+    marca = MarcasExtraccion().obtener(config['nombre_grupo_whatsapp'])
+    if marca.get('histograma_scroll'):
+        esperas = resumir_percentiles(marca['histograma_scroll'], marca.get('maximo_scroll'))
+        print(f"   ⏱️  Espera tras scroll: p50 {esperas['p50']}s | p90 {esperas['p90']}s | p99 {esperas['p99']}s "
+              f"({esperas['muestras']} scrolls, {marca.get('esperas_agotadas', 0)} al límite)")
+    
     if pendientes > 0:
         print(f"\n💡 INFO:")
         print(f"   Con {pendientes} pendientes y 4 publicaciones/día:")
@@ -95,6 +105,23 @@ def main():
     # Detectar si se ejecuta en modo automático
     es_automatico = len(sys.argv) > 1 and sys.argv[1] == '--auto'
     
+    # Reconstruir el manifiesto de la cola desde las carpetas y salir
+    if '--reparar-cola' in sys.argv:
+        reparar_cola_predicaciones()
+        return
+    
+    # Borrar la marca de agua del grupo (la próxima extracción revisa todo el chat)
+    if '--reiniciar-marca' in sys.argv:
+        nombre_grupo = leer_config_global()['nombre_grupo_whatsapp']
+        MarcasExtraccion().reiniciar(nombre_grupo)
+        print(f"🔖 Marca de extracción de '{nombre_grupo}' borrada")
+        return
+    
+    # Comparar la lectura mensaje por mensaje con la cosecha en una llamada
+    if '--medir-cosecha' in sys.argv:
+        ExtractorWhatsAppPredicaciones().ejecutar_medicion(leer_config_global()['nombre_grupo_whatsapp'])
+        return
+    
     # Mostrar banner (solo en modo manual)
     if not es_automatico:
         mostrar_banner()
@@ -159,6 +159,9 @@ def main():
     print("🚀 FASE 2: PUBLICACIÓN EN FACEBOOK")
     print("="*70 + "\n")
     
+    # Releer configuración (solo se vuelve a parsear si el archivo cambió)
+    config = leer_config_global()
+    
     # Verificar límite de tiempo (si fue publicación reciente)
     tiempo_minimo = config['tiempo_minimo_entre_publicaciones_segundos']
     puede_publicar, mensaje = gestor.puede_publicar_ahora(tiempo_minimo, False)
@@ -1,6 +1,29 @@
+import heapq
 import json
 import os
-from datetime import datetime
+import re
+import sys
+from datetime import datetime, timedelta
+
+from compartido.histograma_latencias import histograma_vacio, registrar_latencia, registrar_maximo, combinar_histogramas, resumir_percentiles
+
+
+# Partes variables de un mensaje de error que no cambian su causa
+PATRON_ID_ERROR = re.compile(r'\b(?:0x[0-9a-fA-F]+|[0-9a-fA-F]{8,}(?:-[0-9a-fA-F]{4,})*)\b')
+PATRON_NUMERO_ERROR = re.compile(r'\d+')
+MUESTRAS_POR_FIRMA = 5
+MAXIMO_FIRMAS_ERROR = 200
+
+
+def calcular_firma_error(clase_error, mensaje):
+    """
+    Firma de un error: clase + mensaje sin números ni identificadores
+    Ej: 'TimeoutException: Message: timeout after <n>s (session <id>)'
+    """
+    mensaje = PATRON_ID_ERROR.sub('<id>', mensaje.strip().splitlines()[0] if mensaje.strip() else '')
+    mensaje = PATRON_NUMERO_ERROR.sub('<n>', mensaje)
+    mensaje = ' '.join(mensaje.split())[:200]
+    return f"{clase_error}: {mensaje}"
 
 
 class GestorRegistro:
@@ -8,11 +31,126 @@ class GestorRegistro:
     Gestiona el registro de publicaciones en Facebook
     Soporta tanto mensajes bíblicos como predicaciones de WhatsApp
     Mantiene historial y sistema de índice para predicaciones
+    
+    Motores de almacenamiento ([REGISTRO] motor en config_global.txt):
+    - json: reescribe registro_publicaciones.json completo en cada evento
+    - diario: registro_publicaciones.json es una cabecera pequeña (contadores,
+      estadísticas, últimas publicaciones); cada evento se agrega como una
+      línea JSONL y al compactar el historial pasa a segmentos rotativos en
+      registro_publicaciones_historial/, que solo se leen bajo demanda
+    - sqlite: historial en tablas indexadas (registro_publicaciones.db);
+      self.registro solo contiene contadores y estadísticas
+    
+    Retención ([REGISTRO] retencion_entradas / retencion_dias): el historial
+    vivo se limita a las últimas N entradas o D días; lo anterior pasa a
+    archivos mensuales comprimidos en registro_publicaciones_archivo/
+    
+    Errores: no se guarda la lista completa; cada firma conserva conteo,
+    primera y última vez y las últimas muestras. Las muestras que salen de
+    ese tope pasan al archivo comprimido al guardar el registro
     """
     
-    def __init__(self, archivo_registro="registro_publicaciones.json"):
+    def __init__(self, archivo_registro="registro_publicaciones.json", motor=None):
         self.archivo_registro = archivo_registro
-        self.registro = self.cargar_registro()
+        self.archivo_diario = self._ruta_diario(archivo_registro)
+        self.archivo_sqlite = self._ruta_sqlite(archivo_registro)
+        self.carpeta_segmentos = self._ruta_segmentos(archivo_registro)
+        self.carpeta_archivo = self._ruta_archivo_historico(archivo_registro)
+        self._leer_config_registro(motor)
+        self.eventos_en_diario = 0
+        self.errores_por_archivar = []
+        self.almacen = self._crear_almacen()
+        
+        historial_heredado = {}
+        if self.almacen:
+            self.registro, historial_heredado = self._cargar_registro_almacen()
+        else:
+            self.registro = self.cargar_registro()
+        
+        self._reproducir_diario()
+        
+        # Registro de una versión anterior con el historial dentro de la cabecera
+        if historial_heredado:
+            print("🔄 Historial del registro movido a segmentos")
+            self.guardar_registro()
+    
+    @staticmethod
+    def _ruta_diario(archivo_registro):
+        """Ruta del diario de eventos asociado al registro"""
+        return os.path.splitext(archivo_registro)[0] + ".diario.jsonl"
+    
+    @staticmethod
+    def _ruta_sqlite(archivo_registro):
+        """Ruta de la base SQLite asociada al registro"""
+        return os.path.splitext(archivo_registro)[0] + ".db"
+    
+    @staticmethod
+    def _ruta_segmentos(archivo_registro):
+        """Carpeta de segmentos de historial asociada al registro"""
+        return os.path.splitext(archivo_registro)[0] + "_historial"
+    
+    @staticmethod
+    def _ruta_archivo_historico(archivo_registro):
+        """Carpeta de archivos mensuales comprimidos asociada al registro"""
+        return os.path.splitext(archivo_registro)[0] + "_archivo"
+    
+    @staticmethod
+    def existe_registro(archivo_registro="registro_publicaciones.json"):
+        """Indica si existe un registro guardado con cualquier motor"""
+        return any(os.path.exists(ruta) for ruta in (
+            archivo_registro,
+            GestorRegistro._ruta_diario(archivo_registro),
+            GestorRegistro._ruta_sqlite(archivo_registro)
+        ))
+    
+    def _leer_config_registro(self, motor):
+        """Obtiene motor, compactación, segmentos, ranking y retención desde config_global.txt"""
+        self.eventos_por_compactacion = 200
+        self.entradas_por_segmento = 1000
+        self.tamano_ranking = 10
+        self.retencion_entradas = 5000
+        self.retencion_dias = 0
+        
+        try:
+            from compartido.gestor_archivos import leer_config_global
+            config = leer_config_global()
+            self.eventos_por_compactacion = max(1, config['eventos_por_compactacion'])
+            self.entradas_por_segmento = max(1, config['entradas_por_segmento'])
+            self.tamano_ranking = max(1, config['tamano_ranking_mensajes'])
+            self.retencion_entradas = max(0, config['retencion_entradas'])
+            self.retencion_dias = max(0, config['retencion_dias'])
+            if motor is None:
+                motor = config['motor_registro']
+        except Exception:
+            pass
+        
+        if motor not in ('json', 'diario', 'sqlite'):
+            if motor is not None:
+                print(f"⚠️  Motor de registro desconocido: {motor}. Usando 'diario'")
+            motor = 'diario'
+        
+        self.motor = motor
+    
+    def _crear_almacen(self):
+        """Crea el almacén de historial del motor (None para json)"""
+        if self.motor == 'sqlite':
+            from compartido.registro_sqlite import AlmacenRegistroSQLite
+            
+            if not os.path.exists(self.archivo_sqlite) and (
+                    os.path.exists(self.archivo_registro) or os.path.exists(self.archivo_diario)):
+                migrar_registro_a_sqlite(self.archivo_registro)
+            
+            return AlmacenRegistroSQLite(self.archivo_sqlite)
+        
+        if self.motor == 'diario':
+            from compartido.registro_segmentos import AlmacenRegistroSegmentado
+            return AlmacenRegistroSegmentado(
+                self.archivo_registro,
+                self.carpeta_segmentos,
+                self.entradas_por_segmento
+            )
+        
+        return None
     
     def cargar_registro(self):
         """Carga el registro desde el archivo JSON o crea uno nuevo"""
@@ -20,55 +158,11 @@ class GestorRegistro:
             try:
                 with open(self.archivo_registro, 'r', encoding='utf-8') as f:
                     registro = json.load(f)
-                    
-                # Asegurar que existan todos los campos necesarios
-                campos_requeridos = {
-                    'total_publicaciones': 0,
-                    'ultima_ejecucion': None,
-                    'fecha_ultima_publicacion': None,
-                    'historial_reciente': [],  # Últimos N mensajes (para memoria)
-                    'historial_completo': [],  # Historial completo con detalles
-                    'estadisticas': {
-                        'publicaciones_exitosas': 0,
-                        'publicaciones_fallidas': 0,
-                        'total_intentos': 0,
-                        'tiempo_promedio_publicacion': 0,
-                        'publicaciones_biblicas': 0,
-                        'publicaciones_predicaciones': 0
-                    },
-                    'errores': [],
-                    'predicaciones_whatsapp': {
-                        'indice_catalogo': 0,
-                        'total_extraidos': 0,
-                        'fecha_ultima_extraccion': None,
-                        'historial_extracciones': []
-                    }
-                }
-                
-                # Agregar campos faltantes
-                for campo, valor_default in campos_requeridos.items():
-                    if campo not in registro:
-                        registro[campo] = valor_default
-                
-                # Asegurar subcampos de predicaciones_whatsapp
-                if 'predicaciones_whatsapp' in registro:
-                    pred = registro['predicaciones_whatsapp']
-                    if 'indice_catalogo' not in pred:
-                        pred['indice_catalogo'] = 0
-                    if 'total_extraidos' not in pred:
-                        pred['total_extraidos'] = 0
-                    if 'fecha_ultima_extraccion' not in pred:
-                        pred['fecha_ultima_extraccion'] = None
-                    if 'historial_extracciones' not in pred:
-                        pred['historial_extracciones'] = []
                 
-                # Asegurar contadores de predicaciones en estadísticas
-                if 'publicaciones_biblicas' not in registro['estadisticas']:
-                    registro['estadisticas']['publicaciones_biblicas'] = 0
-                if 'publicaciones_predicaciones' not in registro['estadisticas']:
-                    registro['estadisticas']['publicaciones_predicaciones'] = 0
+                # Lista de errores de versiones anteriores: se archiva al guardar
+                self.errores_por_archivar.extend(registro.pop('errores', None) or [])
                 
-                return registro
+                return self._completar_campos(registro)
                 
             except Exception as e:
                 print(f"⚠️  Error cargando registro: {e}")
@@ -78,13 +172,129 @@ class GestorRegistro:
             print("📝 Creando nuevo registro_publicaciones.json")
             return self._crear_registro_vacio()
     
+    def _cargar_registro_almacen(self):
+        """
+        Carga la cabecera del registro desde el almacén (sin leer historial)
+        
+        Returns:
+            tuple: (registro, historial heredado de un registro JSON anterior)
+        """
+        try:
+            registro = self.almacen.cargar_estado()
+        except Exception as e:
+            print(f"⚠️  Error cargando registro: {e}")
+            print("   Creando registro nuevo...")
+            registro = None
+        
+        if registro is None:
+            print(f"📝 Creando nuevo {os.path.basename(self.archivo_registro)}")
+            registro = self._crear_registro_vacio()
+        
+        # Un registro JSON de versión anterior trae el historial completo
+        historial_heredado = {
+            coleccion: entradas
+            for coleccion, entradas in self._separar_historial(registro).items()
+            if entradas
+        }
+        for coleccion, entradas in historial_heredado.items():
+            self.almacen.reemplazar(coleccion, entradas)
+        
+        registro = self._completar_campos(registro)
+        self._separar_historial(registro)
+        
+        return registro, historial_heredado
+    
+    def _separar_historial(self, registro):
+        """
+        Quita del registro las listas de historial
+        
+        Returns:
+            dict: {coleccion: lista} con las listas que estaban presentes
+        """
+        historial = {}
+        
+        if 'historial_completo' in registro:
+            historial['publicaciones'] = registro.pop('historial_completo')
+        if 'errores' in registro:
+            historial['errores'] = registro.pop('errores')
+        
+        pred = registro.get('predicaciones_whatsapp', {})
+        if 'historial_extracciones' in pred:
+            historial['extracciones'] = pred.pop('historial_extracciones')
+        
+        return historial
+    
+    def _completar_campos(self, registro):
+        """Agrega al registro los campos que falten (registros de versiones anteriores)"""
+        # Asegurar que existan todos los campos necesarios
+        campos_requeridos = {
+            'total_publicaciones': 0,
+            'secuencia_eventos': 0,
+            'ultima_ejecucion': None,
+            'fecha_ultima_publicacion': None,
+            'historial_reciente': [],  # Últimos N mensajes (para memoria)
+            'cursor_secuencial': {'archivo': None, 'posicion': None},  # Último bíblico publicado
+            'historial_completo': [],  # Historial completo con detalles
+            'estadisticas': {
+                'publicaciones_exitosas': 0,
+                'publicaciones_fallidas': 0,
+                'total_intentos': 0,
+                'tiempo_promedio_publicacion': 0,
+                'publicaciones_biblicas': 0,
+                'publicaciones_predicaciones': 0
+            },
+            'predicaciones_whatsapp': {
+                'indice_catalogo': 0,
+                'total_extraidos': 0,
+                'fecha_ultima_extraccion': None,
+                'historial_extracciones': []
+            }
+        }
+        
+        # Agregar campos faltantes
+        for campo, valor_default in campos_requeridos.items():
+            if campo not in registro:
+                registro[campo] = valor_default
+        
+        # Asegurar subcampos de predicaciones_whatsapp
+        if 'predicaciones_whatsapp' in registro:
+            pred = registro['predicaciones_whatsapp']
+            if 'indice_catalogo' not in pred:
+                pred['indice_catalogo'] = 0
+            if 'total_extraidos' not in pred:
+                pred['total_extraidos'] = 0
+            if 'fecha_ultima_extraccion' not in pred:
+                pred['fecha_ultima_extraccion'] = None
+            if 'historial_extracciones' not in pred:
+                pred['historial_extracciones'] = []
+        
+        # Asegurar contadores de predicaciones en estadísticas
+        if 'publicaciones_biblicas' not in registro['estadisticas']:
+            registro['estadisticas']['publicaciones_biblicas'] = 0
+        if 'publicaciones_predicaciones' not in registro['estadisticas']:
+            registro['estadisticas']['publicaciones_predicaciones'] = 0
+        
+        # Ranking de mensajes más publicados (se reconstruye si falta o cambió su tamaño)
+        stats = registro['estadisticas']
+        contador = stats.get('contador_mensajes', {})
+        ranking = stats.get('ranking_mensajes')
+        if ranking is None or len(ranking) != min(self.tamano_ranking, len(contador)):
+            stats['ranking_mensajes'] = [
+                [mensaje, conteo]
+                for mensaje, conteo in heapq.nlargest(self.tamano_ranking, contador.items(), key=lambda item: item[1])
+            ]
+        
+        return registro
+    
     def _crear_registro_vacio(self):
         """Crea estructura de registro vacía"""
         return {
             'total_publicaciones': 0,
+            'secuencia_eventos': 0,
             'ultima_ejecucion': None,
             'fecha_ultima_publicacion': None,
             'historial_reciente': [],
+            'cursor_secuencial': {'archivo': None, 'posicion': None},
             'historial_completo': [],
             'estadisticas': {
                 'publicaciones_exitosas': 0,
@@ -93,10 +303,12 @@ class GestorRegistro:
                 'tiempo_promedio_publicacion': 0,
                 'mensaje_mas_publicado': None,
                 'contador_mensajes': {},
+                'ranking_mensajes': [],
+                'histograma_tiempos': {},
+                'maximo_tiempos': {},
                 'publicaciones_biblicas': 0,
                 'publicaciones_predicaciones': 0
             },
-            'errores': [],
             'predicaciones_whatsapp': {
                 'indice_catalogo': 0,
                 'total_extraidos': 0,
@@ -106,15 +318,267 @@ class GestorRegistro:
         }
     
     def guardar_registro(self):
-        """Guarda el registro en el archivo JSON"""
+        """
+        Guarda el registro completo en el archivo JSON
+        La instantánea incluye todos los eventos aplicados, por lo que el
+        diario queda vacío después de guardar
+        """
+        if self.retencion_entradas:
+            del self.registro['historial_reciente'][:-self.retencion_entradas]
+        
+        self._archivar_muestras_error()
+        
+        if self.almacen:
+            if not self._guardar_registro_almacen():
+                return False
+            self._aplicar_retencion()
+            return True
+        
+        self._aplicar_retencion()
+        
         try:
-            with open(self.archivo_registro, 'w', encoding='utf-8') as f:
+            archivo_temporal = self.archivo_registro + ".tmp"
+            with open(archivo_temporal, 'w', encoding='utf-8') as f:
                 json.dump(self.registro, f, indent=2, ensure_ascii=False)
+            os.replace(archivo_temporal, self.archivo_registro)
+            
+            if os.path.exists(self.archivo_diario):
+                os.remove(self.archivo_diario)
+            self.eventos_en_diario = 0
+            
+            return True
+        except Exception as e:
+            print(f"❌ Error guardando registro: {e}")
+            return False
+    
+    def _guardar_registro_almacen(self):
+        """
+        Confirma en el almacén la cabecera y las entradas de historial pendientes
+        Si el registro trae listas de historial explícitas (ej: un reinicio),
+        reemplazan el historial guardado
+        """
+        try:
+            for coleccion, entradas in self._separar_historial(self.registro).items():
+                self.almacen.reemplazar(coleccion, entradas)
+            
+            self.almacen.guardar_estado(self.registro)
+            self.almacen.confirmar()
+            
+            if os.path.exists(self.archivo_diario):
+                os.remove(self.archivo_diario)
+            self.eventos_en_diario = 0
+            
             return True
         except Exception as e:
+            self.almacen.deshacer()
             print(f"❌ Error guardando registro: {e}")
             return False
     
+    def _archivar_muestras_error(self):
+        """
+        Pasa al archivo comprimido las muestras de error que salieron del
+        registro agregado (y la lista de errores de registros anteriores)
+        """
+        if not self.errores_por_archivar:
+            return
+        
+        from compartido.archivo_historial import archivar_entradas
+        
+        try:
+            archivar_entradas(self.carpeta_archivo, 'errores', self.errores_por_archivar)
+            self.errores_por_archivar = []
+        except Exception as e:
+            print(f"⚠️  No se pudieron archivar las muestras de error: {e}")
+    
+    def _fecha_limite_retencion(self):
+        """Fecha anterior a la cual el historial se archiva (None si no hay límite por días)"""
+        if not self.retencion_dias:
+            return None
+        return (datetime.now() - timedelta(days=self.retencion_dias)).strftime("%Y-%m-%d %H:%M:%S")
+    
+    def _listas_historial(self):
+        """Listas de historial dentro de self.registro (motor json)"""
+        listas = {
+            'publicaciones': self.registro.get('historial_completo'),
+            'extracciones': self.registro.get('predicaciones_whatsapp', {}).get('historial_extracciones')
+        }
+        return {coleccion: lista for coleccion, lista in listas.items() if lista is not None}
+    
+    def _aplicar_retencion(self):
+        """
+        Pasa al archivo comprimido las entradas de historial fuera de la retención
+        Se archiva antes de quitar las entradas del registro vivo
+        
+        Returns:
+            dict: {coleccion: cantidad archivada}
+        """
+        if not self.retencion_entradas and not self.retencion_dias:
+            return {}
+        
+        from compartido.archivo_historial import archivar_entradas
+        
+        fecha_limite = self._fecha_limite_retencion()
+        archivadas = {}
+        
+        try:
+            if self.almacen:
+                for coleccion in ('publicaciones', 'errores', 'extracciones'):
+                    retiradas = self.almacen.retirar_antiguas(coleccion, self.retencion_entradas, fecha_limite)
+                    if retiradas:
+                        archivadas[coleccion] = archivar_entradas(self.carpeta_archivo, coleccion, retiradas)
+                
+                if archivadas:
+                    self.almacen.guardar_estado(self.registro)
+                    self.almacen.confirmar()
+            else:
+                for coleccion, entradas in self._listas_historial().items():
+                    corte = max(0, len(entradas) - self.retencion_entradas) if self.retencion_entradas else 0
+                    if fecha_limite:
+                        while corte < len(entradas) and (entradas[corte].get('fecha') or '') < fecha_limite:
+                            corte += 1
+                    
+                    if corte:
+                        archivadas[coleccion] = archivar_entradas(self.carpeta_archivo, coleccion, entradas[:corte])
+                        del entradas[:corte]
+        
+        except Exception as e:
+            if self.almacen:
+                self.almacen.deshacer()
+            print(f"⚠️  No se pudo archivar el historial antiguo: {e}")
+            return {}
+        
+        return archivadas
+    
+    def consultar_archivo(self, coleccion='publicaciones', mes=None):
+        """
+        Consulta el historial archivado (fuera de la retención)
+        
+        Args:
+            coleccion: 'publicaciones', 'errores' o 'extracciones'
+            mes: AAAA-MM para un solo mes, o None para todo el archivo
+        
+        Returns:
+            list: Entradas archivadas en orden cronológico
+        """
+        from compartido.archivo_historial import consultar_archivo
+        return list(consultar_archivo(self.carpeta_archivo, coleccion, mes))
+    
+    def listar_meses_archivados(self, coleccion='publicaciones'):
+        """Lista los meses (AAAA-MM) con historial archivado"""
+        from compartido.archivo_historial import listar_meses_archivados
+        return listar_meses_archivados(self.carpeta_archivo, coleccion)
+    
+    def compactar_diario(self):
+        """
+        Pliega los eventos del diario en el registro guardado
+        (instantánea JSON, o cabecera + segmentos de historial en modo diario)
+        
+        Returns:
+            bool: True si se compactó correctamente
+        """
+        eventos = self.eventos_en_diario
+        
+        if not self.guardar_registro():
+            return False
+        
+        if eventos:
+            print(f"🗜️  Diario compactado: {eventos} eventos")
+        return True
+    
+    def _reproducir_diario(self):
+        """
+        Aplica sobre la instantánea los eventos del diario aún no compactados
+        Los eventos con secuencia ya incluida en la instantánea se ignoran
+        """
+        if not os.path.exists(self.archivo_diario):
+            return
+        
+        aplicados = 0
+        
+        try:
+            with open(self.archivo_diario, 'r', encoding='utf-8') as f:
+                for numero_linea, linea in enumerate(f, 1):
+                    linea = linea.strip()
+                    if not linea:
+                        continue
+                    
+                    try:
+                        evento = json.loads(linea)
+                    except ValueError:
+                        # Línea incompleta (corte durante la escritura)
+                        print(f"⚠️  Diario: línea {numero_linea} ilegible, se omite")
+                        continue
+                    
+                    if evento.get('seq', 0) <= self.registro.get('secuencia_eventos', 0):
+                        continue
+                    
+                    self._aplicar_evento(evento)
+                    aplicados += 1
+        except Exception as e:
+            print(f"⚠️  Error leyendo diario de eventos: {e}")
+        
+        self.eventos_en_diario = aplicados
+        
+        # En modo json no se mantiene diario: plegarlo de inmediato
+        if self.motor != 'diario' or aplicados >= self.eventos_por_compactacion:
+            self.compactar_diario()
+    
+    def _nuevo_evento(self, tipo_evento, **datos):
+        """Crea un evento numerado con la fecha actual"""
+        evento = {
+            'seq': self.registro.get('secuencia_eventos', 0) + 1,
+            'evento': tipo_evento,
+            'fecha': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        evento.update(datos)
+        return evento
+    
+    def _aplicar_evento(self, evento):
+        """Aplica un evento (nuevo o reproducido del diario) al registro en memoria"""
+        tipo_evento = evento.get('evento')
+        
+        if tipo_evento == 'publicacion':
+            self._aplicar_publicacion(evento)
+        elif tipo_evento == 'error':
+            self._aplicar_error(evento)
+        elif tipo_evento == 'extraccion':
+            self._aplicar_extraccion(evento)
+        else:
+            print(f"⚠️  Evento desconocido en diario: {tipo_evento}")
+        
+        self.registro['secuencia_eventos'] = evento.get('seq', 0)
+    
+    def _agregar_historial(self, coleccion, entrada):
+        """Agrega una entrada a una colección del historial según el motor"""
+        if self.almacen:
+            self.almacen.agregar(coleccion, entrada)
+        elif coleccion == 'publicaciones':
+            self.registro['historial_completo'].append(entrada)
+        else:
+            self.registro['predicaciones_whatsapp']['historial_extracciones'].append(entrada)
+    
+    def _persistir_evento(self, evento):
+        """
+        Persiste un evento ya aplicado en memoria
+        En modo diario el costo es una línea agregada, sin importar el tamaño del historial
+        """
+        if self.motor != 'diario' or not os.path.exists(self.archivo_registro):
+            # json reescribe la instantánea; sqlite confirma la transacción
+            return self.guardar_registro()
+        
+        try:
+            with open(self.archivo_diario, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(evento, ensure_ascii=False) + "\n")
+            self.eventos_en_diario += 1
+        except Exception as e:
+            print(f"❌ Error escribiendo diario de eventos: {e}")
+            return False
+        
+        if self.eventos_en_diario >= self.eventos_por_compactacion:
+            return self.compactar_diario()
+        
+        return True
+    
     def puede_publicar_ahora(self, tiempo_minimo_segundos, permitir_forzar_manual=False):
         """
         Verifica si se puede publicar según el tiempo mínimo configurado
@@ -150,7 +614,7 @@ class GestorRegistro:
             print(f"⚠️  Error verificando tiempo: {e}")
             return True, "Error en verificación, permitiendo publicación"
     
-    def registrar_publicacion_exitosa(self, mensaje_archivo, contenido, longitud, intentos, tiempo_ejecucion, tipo='biblico'):
+    def registrar_publicacion_exitosa(self, mensaje_archivo, contenido, longitud, intentos, tiempo_ejecucion, tipo='biblico', posicion_mensaje=None):
         """
         Registra una publicación exitosa
         
@@ -161,15 +625,41 @@ class GestorRegistro:
             intentos: Número de intentos que tomó
             tiempo_ejecucion: Tiempo total en segundos
             tipo: 'biblico' o 'predicacion'
+            posicion_mensaje: Posición del mensaje en el catálogo (cursor secuencial)
         """
-        ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        evento = self._nuevo_evento(
+            'publicacion',
+            mensaje_archivo=mensaje_archivo,
+            contenido_preview=contenido[:100] + "..." if len(contenido) > 100 else contenido,
+            longitud=longitud,
+            intentos=intentos,
+            tiempo_ejecucion=tiempo_ejecucion,
+            tipo=tipo,
+            posicion_mensaje=posicion_mensaje
+        )
+        
+        self._aplicar_evento(evento)
+        
+        # Guardar cambios
+        self._persistir_evento(evento)
+        
+        tipo_emoji = "📖" if tipo == 'biblico' else "🎬"
+        print(f"✅ Publicación registrada: {tipo_emoji} {mensaje_archivo}")
+    
+    def _aplicar_publicacion(self, evento):
+        """Aplica al registro un evento de publicación exitosa"""
+        ahora = evento['fecha']
+        mensaje_archivo = evento['mensaje_archivo']
+        intentos = evento['intentos']
+        tiempo_ejecucion = evento['tiempo_ejecucion']
+        tipo = evento.get('tipo', 'biblico')
         
         # Crear entrada para historial completo
         entrada = {
             'fecha': ahora,
             'mensaje_archivo': mensaje_archivo,
-            'contenido_preview': contenido[:100] + "..." if len(contenido) > 100 else contenido,
-            'longitud': longitud,
+            'contenido_preview': evento['contenido_preview'],
+            'longitud': evento['longitud'],
             'estado': 'exitoso',
             'intentos': intentos,
             'tiempo_ejecucion': tiempo_ejecucion,
@@ -177,11 +667,15 @@ class GestorRegistro:
         }
         
         # Agregar a historial completo
-        self.registro['historial_completo'].append(entrada)
+        self._agregar_historial('publicaciones', entrada)
         
-        # Agregar a historial reciente (solo para mensajes bíblicos)
+        # Agregar a historial reciente y mover el cursor secuencial (solo bíblicos)
         if tipo == 'biblico':
             self.registro['historial_reciente'].append(mensaje_archivo)
+            self.registro['cursor_secuencial'] = {
+                'archivo': mensaje_archivo,
+                'posicion': evento.get('posicion_mensaje')
+            }
         
         # Actualizar contadores
         self.registro['total_publicaciones'] += 1
@@ -204,22 +698,55 @@ class GestorRegistro:
         nuevo_promedio = ((tiempo_actual * (total_pubs - 1)) + tiempo_ejecucion) / total_pubs
         self.registro['estadisticas']['tiempo_promedio_publicacion'] = round(nuevo_promedio, 2)
         
+        # Histograma de tiempos por tipo (percentiles en memoria constante)
+        histogramas = self.registro['estadisticas'].setdefault('histograma_tiempos', {})
+        if tipo not in histogramas:
+            histogramas[tipo] = histograma_vacio()
+        registrar_latencia(histogramas[tipo], tiempo_ejecucion)
+        maximos = self.registro['estadisticas'].setdefault('maximo_tiempos', {})
+        maximos[tipo] = registrar_maximo(maximos.get(tipo), tiempo_ejecucion)
+        
         # Actualizar contador de mensajes (solo para bíblicos)
         if tipo == 'biblico':
             contador = self.registro['estadisticas'].get('contador_mensajes', {})
             contador[mensaje_archivo] = contador.get(mensaje_archivo, 0) + 1
             self.registro['estadisticas']['contador_mensajes'] = contador
             
-            # Actualizar mensaje más publicado
-            if contador:
-                mensaje_mas_usado = max(contador, key=contador.get)
-                self.registro['estadisticas']['mensaje_mas_publicado'] = mensaje_mas_usado
+            # Actualizar ranking y mensaje más publicado
+            ranking = self._actualizar_ranking(mensaje_archivo, contador[mensaje_archivo])
+            self.registro['estadisticas']['mensaje_mas_publicado'] = ranking[0][0]
+    
+    def _actualizar_ranking(self, mensaje_archivo, conteo):
+        """
+        Actualiza el ranking de los N mensajes más publicados
+        Los conteos solo suben de a 1, así que un mensaje fuera del ranking
+        solo puede entrar por el último lugar: no hace falta recorrer el contador
+        Cada actualización recorre la lista del ranking (O(N), no O(log N)):
+        con N = tamano_ranking_mensajes (10 por defecto) no vale la pena un
+        montículo o una lista con bisect
         
-        # Guardar cambios
-        self.guardar_registro()
+        Returns:
+            list: Ranking actualizado [[mensaje, conteo], ...] de mayor a menor
+        """
+        ranking = self.registro['estadisticas'].setdefault('ranking_mensajes', [])
         
-        tipo_emoji = "📖" if tipo == 'biblico' else "🎬"
-        print(f"✅ Publicación registrada: {tipo_emoji} {mensaje_archivo}")
+        for posicion, (mensaje, _) in enumerate(ranking):
+            if mensaje == mensaje_archivo:
+                del ranking[posicion]
+                break
+        else:
+            if len(ranking) >= self.tamano_ranking and conteo <= ranking[-1][1]:
+                return ranking
+        
+        # Insertar después de los que tienen igual o más publicaciones
+        posicion = len(ranking)
+        while posicion > 0 and ranking[posicion - 1][1] < conteo:
+            posicion -= 1
+        
+        ranking.insert(posicion, [mensaje_archivo, conteo])
+        del ranking[self.tamano_ranking:]
+        
+        return ranking
     
     def registrar_error(self, mensaje_archivo, error, tipo='biblico'):
         """
@@ -227,25 +754,63 @@ class GestorRegistro:
         
         Args:
             mensaje_archivo: Nombre del archivo que se intentó publicar
-            error: Descripción del error
+            error: Excepción o descripción del error
             tipo: 'biblico' o 'predicacion'
         """
-        ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        evento = self._nuevo_evento(
+            'error',
+            mensaje_archivo=mensaje_archivo,
+            error=str(error),
+            clase_error=type(error).__name__ if isinstance(error, BaseException) else 'Error',
+            tipo=tipo
+        )
+        
+        self._aplicar_evento(evento)
+        self._persistir_evento(evento)
         
+        print(f"❌ Error registrado: {mensaje_archivo} - {error}")
+    
+    def _aplicar_error(self, evento):
+        """Aplica al registro un evento de error de publicación"""
         entrada_error = {
-            'fecha': ahora,
-            'mensaje_archivo': mensaje_archivo,
-            'error': str(error),
-            'tipo': tipo
+            'fecha': evento['fecha'],
+            'mensaje_archivo': evento['mensaje_archivo'],
+            'error': evento['error'],
+            'tipo': evento.get('tipo', 'biblico')
         }
         
-        self.registro['errores'].append(entrada_error)
+        self._agrupar_error(evento.get('clase_error', 'Error'), entrada_error)
         self.registro['estadisticas']['publicaciones_fallidas'] += 1
-        self.registro['ultima_ejecucion'] = ahora
+        self.registro['ultima_ejecucion'] = evento['fecha']
+    
+    def _agrupar_error(self, clase_error, entrada_error):
+        """
+        Acumula el error en el registro agregado de su firma
+        (conteo, primera y última vez, últimas muestras)
+        Las muestras descartadas quedan pendientes de archivar
+        """
+        grupos = self.registro['estadisticas'].setdefault('errores_agrupados', {})
+        firma = calcular_firma_error(clase_error, entrada_error['error'])
         
-        self.guardar_registro()
+        grupo = grupos.get(firma)
+        if grupo is None:
+            # Descartar la firma vista hace más tiempo si se llegó al máximo
+            if len(grupos) >= MAXIMO_FIRMAS_ERROR:
+                descartada = grupos.pop(min(grupos, key=lambda f: grupos[f]['ultima_vez']))
+                self.errores_por_archivar.extend(descartada['muestras'])
+            
+            grupo = grupos[firma] = {
+                'conteo': 0,
+                'primera_vez': entrada_error['fecha'],
+                'ultima_vez': None,
+                'muestras': []
+            }
         
-        print(f"❌ Error registrado: {mensaje_archivo} - {error}")
+        grupo['conteo'] += 1
+        grupo['ultima_vez'] = entrada_error['fecha']
+        grupo['muestras'].append(entrada_error)
+        if len(grupo['muestras']) > MUESTRAS_POR_FIRMA:
+            self.errores_por_archivar.append(grupo['muestras'].pop(0))
     
     def registrar_extraccion_predicaciones(self, cantidad_extraida, nuevo_indice, nombre_grupo):
         """
@@ -256,7 +821,24 @@ class GestorRegistro:
             nuevo_indice: Nueva posición del índice de catálogo
             nombre_grupo: Nombre del grupo de WhatsApp
         """
-        ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        evento = self._nuevo_evento(
+            'extraccion',
+            grupo=nombre_grupo,
+            cantidad_extraida=cantidad_extraida,
+            indice_nuevo=nuevo_indice
+        )
+        
+        self._aplicar_evento(evento)
+        
+        # Guardar cambios
+        self._persistir_evento(evento)
+        
+        print(f"✅ Extracción registrada: {cantidad_extraida} predicaciones")
+        print(f"   Índice actualizado: {nuevo_indice}")
+    
+    def _aplicar_extraccion(self, evento):
+        """Aplica al registro un evento de extracción de predicaciones"""
+        ahora = evento['fecha']
         
         # Actualizar predicaciones_whatsapp
         pred = self.registro['predicaciones_whatsapp']
@@ -264,26 +846,112 @@ class GestorRegistro:
         # Agregar al historial de extracciones
         entrada_extraccion = {
             'fecha': ahora,
-            'grupo': nombre_grupo,
-            'cantidad_extraida': cantidad_extraida,
+            'grupo': evento['grupo'],
+            'cantidad_extraida': evento['cantidad_extraida'],
             'indice_anterior': pred['indice_catalogo'],
-            'indice_nuevo': nuevo_indice
+            'indice_nuevo': evento['indice_nuevo']
         }
         
-        pred['historial_extracciones'].append(entrada_extraccion)
+        self._agregar_historial('extracciones', entrada_extraccion)
         
         # Actualizar índice y contadores
-        pred['indice_catalogo'] = nuevo_indice
-        pred['total_extraidos'] += cantidad_extraida
+        pred['indice_catalogo'] = evento['indice_nuevo']
+        pred['total_extraidos'] += evento['cantidad_extraida']
         pred['fecha_ultima_extraccion'] = ahora
         
         self.registro['ultima_ejecucion'] = ahora
+    
+    def obtener_ultima_publicacion(self, tipo=None):
+        """
+        Obtiene la última publicación registrada
         
-        # Guardar cambios
-        self.guardar_registro()
+        Args:
+            tipo: 'biblico', 'predicacion' o None para cualquier tipo
+            
+        Returns:
+            dict: Entrada del historial o None si no hay publicaciones
+        """
+        if self.almacen:
+            return self.almacen.ultima_publicacion(tipo)
         
-        print(f"✅ Extracción registrada: {cantidad_extraida} predicaciones")
-        print(f"   Índice actualizado: {nuevo_indice}")
+        for entrada in reversed(self.registro.get('historial_completo', [])):
+            if tipo is None or entrada.get('tipo', 'biblico') == tipo:
+                return entrada
+        
+        return None
+    
+    def contar_publicaciones_por_tipo(self):
+        """
+        Cuenta las publicaciones del historial por tipo
+        
+        Returns:
+            dict: {tipo: cantidad}
+        """
+        if self.almacen:
+            return self.almacen.contar_por_tipo()
+        
+        conteo = {}
+        for entrada in self.registro.get('historial_completo', []):
+            tipo = entrada.get('tipo', 'biblico')
+            conteo[tipo] = conteo.get(tipo, 0) + 1
+        
+        return conteo
+    
+    def obtener_historial_completo(self):
+        """
+        Obtiene el historial completo de publicaciones
+        
+        Returns:
+            list: Entradas en orden cronológico
+        """
+        if self.almacen:
+            return self.almacen.listar('publicaciones')
+        
+        return self.registro.get('historial_completo', [])
+    
+    def iterar_historial_desde(self, fecha):
+        """
+        Recorre las publicaciones con fecha igual o posterior a 'fecha'
+        (sin leer los segmentos o filas anteriores)
+        
+        Returns:
+            iterable: Entradas en orden cronológico
+        """
+        if self.almacen:
+            return self.almacen.iterar_desde('publicaciones', fecha)
+        
+        return (entrada for entrada in self.registro.get('historial_completo', []) if entrada.get('fecha', '') >= fecha)
+    
+    def exportar_registro_completo(self):
+        """
+        Obtiene el registro con el formato JSON completo (historial incluido)
+        Lee todos los segmentos o tablas: usar solo para migraciones y exportaciones
+        
+        Returns:
+            dict: Copia del registro con historial_completo, errores e historial_extracciones
+        """
+        registro = json.loads(json.dumps(self.registro))
+        
+        if self.almacen:
+            registro['historial_completo'] = self.almacen.listar('publicaciones')
+            registro['errores'] = self.almacen.listar('errores')
+            registro['predicaciones_whatsapp']['historial_extracciones'] = self.almacen.listar('extracciones')
+        
+        return registro
+    
+    def contar_errores(self):
+        """Cuenta los errores registrados (cada error es una publicación fallida)"""
+        return self.registro['estadisticas'].get('publicaciones_fallidas', 0)
+    
+    def obtener_errores_frecuentes(self, cantidad=5):
+        """
+        Obtiene las firmas de error más repetidas
+        
+        Returns:
+            list: [(firma, grupo), ...] de mayor a menor conteo
+        """
+        grupos = self.registro['estadisticas'].get('errores_agrupados', {})
+        return heapq.nlargest(cantidad, grupos.items(), key=lambda item: item[1]['conteo'])
     
     def obtener_estadisticas(self):
         """
@@ -310,12 +978,34 @@ class GestorRegistro:
             'tasa_exito': tasa_exito,
             'promedio_intentos': promedio_intentos,
             'tiempo_promedio': stats.get('tiempo_promedio_publicacion', 0),
-            'total_errores': len(self.registro['errores']),
+            'percentiles_tiempo': self.obtener_percentiles_tiempo(),
+            'total_errores': self.contar_errores(),
+            'errores_frecuentes': self.obtener_errores_frecuentes(),
             'mensaje_mas_publicado': stats.get('mensaje_mas_publicado'),
+            'ranking_mensajes': [tuple(item) for item in stats.get('ranking_mensajes', [])],
             'mensajes_en_historial': len(self.registro['historial_reciente']),
             'ultima_publicacion': self.registro.get('fecha_ultima_publicacion')
         }
     
+    def obtener_percentiles_tiempo(self):
+        """
+        Percentiles de tiempo de publicación por tipo y en total
+        
+        Returns:
+            dict: {tipo: {'p50', 'p90', 'p99', 'muestras'}, 'total': {...}}
+        """
+        histogramas = self.registro['estadisticas'].get('histograma_tiempos', {})
+        maximos = self.registro['estadisticas'].get('maximo_tiempos', {})
+        
+        percentiles = {
+            tipo: resumir_percentiles(histograma, maximos.get(tipo))
+            for tipo, histograma in histogramas.items()
+        }
+        maximo_total = max(maximos.values()) if len(maximos) == len(histogramas) and maximos else None
+        percentiles['total'] = resumir_percentiles(combinar_histogramas(histogramas.values()), maximo_total)
+        
+        return percentiles
+    
     def mostrar_estadisticas(self):
         """Muestra estadísticas en consola de forma visual"""
         stats = self.obtener_estadisticas()
@@ -331,6 +1021,11 @@ class GestorRegistro:
         print(f"🎯 Tasa de éxito:              {stats['tasa_exito']}%")
         print(f"🔄 Promedio de intentos:       {stats['promedio_intentos']}")
         print(f"⏱️  Tiempo promedio:            {stats['tiempo_promedio']}s")
+        
+        for tipo, percentiles in stats['percentiles_tiempo'].items():
+            if percentiles['muestras']:
+                print(f"   ⏱️  {tipo:<12} p50 {percentiles['p50']:.1f}s · p90 {percentiles['p90']:.1f}s · p99 {percentiles['p99']:.1f}s ({percentiles['muestras']} muestras)")
+        
         print(f"🔥 Mensaje más publicado:      {stats['mensaje_mas_publicado']}")
         print(f"💾 Mensajes en memoria:        {stats['mensajes_en_historial']}")
         
@@ -363,6 +1058,51 @@ class GestorRegistro:
         
         print("="*60 + "\n")
     
+    def mostrar_ranking_mensajes(self, cantidad=10):
+        """
+        Muestra los N mensajes bíblicos más publicados
+        
+        Args:
+            cantidad: Número de mensajes a mostrar (máximo el tamaño del ranking)
+        """
+        ranking = self.obtener_estadisticas()['ranking_mensajes'][:cantidad]
+        
+        if not ranking:
+            print("📭 No hay mensajes bíblicos publicados aún")
+            return
+        
+        print("\n" + "="*60)
+        print(f"🏆 MENSAJES MÁS PUBLICADOS (Top {len(ranking)})")
+        print("="*60)
+        
+        for i, (mensaje, conteo) in enumerate(ranking, 1):
+            print(f"  {i}. {mensaje} ({conteo} veces)")
+        
+        print("="*60 + "\n")
+    
+    def mostrar_errores_frecuentes(self, cantidad=5):
+        """
+        Muestra las causas de error más repetidas (agrupadas por firma)
+        
+        Args:
+            cantidad: Número de firmas a mostrar
+        """
+        frecuentes = self.obtener_errores_frecuentes(cantidad)
+        
+        if not frecuentes:
+            print("📭 No hay errores registrados")
+            return
+        
+        print("\n" + "="*60)
+        print(f"🚨 ERRORES MÁS FRECUENTES (Top {len(frecuentes)})")
+        print("="*60)
+        
+        for i, (firma, grupo) in enumerate(frecuentes, 1):
+            print(f"  {i}. {firma} ({grupo['conteo']} veces)")
+            print(f"     Primera vez: {grupo['primera_vez']} | Última vez: {grupo['ultima_vez']}")
+        
+        print("="*60 + "\n")
+    
     def limpiar_historial_reciente(self):
         """
         Limpia el historial reciente (memoria de últimos 5)
@@ -379,17 +1119,75 @@ class GestorRegistro:
             print("❌ Limpieza cancelada")
 
 
+def migrar_registro_a_sqlite(archivo_registro="registro_publicaciones.json"):
+    """
+    Migración única del registro JSON (instantánea + diario) a SQLite
+    El archivo JSON original se conserva como respaldo
+    
+    Returns:
+        bool: True si se migró
+    """
+    from compartido.registro_sqlite import migrar_json_a_sqlite
+    
+    archivo_db = GestorRegistro._ruta_sqlite(archivo_registro)
+    
+    if os.path.exists(archivo_db):
+        print(f"⚠️  Ya existe {archivo_db}, no se migra de nuevo")
+        return False
+    
+    print(f"🔄 Migrando {archivo_registro} → {archivo_db}...")
+    
+    origen = GestorRegistro(archivo_registro, motor='diario')
+    
+    try:
+        cantidades = migrar_json_a_sqlite(origen.exportar_registro_completo(), archivo_db)
+    except Exception as e:
+        print(f"❌ Error migrando registro a SQLite: {e}")
+        if os.path.exists(archivo_db):
+            os.remove(archivo_db)
+        return False
+    
+    print(f"✅ Migración completada: {cantidades['publicaciones']} publicaciones, "
+          f"{cantidades['errores']} errores, {cantidades['extracciones']} extracciones")
+    return True
+
+
 def main():
-    """Función de prueba del módulo"""
+    """
+    Función de prueba del módulo
+    Uso: py gestor_registro.py [--compactar | --migrar-sqlite | --archivo [AAAA-MM]]
+    """
     print("🧪 Probando GestorRegistro...\n")
     
+    if '--migrar-sqlite' in sys.argv:
+        migrar_registro_a_sqlite()
+    
     gestor = GestorRegistro()
     
+    # Plegar el diario de eventos en la instantánea
+    if '--compactar' in sys.argv:
+        gestor.compactar_diario()
+    
     # Mostrar estadísticas
     gestor.mostrar_estadisticas()
     
     # Mostrar historial reciente
     gestor.mostrar_historial_reciente(5)
+    
+    # Mostrar ranking de mensajes
+    gestor.mostrar_ranking_mensajes(10)
+    
+    # Mostrar causas de error más frecuentes
+    gestor.mostrar_errores_frecuentes(5)
+    
+    # Consultar historial archivado
+    if '--archivo' in sys.argv:
+        posicion = sys.argv.index('--archivo')
+        mes = sys.argv[posicion + 1] if posicion + 1 < len(sys.argv) else None
+        
+        print(f"\n📦 Meses archivados: {', '.join(gestor.listar_meses_archivados()) or 'ninguno'}")
+        for pub in gestor.consultar_archivo('publicaciones', mes):
+            print(f"   {pub['fecha']} - {pub['mensaje_archivo']} ({pub.get('tipo', 'biblico')})")
 
 
 if __name__ == "__main__":
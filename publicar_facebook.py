@@ -6,11 +6,15 @@ from compartido.gestor_archivos import (
     verificar_y_crear_estructura,
     obtener_mensaje_aleatorio_sin_repetir,
     obtener_mensaje_secuencial,
+    obtener_mensaje_por_nombre,
+    obtener_posicion_mensaje,
     contar_predicaciones_pendientes,
     contar_predicaciones_publicadas,
     obtener_siguiente_predicacion,
-    mover_predicacion_a_publicados
+    mover_predicacion_a_publicados,
+    devolver_mensajes_aleatorios
 )
+from compartido.plan_publicaciones import obtener_ranura_plan, rehacer_ranura_plan, confirmar_ranura_plan
 from publicadores.publicador_facebook import PublicadorFacebook
 from gestor_registro import GestorRegistro
 
@@ -75,14 +79,13 @@ def decidir_tipo_publicacion(gestor, config):
         return 'biblico'
     
     # Verificar última publicación
-    historial = gestor.registro.get('historial_completo', [])
+    ultima = gestor.obtener_ultima_publicacion()
     
-    if not historial:
+    if not ultima:
         # Primera publicación, empezar con mensaje bíblico
         return 'biblico'
     
     # Obtener tipo de la última publicación
-    ultima = historial[-1]
     ultimo_tipo = ultima.get('tipo', 'biblico')
     
     # Alternar: si último fue bíblico → predicación, si fue predicación → bíblico
@@ -92,20 +95,39 @@ def decidir_tipo_publicacion(gestor, config):
         return 'biblico'
 
 
-def preparar_contenido_biblico(config, gestor):
+def preparar_contenido_biblico(config, gestor, archivo_planificado=None):
     """
     Prepara el contenido de un mensaje bíblico
     
+    Args:
+        archivo_planificado: Mensaje elegido por el plan de publicaciones
+                             (None = elegirlo ahora)
+    
     Returns:
         tuple: (contenido, nombre_archivo) o (None, None)
     """
+    if archivo_planificado:
+        metodo = "Plan de publicaciones"
+    elif config['seleccion'] == 'aleatoria':
+        metodo = "Aleatoria (evitando últimos publicados)"
+    else:
+        metodo = "Secuencial (siguiente en orden alfabético)"
+    
     print("\n🎯 SELECCIÓN DE MENSAJE:")
-    print(f"   Método: {config['seleccion'].capitalize()} (evitando últimos publicados)")
+    print(f"   Método: {metodo}")
     
-    if config['seleccion'] == 'aleatoria':
+    if archivo_planificado:
+        contenido, nombre_archivo = obtener_mensaje_por_nombre(archivo_planificado)
+    elif config['seleccion'] == 'aleatoria':
         contenido, nombre_archivo = obtener_mensaje_aleatorio_sin_repetir(gestor.registro)
     else:
-        contenido, nombre_archivo = obtener_mensaje_secuencial(gestor.registro)
+        # Se parte del cursor secuencial; la última publicación bíblica solo
+        # se usa en registros sin cursor (versión anterior)
+        ultimo_biblico = gestor.obtener_ultima_publicacion('biblico')
+        contenido, nombre_archivo = obtener_mensaje_secuencial(
+            gestor.registro,
+            ultimo_biblico['mensaje_archivo'] if ultimo_biblico else None
+        )
     
     if not contenido:
         print("❌ No se pudo obtener mensaje bíblico")
@@ -114,16 +136,44 @@ def preparar_contenido_biblico(config, gestor):
     return contenido, nombre_archivo
 
 
-def preparar_contenido_predicacion(config):
+def preparar_biblico_del_plan(config, gestor, ranura):
+    """
+    Prepara el mensaje bíblico de un turno del plan
+    Si el mensaje planificado ya no está, rehace el plan y usa su primer
+    turno; si tampoco sirve, elige el mensaje como sin plan
+    
+    Returns:
+        tuple: (contenido, nombre_archivo, ranura usada o None si se eligió sin plan)
+    """
+    contenido, nombre_archivo = preparar_contenido_biblico(config, gestor, ranura['archivo'])
+    if contenido or not ranura['archivo']:
+        return contenido, nombre_archivo, ranura
+    
+    ranura = rehacer_ranura_plan(config, gestor, f"no se encontró {ranura['archivo']}")
+    
+    if ranura and ranura['tipo'] == 'biblico' and ranura['archivo']:
+        contenido, nombre_archivo = preparar_contenido_biblico(config, gestor, ranura['archivo'])
+        if contenido:
+            return contenido, nombre_archivo, ranura
+    
+    contenido, nombre_archivo = preparar_contenido_biblico(config, gestor)
+    return contenido, nombre_archivo, None
+
+
+def preparar_contenido_predicacion(config, archivo_planificado=None):
     """
     Prepara el contenido de una predicación
     
+    Args:
+        archivo_planificado: Predicación elegida por el plan de publicaciones
+                             (None = la siguiente de la cola)
+    
     Returns:
         tuple: (contenido_completo, nombre_archivo, enlace_original) o (None, None, None)
     """
     print("\n🎯 SELECCIÓN DE PREDICACIÓN:")
     
-    ruta_archivo, nombre_archivo = obtener_siguiente_predicacion()
+    ruta_archivo, nombre_archivo = obtener_siguiente_predicacion(archivo_planificado)
     
     if not ruta_archivo:
         print("❌ No hay predicaciones pendientes")
@@ -340,8 +390,9 @@ def main():
     
     print(f"\n🖱️  Ejecución MANUAL")
     
-    # Decidir tipo de publicación
-    tipo_publicacion = decidir_tipo_publicacion(gestor, config)
+    # Decidir tipo de publicación (turno del plan, si está activado)
+    ranura = obtener_ranura_plan(config, gestor) if config['usar_plan_publicaciones'] else None
+    tipo_publicacion = ranura['tipo'] if ranura else decidir_tipo_publicacion(gestor, config)
     
     print(f"\n🎯 TIPO DE PUBLICACIÓN: {'📖 MENSAJE BÍBLICO' if tipo_publicacion == 'biblico' else '🎬 PREDICACIÓN'}\n")
     
@@ -350,9 +401,12 @@ def main():
     nombre_archivo = None
     
     if tipo_publicacion == 'biblico':
-        contenido, nombre_archivo = preparar_contenido_biblico(config, gestor)
+        if ranura:
+            contenido, nombre_archivo, ranura = preparar_biblico_del_plan(config, gestor, ranura)
+        else:
+            contenido, nombre_archivo = preparar_contenido_biblico(config, gestor)
     else:
-        contenido, nombre_archivo, enlace_original = preparar_contenido_predicacion(config)
+        contenido, nombre_archivo, enlace_original = preparar_contenido_predicacion(config, ranura['archivo'] if ranura else None)
     
     if not contenido:
         print("❌ No se pudo preparar el contenido")
@@ -366,6 +420,10 @@ def main():
     print(preview)
     print("-" * 70)
     
+    # Un bíblico aleatorio ya salió de la bolsa: si no se publica, vuelve a ella
+    sacado_de_bolsa = tipo_publicacion == 'biblico' and not ranura and config['seleccion'] == 'aleatoria'
+    publicado = False
+    
     # Iniciar navegador
     publicador = PublicadorFacebook(config)
     
@@ -394,6 +452,8 @@ def main():
         tiempo_ejecucion = round(fin - inicio, 1)
         
         if exito:
+            publicado = True
+            
             # Registrar éxito
             gestor.registrar_publicacion_exitosa(
                 mensaje_archivo=nombre_archivo,
@@ -401,13 +461,18 @@ def main():
                 longitud=len(contenido),
                 intentos=1,  # TODO: capturar intentos reales
                 tiempo_ejecucion=tiempo_ejecucion,
-                tipo=tipo_publicacion
+                tipo=tipo_publicacion,
+                posicion_mensaje=obtener_posicion_mensaje(nombre_archivo) if tipo_publicacion == 'biblico' else None
             )
             
             # Si es predicación, mover a publicados
             if tipo_publicacion == 'predicacion':
                 mover_predicacion_a_publicados(nombre_archivo)
             
+            # Avanzar el plan al siguiente turno
+            if ranura:
+                confirmar_ranura_plan(gestor)
+            
             print(f"\n{'='*70}")
             print("✅ PUBLICACIÓN EXITOSA")
             print(f"{'='*70}")
@@ -431,9 +496,13 @@ def main():
         traceback.print_exc()
         
         if nombre_archivo:
-            gestor.registrar_error(nombre_archivo, str(e), tipo_publicacion)
+            gestor.registrar_error(nombre_archivo, e, tipo_publicacion)
     
     finally:
+        if sacado_de_bolsa and not publicado:
+            devolver_mensajes_aleatorios(config, [nombre_archivo])
+            print(f"🃏 {nombre_archivo} vuelve a la bolsa aleatoria")
+        
         publicador.cerrar_navegador()
         print("⏳ Cerrando en 2 segundos...")
         time.sleep(2)
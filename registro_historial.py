@@ -4,14 +4,19 @@ Se integra con el publicador de Facebook para registrar URLs publicadas
 """
 
 import os
+import sys
 import json
 from datetime import datetime
 
+from compartido.indice_urls import abrir_historial_publicados, recanonicalizar_historial_publicados
+from compartido.disposicion_carpetas import ruta_archivo
+
 
 class RegistroHistorialPredicaciones:
     """
     Gestiona el historial de predicaciones publicadas
-    Registra URLs en historial_publicados.json
+    historial_publicados.json guarda contadores y fechas; las URLs van en
+    un índice en disco (historial_publicados.urls / .idx)
     """
     
     def __init__(self):
@@ -21,13 +26,17 @@ class RegistroHistorialPredicaciones:
         # Asegurar que existe la carpeta
         os.makedirs(os.path.dirname(self.archivo_historial), exist_ok=True)
         os.makedirs(self.carpeta_publicados, exist_ok=True)
+        
+        self.urls_publicadas = abrir_historial_publicados(self.archivo_historial)
     
     def cargar_historial(self):
-        """Carga el historial actual"""
+        """Carga contadores y fechas del historial (sin las URLs)"""
         if os.path.exists(self.archivo_historial):
             try:
+                historial = self._crear_historial_vacio()
                 with open(self.archivo_historial, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    historial.update(json.load(f))
+                return historial
             except:
                 return self._crear_historial_vacio()
         return self._crear_historial_vacio()
@@ -35,7 +44,6 @@ class RegistroHistorialPredicaciones:
     def _crear_historial_vacio(self):
         """Crea estructura de historial vacía"""
         return {
-            "urls_publicadas": [],
             "total_publicadas": 0,
             "ultima_actualizacion": None,
             "primera_publicacion": None
@@ -62,8 +70,8 @@ class RegistroHistorialPredicaciones:
         try:
             # Si no se proporciona URL, leerla del archivo
             if not url_publicada:
-                ruta_pendiente = os.path.join("cola-facebook/pendientes", archivo_predica)
-                ruta_publicado = os.path.join("cola-facebook/publicados", archivo_predica)
+                ruta_pendiente = ruta_archivo("cola-facebook/pendientes", archivo_predica)
+                ruta_publicado = ruta_archivo("cola-facebook/publicados", archivo_predica)
                 
                 # Intentar leer de pendientes o publicados
                 if os.path.exists(ruta_pendiente):
@@ -81,17 +89,13 @@ class RegistroHistorialPredicaciones:
                 print(f"⚠️  URL inválida: {url_publicada}")
                 return False
             
-            # Cargar historial
-            historial = self.cargar_historial()
-            
-            # Verificar si ya está registrada
-            if url_publicada in historial["urls_publicadas"]:
+            # Registrar (el índice descarta las URLs ya registradas)
+            if not self.urls_publicadas.agregar(url_publicada):
                 print(f"ℹ️  URL ya estaba registrada en historial")
                 return True
             
-            # Registrar
-            historial["urls_publicadas"].append(url_publicada)
-            historial["total_publicadas"] = len(historial["urls_publicadas"])
+            historial = self.cargar_historial()
+            historial["total_publicadas"] = len(self.urls_publicadas)
             
             # Actualizar fecha de primera publicación
             if not historial["primera_publicacion"]:
@@ -121,7 +125,7 @@ class RegistroHistorialPredicaciones:
             "total_publicadas": historial["total_publicadas"],
             "primera_publicacion": historial.get("primera_publicacion"),
             "ultima_actualizacion": historial.get("ultima_actualizacion"),
-            "urls_unicas": len(set(historial["urls_publicadas"]))
+            "urls_unicas": len(self.urls_publicadas)
         }
     
     def mostrar_estadisticas(self):
@@ -178,6 +182,11 @@ if __name__ == "__main__":
     print("PRUEBA DEL REGISTRO DE HISTORIAL")
     print("="*60 + "\n")
     
+    # Volver a normalizar las URLs ya registradas
+    if '--recanonicalizar' in sys.argv:
+        antes, despues = recanonicalizar_historial_publicados()
+        print(f"🔄 URLs normalizadas: {antes} → {despues} ({antes - despues} duplicadas unidas)\n")
+    
     registro = RegistroHistorialPredicaciones()
     
     # Mostrar estadísticas actuales
@@ -5,10 +5,19 @@ Permite reiniciar diferentes partes del sistema con un menú interactivo
 Estilo consistente con el proyecto de Marketplace
 """
 
-import json
 import os
 import shutil
 from datetime import datetime
+from gestor_registro import GestorRegistro
+from compartido.catalogo_mensajes import obtener_catalogo_mensajes
+from compartido.cola_predicaciones import reparar_cola_predicaciones
+from compartido.disposicion_carpetas import iterar_archivos
+from compartido.gestor_archivos import leer_config_global, contar_predicaciones_pendientes, contar_predicaciones_publicadas
+from compartido.marcas_extraccion import MarcasExtraccion, ARCHIVO_MARCAS
+from compartido.bolsa_mensajes import SUFIJO_BOLSA
+from compartido.similitud_mensajes import SUFIJO_SIMILITUD
+from compartido.indice_textos import ARCHIVO_INDICE
+from compartido.plan_publicaciones import ARCHIVO_PLAN
 
 
 class ReiniciadorSistema:
@@ -21,6 +30,25 @@ class ReiniciadorSistema:
         self.carpeta_mensajes = "mensajes"
         self.carpeta_perfiles = "perfiles"
     
+    def rutas_estado_derivado(self):
+        """
+        Archivos de estado que dependen del historial de publicaciones:
+        archivo mensual comprimido, bolsa aleatoria, plan, índice de textos
+        e índice de similitud (con sus archivos WAL de SQLite)
+        
+        Returns:
+            list: Rutas de archivos o carpetas
+        """
+        carpeta_mensajes = os.path.normpath(leer_config_global()['carpeta_mensajes'])
+        rutas = [
+            GestorRegistro._ruta_archivo_historico(self.archivo_registro),
+            carpeta_mensajes + SUFIJO_BOLSA,
+            ARCHIVO_PLAN
+        ]
+        for base_datos in (ARCHIVO_INDICE, carpeta_mensajes + SUFIJO_SIMILITUD):
+            rutas.extend([base_datos, base_datos + "-wal", base_datos + "-shm"])
+        return rutas
+    
     def limpiar_pantalla(self):
         """Limpia la consola"""
         os.system('cls' if os.name == 'nt' else 'clear')
@@ -34,16 +62,21 @@ class ReiniciadorSistema:
         print()
     
     def cargar_registro(self):
-        """Carga el registro actual"""
-        if not os.path.exists(self.archivo_registro):
+        """Carga el registro actual (instantánea + eventos del diario o SQLite)"""
+        if not GestorRegistro.existe_registro(self.archivo_registro):
             return None
         
         try:
-            with open(self.archivo_registro, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return GestorRegistro(self.archivo_registro).registro
         except:
             return None
     
+    def guardar_registro(self, registro):
+        """Guarda el registro y descarta el diario de eventos pendiente"""
+        gestor = GestorRegistro(self.archivo_registro)
+        gestor.registro = registro
+        return gestor.guardar_registro()
+    
     def mostrar_estado_actual(self):
         """Muestra el estado actual del sistema"""
         self.limpiar_pantalla()
@@ -79,22 +112,12 @@ class ReiniciadorSistema:
         
         # Mensajes bíblicos
         if os.path.exists(self.carpeta_mensajes):
-            mensajes = [f for f in os.listdir(self.carpeta_mensajes) if f.endswith('.txt')]
+            mensajes = obtener_catalogo_mensajes(self.carpeta_mensajes)
             print(f"   Mensajes bíblicos: {len(mensajes)} archivos")
         
-        # Predicaciones pendientes
-        if os.path.exists(self.carpeta_pendientes):
-            pendientes = [f for f in os.listdir(self.carpeta_pendientes) if f.endswith('.txt')]
-            print(f"   Predicaciones pendientes: {len(pendientes)} archivos")
-        else:
-            print(f"   Predicaciones pendientes: 0 archivos")
-        
-        # Predicaciones publicadas
-        if os.path.exists(self.carpeta_publicados):
-            publicados = [f for f in os.listdir(self.carpeta_publicados) if f.endswith('.txt')]
-            print(f"   Predicaciones publicadas: {len(publicados)} archivos")
-        else:
-            print(f"   Predicaciones publicadas: 0 archivos")
+        # Predicaciones pendientes y publicadas (contadores del manifiesto de la cola)
+        print(f"   Predicaciones pendientes: {contar_predicaciones_pendientes()} archivos")
+        print(f"   Predicaciones publicadas: {contar_predicaciones_publicadas()} archivos")
         
         # Perfiles
         if os.path.exists(self.carpeta_perfiles):
@@ -120,10 +143,12 @@ class ReiniciadorSistema:
         
         pred = registro.get('predicaciones_whatsapp', {})
         indice_actual = pred.get('indice_catalogo', 0)
+        nombre_grupo = leer_config_global()['nombre_grupo_whatsapp']
         
         print("📋 ACCIÓN A REALIZAR:")
         print(f"   Índice actual: {indice_actual}")
         print(f"   Nuevo índice: 0")
+        print(f"   Se borrará la marca de extracción del grupo '{nombre_grupo}'")
         print(f"\n💡 Esto permitirá volver a extraer las predicaciones desde el inicio.")
         print(f"   El historial de publicaciones se mantendrá intacto.\n")
         
@@ -140,11 +165,14 @@ class ReiniciadorSistema:
         registro['predicaciones_whatsapp']['indice_catalogo'] = 0
         
         # Guardar
-        with open(self.archivo_registro, 'w', encoding='utf-8') as f:
-            json.dump(registro, f, indent=2, ensure_ascii=False)
+        self.guardar_registro(registro)
+        
+        # Sin marca, la próxima extracción revisa el chat desde el más nuevo
+        MarcasExtraccion().reiniciar(nombre_grupo)
         
         print("\n✅ Índice reiniciado exitosamente")
         print("   Índice de predicaciones: 0")
+        print(f"   Marca de extracción de '{nombre_grupo}': borrada")
         input("\nPresiona Enter para continuar...")
     
     def reiniciar_historial_publicaciones(self):
@@ -165,6 +193,7 @@ class ReiniciadorSistema:
         print("📋 ACCIÓN A REALIZAR:")
         print(f"   Se borrarán {total} publicaciones del historial")
         print(f"   Las estadísticas se resetearán a 0")
+        print(f"   La selección secuencial volverá al primer mensaje")
         print(f"   El índice de predicaciones se mantendrá\n")
         
         print("=" * 70)
@@ -185,6 +214,7 @@ class ReiniciadorSistema:
         registro['fecha_ultima_publicacion'] = None
         registro['historial_reciente'] = []
         registro['historial_completo'] = []
+        registro['cursor_secuencial'] = {'archivo': None, 'posicion': None}
         registro['estadisticas'] = {
             'publicaciones_exitosas': 0,
             'publicaciones_fallidas': 0,
@@ -197,8 +227,7 @@ class ReiniciadorSistema:
         registro['predicaciones_whatsapp'] = pred_backup
         
         # Guardar
-        with open(self.archivo_registro, 'w', encoding='utf-8') as f:
-            json.dump(registro, f, indent=2, ensure_ascii=False)
+        self.guardar_registro(registro)
         
         print("\n✅ Historial reiniciado exitosamente")
         print("   Total publicaciones: 0")
@@ -216,6 +245,9 @@ class ReiniciadorSistema:
         print("   ❌ registro_publicaciones.json → se reseteará completamente")
         print("   ❌ cola-facebook/pendientes/*.txt → predicaciones pendientes")
         print("   ❌ cola-facebook/publicados/*.txt → predicaciones publicadas")
+        print("   ❌ cola-facebook/marcas_extraccion.json → tramos de WhatsApp ya revisados")
+        print("   ❌ registro_publicaciones_archivo/ → historial mensual comprimido")
+        print("   ❌ bolsa aleatoria, plan_publicaciones.json, indice_textos.db e índice de similitud")
         print("   ❌ perfiles/ → sesiones de navegador (WhatsApp y Facebook)")
         print("\n   ✅ SE CONSERVARÁ:")
         print("   ✓ mensajes/*.txt → tus mensajes bíblicos originales")
@@ -242,6 +274,7 @@ class ReiniciadorSistema:
             "fecha_ultima_publicacion": None,
             "historial_reciente": [],
             "historial_completo": [],
+            "cursor_secuencial": {"archivo": None, "posicion": None},
             "estadisticas": {
                 "publicaciones_exitosas": 0,
                 "publicaciones_fallidas": 0,
@@ -259,31 +292,46 @@ class ReiniciadorSistema:
             }
         }
         
-        with open(self.archivo_registro, 'w', encoding='utf-8') as f:
-            json.dump(registro_inicial, f, indent=2, ensure_ascii=False)
+        self.guardar_registro(registro_inicial)
         
         print("   ✅ registro_publicaciones.json reseteado")
         
         # 2. Borrar archivos de cola-facebook/pendientes/
         pendientes_borrados = 0
-        if os.path.exists(self.carpeta_pendientes):
-            for archivo in os.listdir(self.carpeta_pendientes):
-                if archivo.endswith('.txt'):
-                    os.remove(os.path.join(self.carpeta_pendientes, archivo))
-                    pendientes_borrados += 1
+        for archivo in list(iterar_archivos(self.carpeta_pendientes)):
+            os.remove(archivo.path)
+            pendientes_borrados += 1
         
         print(f"   ✅ {pendientes_borrados} archivos borrados de pendientes/")
         
         # 3. Borrar archivos de cola-facebook/publicados/
         publicados_borrados = 0
-        if os.path.exists(self.carpeta_publicados):
-            for archivo in os.listdir(self.carpeta_publicados):
-                if archivo.endswith('.txt'):
-                    os.remove(os.path.join(self.carpeta_publicados, archivo))
-                    publicados_borrados += 1
+        for archivo in list(iterar_archivos(self.carpeta_publicados)):
+            os.remove(archivo.path)
+            publicados_borrados += 1
         
         print(f"   ✅ {publicados_borrados} archivos borrados de publicados/")
         
+        # Sincronizar el manifiesto de la cola con las carpetas vacías
+        reparar_cola_predicaciones()
+        
+        # Borrar las marcas de extracción (todo el chat vuelve a revisarse)
+        if os.path.exists(ARCHIVO_MARCAS):
+            os.remove(ARCHIVO_MARCAS)
+            print("   ✅ Marcas de extracción de WhatsApp borradas")
+        
+        # Borrar el archivo histórico y el estado que depende del historial
+        borrados = 0
+        for ruta in self.rutas_estado_derivado():
+            if os.path.isdir(ruta):
+                shutil.rmtree(ruta)
+                borrados += 1
+            elif os.path.exists(ruta):
+                os.remove(ruta)
+                borrados += 1
+        
+        print(f"   ✅ {borrados} archivos de historial archivado e índices borrados")
+        
         # 4. Borrar carpeta de perfiles (sesiones de navegador)
         # ⚠️ TEMPORALMENTE DESACTIVADO PARA PRUEBAS
         # if os.path.exists(self.carpeta_perfiles):